@@ -18,11 +18,11 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
+
 # wait for the bootnode checkpoint file before starting.
-while [ ! -f "$CONSENSUS_BOOTNODE_CHECKPOINT_FILE" ]; do
-  echo "eth2-bootnode waiting for bootnode checkpoint file."
-    sleep 1
-done
+wait_for_file "$CONSENSUS_BOOTNODE_CHECKPOINT_FILE" "eth2-bootnode waiting for bootnode checkpoint file."
 
 # the clients expect a static bootnode file to come online. so we launch the
 # bootnode and then fetch the file and write it ourselves.
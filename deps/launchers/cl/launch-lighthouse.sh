@@ -32,16 +32,23 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
-# we can wait for the bootnode enr to drop before we get the signal to start up.
-while [ ! -f "$CONSENSUS_BOOTNODE_FILE" ]; do
-  echo "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
-  sleep 1
-done
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
 
-while [ ! -f "$CONSENSUS_CHECKPOINT_FILE" ]; do
-  echo "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
-    sleep 1
-done
+# peers written by the bootstrapper (peering-mode: static) are used instead
+# of the bootnode, otherwise we wait for the bootnode enr to drop before we
+# get the signal to start up.
+static_peering_args=()
+if [ -s "$CONSENSUS_NODE_DIR/static-peers-enr.txt" ]; then
+  echo "LIGHTHOUSE: Using the static peers from the bootstrapper"
+  CONSENSUS_BOOTNODE_FILE="$CONSENSUS_NODE_DIR/static-peers-enr.txt"
+  if [ -s "$CONSENSUS_NODE_DIR/static-peers.txt" ]; then
+    static_peering_args+=(--libp2p-addresses="$(< "$CONSENSUS_NODE_DIR/static-peers.txt")")
+  fi
+fi
+wait_for_file "$CONSENSUS_BOOTNODE_FILE" "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
+
+wait_for_file "$CONSENSUS_CHECKPOINT_FILE" "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
 
 bootnode_enr=`cat $CONSENSUS_BOOTNODE_FILE`
 
@@ -50,6 +57,7 @@ echo "Launching lighthouse."
 lighthouse \
       --testnet-dir="$COLLECTION_DIR" \
       bn \
+      "${static_peering_args[@]}" \
       --datadir="$CONSENSUS_NODE_DIR" \
       --staking \
       --http-address=0.0.0.0 \
@@ -32,22 +32,38 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
-# we can wait for the bootnode enr to drop before we get the signal to start up.
-while [ ! -f "$CONSENSUS_BOOTNODE_FILE" ]; do
-  echo "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
-  sleep 1
-done
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
 
-bootnode_enr=`cat $CONSENSUS_BOOTNODE_FILE`
+# peers written by the bootstrapper (peering-mode: static) are used instead
+# of the bootnode, otherwise we wait for the bootnode enr to drop before we
+# get the signal to start up.
+static_peering_args=()
+if [ -s "$CONSENSUS_NODE_DIR/static-peers-enr.txt" ]; then
+  echo "NIMBUS: Using the static peers from the bootstrapper"
+  CONSENSUS_BOOTNODE_FILE="$CONSENSUS_NODE_DIR/static-peers-enr.txt"
+  # nimbus takes one peer per flag.
+  IFS="," read -r -a static_peers <<< "$(< "$CONSENSUS_NODE_DIR/static-peers.txt")"
+  for static_peer in "${static_peers[@]}"; do
+    static_peering_args+=(--direct-peer="$static_peer")
+  done
+fi
+wait_for_file "$CONSENSUS_BOOTNODE_FILE" "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
 
-while [ ! -f "$CONSENSUS_CHECKPOINT_FILE" ]; do
-  echo "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
-    sleep 1
+bootnode_enr=`cat $CONSENSUS_BOOTNODE_FILE`
+# one bootstrap node per flag, there are several with static peers.
+bootnode_args=()
+IFS="," read -r -a bootnode_enrs <<< "$bootnode_enr"
+for enr in "${bootnode_enrs[@]}"; do
+  bootnode_args+=(--bootstrap-node="$enr")
 done
 
+wait_for_file "$CONSENSUS_CHECKPOINT_FILE" "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
+
 echo "Launching nimbus."
 
 nimbus_beacon_node \
+    "${static_peering_args[@]}" \
     --non-interactive \
     --data-dir="$CONSENSUS_NODE_DIR" \
     --log-file="$CONSENSUS_NODE_DIR/beacon-log.txt" --log-level="$CONSENSUS_LOG_LEVEL" \
@@ -64,7 +80,7 @@ nimbus_beacon_node \
     --graffiti="$CONSENSUS_GRAFFITI" \
     --in-process-validators=true \
     --doppelganger-detection=true \
-    --bootstrap-node="$bootnode_enr" \
+    "${bootnode_args[@]}" \
     --jwt-secret="$JWT_SECRET_FILE" \
     --web3-url=http://"127.0.0.1:$EXECUTION_ENGINE_HTTP_PORT" \
     --dump:on
@@ -32,21 +32,30 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
-# we can wait for the bootnode enr to drop before we get the signal to start up.
-while [ ! -f "$CONSENSUS_BOOTNODE_FILE" ]; do
-  echo "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
-  sleep 1
-done
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
 
-while [ ! -f "$CONSENSUS_CHECKPOINT_FILE" ]; do
-  echo "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
-    sleep 1
-done
+# peers written by the bootstrapper (peering-mode: static) are used instead
+# of the bootnode, otherwise we wait for the bootnode enr to drop before we
+# get the signal to start up.
+static_peering_args=()
+if [ -s "$CONSENSUS_NODE_DIR/static-peers-enr.txt" ]; then
+  echo "TEKU: Using the static peers from the bootstrapper"
+  CONSENSUS_BOOTNODE_FILE="$CONSENSUS_NODE_DIR/static-peers-enr.txt"
+  static_peering_args+=(--p2p-private-key-file="$CONSENSUS_NODE_DIR/etb-p2p-key")
+  if [ -s "$CONSENSUS_NODE_DIR/static-peers.txt" ]; then
+    static_peering_args+=(--p2p-static-peers="$(< "$CONSENSUS_NODE_DIR/static-peers.txt")")
+  fi
+fi
+wait_for_file "$CONSENSUS_BOOTNODE_FILE" "consensus client waiting for bootnode enr file: $CONSENSUS_BOOTNODE_FILE"
+
+wait_for_file "$CONSENSUS_CHECKPOINT_FILE" "Waiting for consensus checkpoint file: $CONSENSUS_CHECKPOINT_FILE"
 
 # by this time we can be sure the bootnode file has been completely written.
 bootnode_enr=`cat $CONSENSUS_BOOTNODE_FILE`
 
 teku \
+    "${static_peering_args[@]}" \
     --logging="$CONSENSUS_LOG_LEVEL" \
     --log-color-enabled=false \
     --log-destination=CONSOLE \
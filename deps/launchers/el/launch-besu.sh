@@ -30,13 +30,23 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
 
-while [ ! -f "$EXECUTION_CHECKPOINT_FILE" ]; do
-  echo "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
-    sleep 1
-done
+wait_for_file "$EXECUTION_CHECKPOINT_FILE" "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
+
+# node key and static peers written by the bootstrapper (peering-mode: static)
+static_peering_args=()
+if [ -f "$EXECUTION_NODE_DIR/nodekey" ]; then
+  static_peering_args+=(--node-private-key-file="$EXECUTION_NODE_DIR/nodekey")
+fi
+if [ -s "$EXECUTION_NODE_DIR/static-nodes.json" ]; then
+  echo "BESU: Using the static peers from the bootstrapper"
+  static_peering_args+=(--static-nodes-file="$EXECUTION_NODE_DIR/static-nodes.json")
+fi
 
 besu \
+  "${static_peering_args[@]}" \
   --logging="$EXECUTION_LOG_LEVEL" \
   --bootnodes="$EXECUTION_BOOTNODE" \
   --data-path="$EXECUTION_DATA_DIR" \
@@ -30,23 +30,38 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
 
-while [ ! -f "$EXECUTION_CHECKPOINT_FILE" ]; do
-  echo "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
-    sleep 1
-done
+wait_for_file "$EXECUTION_CHECKPOINT_FILE" "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
 
 # Time for execution clients to start up.
-# go geth init
-echo "GETH: Init the genesis"
-geth init \
-    --datadir "$EXECUTION_NODE_DIR" \
-    "$EXECUTION_GENESIS_FILE"
+# the bootstrapper may have initialized the datadir already.
+if [ -f "$EXECUTION_NODE_DIR/etb-prepared-datadir" ]; then
+  echo "GETH: Using the datadir prepared by the bootstrapper"
+else
+  # go geth init
+  echo "GETH: Init the genesis"
+  geth init \
+      --datadir "$EXECUTION_NODE_DIR" \
+      "$EXECUTION_GENESIS_FILE"
+fi
+
+# node key and static peers written by the bootstrapper (peering-mode: static)
+static_peering_args=()
+if [ -f "$EXECUTION_NODE_DIR/nodekey" ]; then
+  static_peering_args+=(--nodekey "$EXECUTION_NODE_DIR/nodekey")
+fi
+if [ -s "$EXECUTION_NODE_DIR/static-peers.toml" ]; then
+  echo "GETH: Using the static peers from the bootstrapper"
+  static_peering_args+=(--config "$EXECUTION_NODE_DIR/static-peers.toml")
+fi
 
 # Now start geth.
 echo "Starting geth"
 
 geth \
+  "${static_peering_args[@]}" \
   --datadir="$EXECUTION_NODE_DIR" \
   --networkid="$CHAIN_ID" \
   --port "$EXECUTION_P2P_PORT" \
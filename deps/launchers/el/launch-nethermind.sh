@@ -30,16 +30,26 @@ for var in "${env_vars[@]}" ; do
     fi
 done
 
+# provides wait_for_file
+source "$(dirname "${BASH_SOURCE[0]}")/../wait-for-file.sh"
+
+wait_for_file "$EXECUTION_CHECKPOINT_FILE" "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
 
-while [ ! -f "$EXECUTION_CHECKPOINT_FILE" ]; do
-  echo "Waiting for execution checkpoint file: $EXECUTION_CHECKPOINT_FILE"
-    sleep 1
-done
 
+# node key and static peers written by the bootstrapper (peering-mode: static)
+static_peering_args=()
+if [ -f "$EXECUTION_NODE_DIR/node.key.plain" ]; then
+  static_peering_args+=(--KeyStore.EnodeKeyFile="$EXECUTION_NODE_DIR/node.key.plain")
+fi
+if [ -s "$EXECUTION_NODE_DIR/static-peers.txt" ]; then
+  echo "NETHERMIND: Using the static peers from the bootstrapper"
+  static_peering_args+=(--Network.StaticPeers="$(cat "$EXECUTION_NODE_DIR/static-peers.txt")")
+fi
 
 echo "{}" > /tmp/nethermind.cfg
 nethermind \
   $ADDITIONAL_ARGS \
+  "${static_peering_args[@]}" \
   --config="/tmp/nethermind.cfg" \
   --datadir="$EXECUTION_NODE_DIR" \
   --Init.ChainSpecPath="$EXECUTION_GENESIS_FILE" \
@@ -0,0 +1,21 @@
+#!/bin/bash
+# sourced by the launchers.
+#
+# wait_for_file <file> <message>
+#   blocks until <file> exists. Uses the inotify based wait_for_checkpoint.py
+#   when python3 is available and falls back to polling otherwise.
+
+wait_for_checkpoint_py="$(dirname "${BASH_SOURCE[0]}")/../../src/wait_for_checkpoint.py"
+
+wait_for_file () {
+  echo "$2"
+  if command -v python3 > /dev/null 2>&1 && [ -f "$wait_for_checkpoint_py" ]; then
+    if python3 "$wait_for_checkpoint_py" --log-level warning "$1"; then
+      return
+    fi
+  fi
+  while [ ! -f "$1" ]; do
+    echo "$2"
+    sleep 1
+  done
+}
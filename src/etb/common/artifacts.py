@@ -0,0 +1,194 @@
+"""Incremental builds of the testnet artifacts written during init.
+
+Every artifact (e.g. the directory of a client instance with its jwt
+secret and validator keystores) is keyed by a digest of the inputs it is
+built from, i.e. the relevant subsections of the etb-config, and of the
+digests of the artifacts it depends on. The digests and outputs of the
+last build are kept in a manifest, so re-running init only rebuilds the
+artifacts whose inputs changed or whose outputs went missing, and removes
+the outputs of artifacts that are no longer part of the config.
+
+Artifacts are built in the order they are added. Consecutive stale
+artifacts with the same builder are handed to it as one batch, so e.g.
+the keystores of several client instances can still be generated
+concurrently.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from typing import Any, Callable, Union
+
+from .filesystem import remove_tree
+
+
+class Artifact:
+    """Something init writes into the testnet root, and what it depends on."""
+
+    def __init__(
+        self,
+        name: str,
+        inputs: Any,
+        outputs: list[pathlib.Path],
+        builder: Callable[[list["Artifact"]], None],
+        deps: Union[list[str], None] = None,
+        context: Any = None,
+    ):
+        """
+        @param name: unique name of the artifact.
+        @param inputs: json serializable data the artifact is built from.
+        @param outputs: the files and dirs the builder creates.
+        @param builder: builds a batch of (stale) artifacts.
+        @param deps: names of the artifacts this one depends on.
+        @param context: anything the builder needs, e.g. a ClientInstance.
+        """
+        self.name: str = name
+        self.inputs: Any = inputs
+        self.outputs: list[pathlib.Path] = outputs
+        self.builder: Callable[[list["Artifact"]], None] = builder
+        self.deps: list[str] = deps if deps is not None else []
+        self.context: Any = context
+        self.digest: str = ""
+
+    def __repr__(self):
+        return self.name
+
+
+class ArtifactReport:
+    """What an ArtifactGraph.build() did."""
+
+    def __init__(self):
+        self.built: list[str] = []
+        self.reused: list[str] = []
+        self.removed: list[str] = []
+
+    def __repr__(self):
+        return (
+            f"built {len(self.built)}, reused {len(self.reused)}, "
+            f"removed {len(self.removed)} artifacts"
+        )
+
+
+def remove_output(path: pathlib.Path):
+    """Remove a file or directory output, if it exists."""
+    if path.is_dir() and not path.is_symlink():
+        remove_tree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+class ArtifactGraph:
+    """The artifacts of a testnet and the manifest of their last build."""
+
+    def __init__(self, manifest_file: pathlib.Path):
+        self.manifest_file: pathlib.Path = manifest_file
+        self.artifacts: dict[str, Artifact] = {}
+        # name -> {"digest": str, "outputs": [str]}
+        self.records: dict[str, dict] = {}
+        if manifest_file.exists():
+            try:
+                with open(manifest_file, "r", encoding="utf-8") as f:
+                    self.records = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(
+                    f"ignoring unreadable artifact manifest {manifest_file}: {e}"
+                )
+
+    def add(self, artifact: Artifact) -> Artifact:
+        """Add an artifact, its dependencies must already be added.
+
+        @param artifact: the artifact.
+        @return: the artifact, with its digest set.
+        """
+        if artifact.name in self.artifacts:
+            raise Exception(f"duplicate artifact: {artifact.name}")
+        for dep in artifact.deps:
+            if dep not in self.artifacts:
+                raise Exception(f"artifact {artifact.name} depends on unknown {dep}")
+        artifact.digest = hashlib.sha256(
+            json.dumps(
+                [artifact.inputs, [self.artifacts[dep].digest for dep in artifact.deps]],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        ).hexdigest()
+        self.artifacts[artifact.name] = artifact
+        return artifact
+
+    def _is_current(self, artifact: Artifact) -> bool:
+        record = self.records.get(artifact.name)
+        return (
+            record is not None
+            and record["digest"] == artifact.digest
+            and all(output.exists() for output in artifact.outputs)
+        )
+
+    def _save(self):
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_name(f".{self.manifest_file.name}.{os.getpid()}")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.manifest_file)
+
+    def build(self) -> ArtifactReport:
+        """Remove the artifacts that are gone from the config, then build the
+        stale ones. The manifest is updated after every batch, so an
+        interrupted build resumes where it stopped.
+
+        @return: what was built, reused and removed.
+        """
+        report = ArtifactReport()
+        for name in [name for name in self.records if name not in self.artifacts]:
+            logging.debug(f"removing artifact {name}")
+            for output in self.records[name]["outputs"]:
+                remove_output(pathlib.Path(output))
+                # drop the parent dir as well if nothing else is left in it.
+                try:
+                    pathlib.Path(output).parent.rmdir()
+                except OSError:
+                    pass
+            del self.records[name]
+            report.removed.append(name)
+        self._save()
+
+        stale: set[str] = set()
+        for artifact in self.artifacts.values():
+            if self._is_current(artifact) and not any(dep in stale for dep in artifact.deps):
+                report.reused.append(artifact.name)
+            else:
+                stale.add(artifact.name)
+
+        batch: list[Artifact] = []
+        for artifact in list(self.artifacts.values()) + [None]:
+            if artifact is not None and artifact.name not in stale:
+                continue
+            # artifacts that share a builder are built in one call, unless
+            # one of them depends on another, which has to be built first.
+            if len(batch) > 0 and (
+                artifact is None
+                or artifact.builder != batch[0].builder
+                or any(dep in {a.name for a in batch} for dep in artifact.deps)
+            ):
+                self._build_batch(batch, report)
+                batch = []
+            if artifact is not None:
+                batch.append(artifact)
+        return report
+
+    def _build_batch(self, batch: list[Artifact], report: ArtifactReport):
+        for artifact in batch:
+            logging.debug(f"building artifact {artifact.name}")
+            # the previous outputs may be anywhere, e.g. if an instance moved.
+            previous = self.records.pop(artifact.name, {"outputs": []})["outputs"]
+            for output in set(previous) | {str(output) for output in artifact.outputs}:
+                remove_output(pathlib.Path(output))
+        self._save()
+        batch[0].builder(batch)
+        for artifact in batch:
+            self.records[artifact.name] = {
+                "digest": artifact.digest,
+                "outputs": [str(output) for output in artifact.outputs],
+            }
+            report.built.append(artifact.name)
+        self._save()
@@ -0,0 +1,120 @@
+"""Waiting on checkpoint files.
+
+The bootstrapper signals the containers of the testnet by dropping
+checkpoint files into the testnet root. Instead of polling for them every
+second, we block on inotify events for the checkpoint dir so a waiter
+wakes up as soon as the file appears. On systems or filesystems without
+inotify (or where events from other hosts are not delivered) we fall back
+to polling with an interval that backs off from min_poll to max_poll.
+
+This module is used by the containers of the testnet, so it must only
+depend on the standard library.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import pathlib
+import select
+import time
+from typing import Union
+
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+class InotifyWatch:
+    """An inotify watch for entries being created in a directory."""
+
+    def __init__(self, directory: pathlib.Path):
+        libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd: int = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        wd = libc.inotify_add_watch(
+            self.fd,
+            os.fsencode(str(directory)),
+            _IN_CREATE | _IN_MOVED_TO | _IN_CLOSE_WRITE | _IN_ATTRIB,
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno))
+
+    def wait(self, timeout: float) -> bool:
+        """Block until there is activity in the directory.
+
+        @param timeout: max seconds to wait.
+        @return: True if there were events, False on timeout.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return False
+        # we only care that something happened, drain the events.
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def wait_for_file(
+    path: pathlib.Path,
+    timeout: Union[float, None] = None,
+    min_poll: float = 0.01,
+    max_poll: float = 1.0,
+    use_inotify: bool = True,
+) -> bool:
+    """Block until path exists.
+
+    @param path: the file to wait for.
+    @param timeout: max seconds to wait, None waits forever.
+    @param min_poll: the first polling interval when polling.
+    @param max_poll: the max polling interval. With inotify this is how
+        often the file is checked regardless of events.
+    @param use_inotify: use inotify when available.
+    @return: True once the file exists, False on timeout.
+    """
+    path = pathlib.Path(path)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    watch: Union[InotifyWatch, None] = None
+    poll = min_poll
+    try:
+        while True:
+            if path.exists():
+                return True
+            if watch is None and use_inotify and path.parent.is_dir():
+                try:
+                    watch = InotifyWatch(path.parent)
+                except (OSError, AttributeError) as e:
+                    logging.debug(
+                        f"inotify unavailable for {path.parent} ({e}), polling")
+                    use_inotify = False
+                # check again so we don't miss a file created before the watch.
+                continue
+
+            wait_time = max_poll if watch is not None else poll
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+
+            if watch is not None:
+                watch.wait(wait_time)
+            else:
+                time.sleep(wait_time)
+                poll = min(poll * 2, max_poll)
+    finally:
+        if watch is not None:
+            watch.close()
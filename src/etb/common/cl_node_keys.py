@@ -0,0 +1,189 @@
+"""Deterministic CL node identities and static peering files.
+
+Normally every consensus client waits for the eth2-bootnode to come up
+and write its ENR, and then discovers all of its peers through that one
+bootnode. Instead the secp256k1 network keys of the CLs can be derived
+during init (see etb.common.node_keys). The IP address and p2p port of
+every instance are known up front, so the ENRs, libp2p peer ids and
+multiaddrs are as well. Each CL is handed:
+
+    static-peers-enr.txt    the ENRs of its peers, used as discv5 bootnodes.
+    static-peers.txt        the multiaddrs of its peers, dialed directly.
+
+along with its network key in the client's native format:
+
+    lighthouse: beacon/network/key (raw bytes)
+    prysm:      etb-p2p-key (hex, --p2p-priv-key)
+    teku:       etb-p2p-key (hex protobuf, --p2p-private-key-file)
+    lodestar:   peer-id.json (--peerIdFile)
+
+nimbus keeps its network key in an encrypted keystore that it creates
+itself, so its identity is not known up front: nimbus nodes get their
+peer lists and dial out, but are never dialed.
+"""
+import base64
+import json
+import pathlib
+from typing import Union
+
+from Crypto.Hash import keccak
+from py_ecc.secp256k1 import secp256k1
+
+CL_NETWORK_KEY_FILES: dict[str, Union[str, None]] = {
+    "lighthouse": "beacon/network/key",
+    "prysm": "etb-p2p-key",
+    "teku": "etb-p2p-key",
+    "lodestar": "peer-id.json",
+    "nimbus": None,
+}
+
+STATIC_PEERS_ENR_FILE = "static-peers-enr.txt"
+STATIC_PEERS_MULTIADDR_FILE = "static-peers.txt"
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _rlp_encode(item: Union[bytes, list]) -> bytes:
+    """Minimal RLP encoding of bytes and (nested) lists of bytes."""
+
+    def _length_prefix(length: int, offset: int) -> bytes:
+        if length < 56:
+            return bytes([offset + length])
+        length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+        return bytes([offset + 55 + len(length_bytes)]) + length_bytes
+
+    if isinstance(item, list):
+        payload = b"".join(_rlp_encode(x) for x in item)
+        return _length_prefix(len(payload), 0xC0) + payload
+    if len(item) == 1 and item[0] < 0x80:
+        return item
+    return _length_prefix(len(item), 0x80) + item
+
+
+def _int_bytes(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def _base58(data: bytes) -> str:
+    num = int.from_bytes(data, "big")
+    encoded = ""
+    while num > 0:
+        num, rem = divmod(num, 58)
+        encoded = _BASE58_ALPHABET[rem] + encoded
+    # leading zero bytes are encoded as 1s.
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def compressed_public_key(node_key: bytes) -> bytes:
+    """The 33 byte compressed secp256k1 public key of a node key."""
+    x, y = secp256k1.privtopub(node_key)
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, "big")
+
+
+def _protobuf_public_key(node_key: bytes) -> bytes:
+    # libp2p PublicKey{Type: Secp256k1, Data: compressed key}
+    return b"\x08\x02\x12\x21" + compressed_public_key(node_key)
+
+
+def _protobuf_private_key(node_key: bytes) -> bytes:
+    # libp2p PrivateKey{Type: Secp256k1, Data: key}
+    return b"\x08\x02\x12\x20" + node_key
+
+
+def peer_id(node_key: bytes) -> str:
+    """The libp2p peer id, the identity multihash of the public key."""
+    public_key = _protobuf_public_key(node_key)
+    return _base58(bytes([0x00, len(public_key)]) + public_key)
+
+
+def multiaddr(node_key: bytes, ip_address: str, p2p_port: int) -> str:
+    return f"/ip4/{ip_address}/tcp/{p2p_port}/p2p/{peer_id(node_key)}"
+
+
+def enr(
+    node_key: bytes,
+    ip_address: str,
+    udp_port: int,
+    tcp_port: Union[int, None] = None,
+    seq: int = 1,
+) -> str:
+    """The signed v4 ENR (EIP-778) of a node.
+
+    @param node_key: the secp256k1 network key.
+    @param ip_address: the ipv4 address of the node.
+    @param udp_port: the discv5 port.
+    @param tcp_port: the libp2p port, if any.
+    @param seq: the sequence number of the record.
+    @return: the text form of the ENR.
+    """
+    pairs: list[tuple[bytes, bytes]] = [
+        (b"id", b"v4"),
+        (b"ip", bytes(int(octet) for octet in ip_address.split("."))),
+        (b"secp256k1", compressed_public_key(node_key)),
+    ]
+    if tcp_port is not None:
+        pairs.append((b"tcp", _int_bytes(tcp_port)))
+    pairs.append((b"udp", _int_bytes(udp_port)))
+    content: list[bytes] = [_int_bytes(seq)]
+    for key, value in sorted(pairs):
+        content += [key, value]
+
+    digest = keccak.new(digest_bits=256, data=_rlp_encode(content)).digest()
+    _, r, s = secp256k1.ecdsa_raw_sign(digest, node_key)
+    signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+    record = _rlp_encode([signature] + content)
+    return "enr:" + base64.urlsafe_b64encode(record).decode("ascii").rstrip("=")
+
+
+def write_cl_static_peering_files(
+    client: str,
+    node_dir: pathlib.Path,
+    node_key: bytes,
+    peer_enrs: list[str],
+    peer_multiaddrs: list[str],
+):
+    """Write the network key and static peers of a CL.
+
+    @param client: the consensus client.
+    @param node_dir: the datadir of the client.
+    @param node_key: the network key of the client.
+    @param peer_enrs: the ENRs of the peers to discover through.
+    @param peer_multiaddrs: the multiaddrs of the peers to dial.
+    @return:
+    """
+    if client not in CL_NETWORK_KEY_FILES:
+        raise Exception(f"static peering is not supported for {client}")
+    node_dir.mkdir(parents=True, exist_ok=True)
+    key_file = CL_NETWORK_KEY_FILES[client]
+    if key_file is not None:
+        key_path = node_dir / key_file
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        if client == "lighthouse":
+            with open(key_path, "wb") as f:
+                f.write(node_key)
+        elif client == "lodestar":
+            with open(key_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "id": peer_id(node_key),
+                        "privKey": base64.b64encode(
+                            _protobuf_private_key(node_key)
+                        ).decode("ascii"),
+                        "pubKey": base64.b64encode(
+                            _protobuf_public_key(node_key)
+                        ).decode("ascii"),
+                    },
+                    f,
+                )
+        else:
+            with open(key_path, "w", encoding="utf-8") as f:
+                f.write(
+                    _protobuf_private_key(node_key).hex()
+                    if client == "teku"
+                    else node_key.hex()
+                )
+
+    with open(node_dir / STATIC_PEERS_ENR_FILE, "w", encoding="utf-8") as f:
+        f.write(",".join(peer_enrs))
+    with open(node_dir / STATIC_PEERS_MULTIADDR_FILE, "w", encoding="utf-8") as f:
+        f.write(",".join(peer_multiaddrs))
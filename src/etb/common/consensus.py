@@ -21,6 +21,11 @@ class MinimalPreset(PresetEnum, Enum):
 
     SLOTS_PER_EPOCH = 8
     EPOCHS_PER_ETH1_VOTING_PERIOD = 4
+    # state vector lengths
+    SLOTS_PER_HISTORICAL_ROOT = 64
+    EPOCHS_PER_HISTORICAL_VECTOR = 64
+    EPOCHS_PER_SLASHINGS_VECTOR = 64
+    SYNC_COMMITTEE_SIZE = 32
     # configs
     # timing
     SECONDS_PER_SLOT = 6
@@ -64,6 +69,11 @@ class MainnetPreset(PresetEnum, Enum):
     # presets
     SLOTS_PER_EPOCH = 32
     EPOCHS_PER_ETH1_VOTING_PERIOD = 64
+    # state vector lengths
+    SLOTS_PER_HISTORICAL_ROOT = 8192
+    EPOCHS_PER_HISTORICAL_VECTOR = 65536
+    EPOCHS_PER_SLASHINGS_VECTOR = 8192
+    SYNC_COMMITTEE_SIZE = 512
     # configs
     # timing
     SECONDS_PER_SLOT = 12
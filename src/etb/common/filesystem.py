@@ -0,0 +1,295 @@
+"""Helpers for placing generated files into the testnet directories.
+
+Generated artifacts (e.g. validator keystores) are written into a scratch
+dir and then handed to the clients. Moving them with a rename is a single
+metadata operation, so we only fall back to hardlinking or copying the
+individual files when the rename is not possible (e.g. across devices).
+
+Files shared by many client dirs (e.g. the consensus genesis) are cloned
+instead: a reflink where the filesystem supports it, otherwise a hardlink
+and only as a last resort a copy. A sha256sum style checksum manifest lets
+the clients verify what they were handed without us re-reading the files
+for every destination.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Union
+
+
+class PlacementStats:
+    """Bookkeeping of what a set of place() calls moved, and how."""
+
+    def __init__(self):
+        self.files: int = 0
+        self.bytes: int = 0
+        # number of top level place() calls per method used.
+        self.methods: dict[str, int] = {"rename": 0, "link": 0, "copy": 0}
+
+    def __repr__(self):
+        methods = ", ".join(f"{k}: {v}" for k, v in self.methods.items() if v)
+        return f"{self.files} files, {self.bytes} bytes ({methods})"
+
+    def update(self, other: "PlacementStats"):
+        """Add the counts of other to this.
+
+        @param other: the stats to merge in.
+        @return:
+        """
+        self.files += other.files
+        self.bytes += other.bytes
+        for method, count in other.methods.items():
+            self.methods[method] += count
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """copy_function for shutil.copytree that hardlinks when possible.
+
+    @return: the method used, "link" or "copy".
+    """
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+# ioctl(2) request to share the extents of a file (linux/fs.h).
+_FICLONE = 0x40049409
+
+
+def clone_file(src: pathlib.Path, dst: pathlib.Path, hardlink: bool = True) -> str:
+    """Make dst a clone of src, replacing dst if it exists.
+
+    A reflink shares the data blocks copy-on-write, a hardlink shares the
+    inode, so prefer the reflink and fall back to a hardlink, then a copy.
+    @param src: the file to clone.
+    @param dst: the path of the clone.
+    @param hardlink: allow hardlinks, only safe if neither side is modified.
+    @return: the method used, "reflink", "link" or "copy".
+    """
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        shutil.copystat(src, dst)
+        return "reflink"
+    except OSError:
+        dst.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def clone_tree(
+    src: pathlib.Path, dst: pathlib.Path, hardlink: bool = False
+) -> dict[str, int]:
+    """Clone the contents of the src dir into dst (which may exist), see
+    clone_file.
+
+    @param src: the directory to clone.
+    @param dst: the directory to clone into.
+    @param hardlink: allow hardlinks, only safe if neither side is modified.
+    @return: number of files per method used.
+    """
+    methods: dict[str, int] = {"reflink": 0, "link": 0, "copy": 0}
+    for dir_path, _, file_names in os.walk(src):
+        target_dir = dst / pathlib.Path(dir_path).relative_to(src)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for file_name in file_names:
+            methods[clone_file(
+                pathlib.Path(dir_path) / file_name, target_dir / file_name, hardlink
+            )] += 1
+    return methods
+
+
+def sha256_file(path: pathlib.Path, chunk_size: int = 1 << 20) -> str:
+    """Hex sha256 digest of a file, read in chunks.
+
+    @param path: the file to hash.
+    @param chunk_size: bytes read at a time.
+    @return: the hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_checksum_manifest(path: pathlib.Path, checksums: dict[str, str]):
+    """Write a manifest that `sha256sum -c` can verify from its dir.
+
+    @param path: the manifest file.
+    @param checksums: file name (relative to the manifest dir) -> hex digest.
+    @return:
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for name, digest in checksums.items():
+            f.write(f"{digest}  {name}\n")
+
+
+def tree_size(path: pathlib.Path) -> tuple[int, int]:
+    """Number of files and their total size in bytes under path.
+
+    @param path: a file or directory.
+    @return: (files, bytes)
+    """
+    if not path.is_dir():
+        return 1, path.stat().st_size
+    files = 0
+    size = 0
+    stack = [str(path)]
+    while len(stack) > 0:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    files += 1
+                    size += entry.stat(follow_symlinks=False).st_size
+    return files, size
+
+
+def place(src: pathlib.Path, dst: pathlib.Path,
+          stats: PlacementStats = None) -> PlacementStats:
+    """Move the file or directory src to dst.
+
+    Uses os.rename when src and dst share a filesystem, otherwise the files
+    are hardlinked (or copied when linking fails) and src is removed.
+    dst must not exist.
+    @param src: the file or directory to move.
+    @param dst: where to move it to.
+    @param stats: optional stats to accumulate into.
+    @return: the stats.
+    """
+    if stats is None:
+        stats = PlacementStats()
+    if dst.exists():
+        raise Exception(f"refusing to place {src} over existing {dst}")
+    files, size = tree_size(src)
+    try:
+        os.rename(src, dst)
+        method = "rename"
+    except OSError as e:
+        logging.debug(f"could not rename {src} to {dst} ({e}), linking")
+        used: set[str] = set()
+
+        def _copy(s, d):
+            used.add(link_or_copy(s, d))
+
+        if src.is_dir():
+            shutil.copytree(src, dst, copy_function=_copy)
+            shutil.rmtree(src)
+        else:
+            _copy(str(src), str(dst))
+            src.unlink()
+        method = "copy" if "copy" in used else "link"
+    stats.files += files
+    stats.bytes += size
+    stats.methods[method] += 1
+    return stats
+
+
+def move_aside(root: pathlib.Path, trash_dir: pathlib.Path,
+               keep: list[pathlib.Path] = None) -> Union[pathlib.Path, None]:
+    """Rename everything in root into a fresh dir inside trash_dir.
+
+    This is cheap regardless of how much data root holds, so root is
+    immediately usable again while the moved entries are removed later.
+    trash_dir must be on the same filesystem as root.
+    @param root: the dir to empty.
+    @param trash_dir: where to move the entries to.
+    @param keep: entries of root to leave in place (trash_dir always is).
+    @return: the dir the entries were moved to, None if root was empty.
+    """
+    keep = [] if keep is None else keep
+    entries = [
+        entry for entry in root.iterdir()
+        if entry != trash_dir and entry not in keep
+    ]
+    if len(entries) == 0:
+        return None
+    trash_dir.mkdir(parents=True, exist_ok=True)
+    dest = trash_dir / f"{time.time_ns()}-{os.getpid()}"
+    dest.mkdir()
+    for entry in entries:
+        os.rename(entry, dest / entry.name)
+    return dest
+
+
+def remove_tree(path: pathlib.Path, max_workers: int = None,
+                progress_interval: float = 5.0) -> int:
+    """Remove a directory tree using a pool of os.scandir workers.
+
+    Each worker empties one directory of its files and hands the sub
+    directories back to the pool, the (then empty) directories are removed
+    deepest first at the end.
+    @param path: the directory to remove.
+    @param max_workers: number of threads (default: 4 x cpu count, max 32)
+    @param progress_interval: seconds between progress logs.
+    @return: the number of files removed.
+    """
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+    lock = threading.Lock()
+    removed_files = 0
+    dirs: list[tuple[int, str]] = [(0, str(path))]
+
+    def _empty_dir(dir_path: str, depth: int) -> list[tuple[str, int]]:
+        nonlocal removed_files
+        sub_dirs = []
+        num_files = 0
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_dirs.append((entry.path, depth + 1))
+                    continue
+                try:
+                    os.unlink(entry.path)
+                    num_files += 1
+                except FileNotFoundError:
+                    pass
+        with lock:
+            removed_files += num_files
+        return sub_dirs
+
+    start = time.monotonic()
+    last_report = start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_empty_dir, str(path), 0)}
+        while len(pending) > 0:
+            done, pending = wait(
+                pending, timeout=progress_interval, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                for sub_dir, depth in future.result():
+                    dirs.append((depth, sub_dir))
+                    pending.add(executor.submit(_empty_dir, sub_dir, depth))
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                logging.info(
+                    f"removing {path}: {removed_files} files, "
+                    f"{len(dirs)} dirs so far ({last_report - start:.0f}s)"
+                )
+
+    for _, dir_path in sorted(dirs, reverse=True):
+        os.rmdir(dir_path)
+    logging.info(
+        f"removed {path}: {removed_files} files, {len(dirs)} dirs "
+        f"in {time.monotonic() - start:.2f}s"
+    )
+    return removed_files
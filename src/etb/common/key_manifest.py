@@ -0,0 +1,88 @@
+"""A binary manifest of the premine account keys.
+
+Load generators want the keys of (possibly thousands of) funded
+accounts. Rather than re-deriving them from the account mnemonic the
+bootstrapper exports them once into a flat file of fixed width records
+that can be memory mapped:
+
+    header (16 bytes):
+        magic                   8 bytes     b"ETBKEYS1"
+        count                   8 bytes     little endian
+    records:
+        count x (20 byte address, 32 byte private key)
+
+The records are in the order of the premines in the etb-config, with
+ranges expanded. This module only depends on the standard library.
+"""
+import mmap
+import os
+import pathlib
+from typing import Iterable, Iterator, Union
+
+_MAGIC = b"ETBKEYS1"
+HEADER_SIZE = 16
+RECORD_SIZE = 20 + 32
+
+
+def write_key_manifest(path: pathlib.Path, accounts: Iterable[tuple[str, str]]) -> int:
+    """Write the manifest, replacing the file atomically.
+
+    @param path: the manifest file.
+    @param accounts: (0x prefixed address, 0x prefixed private key) pairs.
+    @return: the number of records written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}")
+    count = 0
+    with open(tmp_file, "wb") as f:
+        f.write(_MAGIC + (0).to_bytes(8, "little"))
+        for address, private_key in accounts:
+            record = bytes.fromhex(address[2:]) + bytes.fromhex(private_key[2:])
+            if len(record) != RECORD_SIZE:
+                raise Exception(f"invalid account for the key manifest: {address}")
+            f.write(record)
+            count += 1
+        f.seek(8)
+        f.write(count.to_bytes(8, "little"))
+    os.replace(tmp_file, path)
+    return count
+
+
+class KeyManifest:
+    """Read only, memory mapped view of a key manifest."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path: pathlib.Path = path
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or header[:8] != _MAGIC:
+            self._file.close()
+            raise Exception(f"not a key manifest: {path}")
+        self.count: int = int.from_bytes(header[8:16], "little")
+        self._map: Union[mmap.mmap, None] = None
+        if self.count > 0:
+            self._map = mmap.mmap(
+                self._file.fileno(),
+                HEADER_SIZE + self.count * RECORD_SIZE,
+                access=mmap.ACCESS_READ,
+            )
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, ndx: int) -> tuple[str, str]:
+        """The (0x prefixed address, 0x prefixed private key) of record ndx."""
+        if not 0 <= ndx < self.count:
+            raise IndexError(f"key manifest index {ndx} out of range")
+        start = HEADER_SIZE + ndx * RECORD_SIZE
+        record = self._map[start: start + RECORD_SIZE]
+        return f"0x{record[:20].hex()}", f"0x{record[20:].hex()}"
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        for ndx in range(self.count):
+            yield self[ndx]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,170 @@
+"""On-disk cache for generated validator keystores.
+
+The keystores eth2-val-tools produces only depend on the validator
+mnemonic, the validator index range, the output format, the keystore
+KDF and (for prysm) the wallet password. Repeated inits of the same config can therefore
+reuse the output of an earlier run instead of re-deriving the keys.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import threading
+import time
+
+from .filesystem import clone_tree, tree_size
+
+
+class KeystoreCacheKey:
+    """The inputs that fully determine a set of generated keystores."""
+
+    def __init__(
+        self,
+        mnemonic: str,
+        min_ndx: int,
+        max_ndx: int,
+        prysm: bool = False,
+        prysm_password: str = "",
+        kdf: str = "default",
+    ):
+        self.mnemonic_hash: str = hashlib.sha256(
+            mnemonic.encode("utf-8")).hexdigest()
+        self.min_ndx: int = min_ndx
+        self.max_ndx: int = max_ndx
+        self.client_format: str = "prysm" if prysm else "standard"
+        self.kdf: str = kdf
+        self.prysm_password_hash: str = ""
+        if prysm:
+            self.prysm_password_hash = hashlib.sha256(
+                prysm_password.encode("utf-8")
+            ).hexdigest()
+
+    def __repr__(self):
+        return f"({self.client_format}: {self.min_ndx}-{self.max_ndx})"
+
+    def digest(self) -> str:
+        """The content address of the keystores for this key.
+
+        @return: hex digest
+        """
+        fields = [
+            self.mnemonic_hash,
+            self.min_ndx,
+            self.max_ndx,
+            self.client_format,
+            self.prysm_password_hash,
+        ]
+        # kept out of the digest for the default so existing entries stay valid.
+        if self.kdf != "default":
+            fields.append(self.kdf)
+        return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+class KeystoreCache:
+    """A size bounded, least recently used cache of keystore directories.
+
+    Each entry lives in cache_dir/<digest>/ and holds the untouched
+    output directory of eth2-val-tools. Entries are populated and
+    materialized via reflinks where possible (falling back to copies),
+    so a hit costs a directory walk instead of a key derivation. Entries
+    are never hardlinked: clients rewrite their keystores in place (e.g.
+    prysm's all-accounts.keystore.json), which would corrupt the cache.
+    """
+
+    entry_keystore_dir = "keystores"
+    entry_metadata_file = "metadata.json"
+
+    def __init__(self, cache_dir: pathlib.Path, max_size_bytes: int):
+        """
+        @param cache_dir: where to keep the cached keystores.
+        @param max_size_bytes: evict the least recently used entries past this size.
+        """
+        self.cache_dir: pathlib.Path = cache_dir
+        self.max_size_bytes: int = max_size_bytes
+        # keystores are written from several workers at once.
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: KeystoreCacheKey, dest: pathlib.Path) -> bool:
+        """Materialize the cached keystores for key into dest.
+
+        @param key: the keystores to fetch.
+        @param dest: where eth2-val-tools would have written them.
+        @return: True on a cache hit, False otherwise.
+        """
+        entry = self.cache_dir / key.digest()
+        if not (entry / self.entry_metadata_file).exists():
+            return False
+        try:
+            clone_tree(entry / self.entry_keystore_dir, dest, hardlink=False)
+        except (OSError, shutil.Error) as e:
+            logging.warning(f"failed to use cached keystores {key}: {e}")
+            shutil.rmtree(dest, ignore_errors=True)
+            return False
+        # mark the entry as recently used.
+        os.utime(entry)
+        return True
+
+    def put(self, key: KeystoreCacheKey, src: pathlib.Path):
+        """Add the keystores found in src to the cache.
+
+        @param key: the key the keystores were generated for.
+        @param src: the eth2-val-tools output directory.
+        @return:
+        """
+        entry = self.cache_dir / key.digest()
+        if entry.exists():
+            return
+        # build the entry aside and rename it in so readers never see a
+        # partially written entry.
+        tmp_entry = self.cache_dir / \
+            f".tmp-{key.digest()}-{os.getpid()}-{threading.get_ident()}"
+        clone_tree(src, tmp_entry / self.entry_keystore_dir, hardlink=False)
+        metadata = {
+            "min-ndx": key.min_ndx,
+            "max-ndx": key.max_ndx,
+            "client-format": key.client_format,
+            "kdf": key.kdf,
+            "size": tree_size(tmp_entry / self.entry_keystore_dir)[1],
+            "created": int(time.time()),
+        }
+        with open(tmp_entry / self.entry_metadata_file, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # someone else populated the entry first.
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in
+        max_size_bytes.
+
+        @return:
+        """
+        with self._lock:
+            entries: list[tuple[float, int, pathlib.Path]] = []
+            total_size = 0
+            for entry in self.cache_dir.iterdir():
+                metadata_file = entry / self.entry_metadata_file
+                if entry.name.startswith(".tmp-") or not metadata_file.exists():
+                    continue
+                try:
+                    with open(metadata_file, "r", encoding="utf-8") as f:
+                        size = int(json.load(f)["size"])
+                except (OSError, ValueError, KeyError):
+                    size = tree_size(entry)[1]
+                entries.append((entry.stat().st_mtime, size, entry))
+                total_size += size
+
+            entries.sort()
+            while total_size > self.max_size_bytes and len(entries) > 0:
+                _, size, entry = entries.pop(0)
+                logging.debug(f"evicting cached keystores: {entry.name}")
+                shutil.rmtree(entry, ignore_errors=True)
+                total_size -= size
+
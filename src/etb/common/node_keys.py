@@ -0,0 +1,88 @@
+"""Deterministic EL node keys and static peering files.
+
+Instead of asking every EL for its enode over the admin API once it is up
+and then calling admin_addPeer, the node keys are derived during init
+from the chain id and the instance name. As the IP address and p2p port
+of every instance are known up front, so are the enodes, and each client
+is handed its static peers in its native format before it starts:
+
+    geth:       nodekey (hex) and static-peers.toml (--config)
+    besu:       nodekey (0x hex) and static-nodes.json
+    nethermind: node.key.plain (raw bytes) and static-peers.txt
+                (comma separated, for --Network.StaticPeers)
+
+The node keys are only meant for testnets, anyone knowing the config can
+derive them.
+"""
+import hashlib
+import json
+import pathlib
+
+from py_ecc.secp256k1 import secp256k1
+
+STATIC_PEERING_FILES: dict[str, tuple[str, str]] = {
+    # client: (node key file, static peers file)
+    "geth": ("nodekey", "static-peers.toml"),
+    "besu": ("nodekey", "static-nodes.json"),
+    "nethermind": ("node.key.plain", "static-peers.txt"),
+}
+
+
+def derive_node_key(chain_id: int, name: str) -> bytes:
+    """The secp256k1 node key of an EL instance.
+
+    @param chain_id: the chain id of the testnet.
+    @param name: the name of the client instance.
+    @return: the 32 byte private key.
+    """
+    counter = 0
+    while True:
+        digest = hashlib.sha256(
+            f"etb-node-key/{chain_id}/{name}/{counter}".encode("utf-8")
+        ).digest()
+        # valid keys are in [1, N)
+        if 0 < int.from_bytes(digest, "big") < secp256k1.N:
+            return digest
+        counter += 1
+
+
+def node_public_key(node_key: bytes) -> str:
+    """The 64 byte public key of a node key, hex encoded, as used in enodes."""
+    x, y = secp256k1.privtopub(node_key)
+    return x.to_bytes(32, "big").hex() + y.to_bytes(32, "big").hex()
+
+
+def enode(node_key: bytes, ip_address: str, p2p_port: int) -> str:
+    return f"enode://{node_public_key(node_key)}@{ip_address}:{p2p_port}"
+
+
+def write_static_peering_files(
+    client: str, el_dir: pathlib.Path, node_key: bytes, static_peers: list[str]
+):
+    """Write the node key and static peers of an EL in its native format.
+
+    @param client: the execution client.
+    @param el_dir: the datadir of the client.
+    @param node_key: the node key of the client.
+    @param static_peers: the enodes the client should connect to.
+    @return:
+    """
+    if client not in STATIC_PEERING_FILES:
+        raise Exception(f"static peering is not supported for {client}")
+    node_key_file, static_peers_file = STATIC_PEERING_FILES[client]
+    el_dir.mkdir(parents=True, exist_ok=True)
+    if client == "nethermind":
+        with open(el_dir / node_key_file, "wb") as f:
+            f.write(node_key)
+        with open(el_dir / static_peers_file, "w", encoding="utf-8") as f:
+            f.write(",".join(static_peers))
+        return
+
+    with open(el_dir / node_key_file, "w", encoding="utf-8") as f:
+        f.write(node_key.hex() if client == "geth" else f"0x{node_key.hex()}")
+    with open(el_dir / static_peers_file, "w", encoding="utf-8") as f:
+        if client == "geth":
+            f.write("[Node.P2P]\n")
+            f.write(f"StaticNodes = {json.dumps(static_peers)}\n")
+        else:
+            json.dump(static_peers, f)
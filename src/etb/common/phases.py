@@ -0,0 +1,176 @@
+"""A small executor for a DAG of phases.
+
+Each phase names the phases it depends on and is started as soon as all
+of them have finished, so independent phases run concurrently on a
+thread pool. Phases get the results of all finished phases, e.g.
+
+    dag = PhaseDAG("bootstrap", timeline)
+    dag.add("el-genesis", lambda results: write_genesis())
+    dag.add("el-signal", lambda results: signal(), deps=["el-genesis"])
+    results = dag.run()
+    logging.info(dag.describe_critical_path())
+
+Dependencies have to be added before the phases that depend on them,
+which rules out cycles. If a phase fails no new phases are started, the
+running ones are waited on and the first exception is re-raised.
+
+The critical path is the chain of phases that determined when the last
+phase finished: starting from it we repeatedly step to the dependency
+that finished last.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Union
+
+from .timeline import Timeline
+
+
+class Phase:
+    """A named unit of work and the phases it has to wait for."""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[dict[str, Any]], Any],
+        deps: list[str],
+    ):
+        self.name: str = name
+        self.run: Callable[[dict[str, Any]], Any] = run
+        self.deps: list[str] = deps
+        self.start: Union[float, None] = None
+        self.end: Union[float, None] = None
+
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+class PhaseDAG:
+    """Runs phases as soon as their dependencies are done."""
+
+    def __init__(
+        self,
+        name: str,
+        timeline: Union[Timeline, None] = None,
+        max_workers: Union[int, None] = None,
+    ):
+        """
+        @param name: name of the dag, used for logging.
+        @param timeline: if given each phase is recorded as a span.
+        @param max_workers: max phases to run at once (default: no limit)
+        """
+        self.name: str = name
+        self.timeline: Union[Timeline, None] = timeline
+        self.max_workers: Union[int, None] = max_workers
+        self.phases: dict[str, Phase] = {}
+        self._start: Union[float, None] = None
+        self._end: Union[float, None] = None
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[dict[str, Any]], Any],
+        deps: Union[list[str], None] = None,
+    ) -> Phase:
+        """Add a phase.
+
+        @param name: unique name of the phase.
+        @param run: called with the results of the finished phases, its
+            return value is the result of this phase.
+        @param deps: phases that have to finish first.
+        @return: the phase.
+        """
+        deps = deps if deps is not None else []
+        if name in self.phases:
+            raise Exception(f"duplicate phase {name} in {self.name}")
+        for dep in deps:
+            if dep not in self.phases:
+                raise Exception(f"phase {name} depends on unknown phase {dep}")
+        phase = Phase(name, run, deps)
+        self.phases[name] = phase
+        return phase
+
+    def _run_phase(self, phase: Phase, results: dict[str, Any]) -> Any:
+        phase.start = time.monotonic()
+        try:
+            if self.timeline is not None:
+                with self.timeline.span(phase.name):
+                    return phase.run(results)
+            return phase.run(results)
+        finally:
+            phase.end = time.monotonic()
+
+    def run(self) -> dict[str, Any]:
+        """Run all the phases.
+
+        @return: phase name -> result.
+        """
+        results: dict[str, Any] = {}
+        pending: dict[str, Phase] = dict(self.phases)
+        running: dict[Future, Phase] = {}
+        error: Union[BaseException, None] = None
+        max_workers = self.max_workers or max(1, len(self.phases))
+        self._start = time.monotonic()
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=self.name
+        ) as executor:
+            while True:
+                if error is None:
+                    for phase in list(pending.values()):
+                        if len(running) >= max_workers:
+                            break
+                        if all(dep in results for dep in phase.deps):
+                            logging.debug(f"[{self.name}] starting {phase.name}")
+                            # the phase sees a snapshot of the results so far.
+                            running[executor.submit(
+                                self._run_phase, phase, dict(results)
+                            )] = phase
+                            del pending[phase.name]
+                if len(running) == 0:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase = running.pop(future)
+                    try:
+                        results[phase.name] = future.result()
+                    except BaseException as e:
+                        logging.error(f"[{self.name}] phase {phase.name} failed: {e}")
+                        if error is None:
+                            error = e
+        self._end = time.monotonic()
+        if error is not None:
+            raise error
+        return results
+
+    def critical_path(self) -> list[Phase]:
+        """The chain of phases that ended with the last phase to finish.
+
+        @return: the phases on the critical path, in order.
+        """
+        finished = [phase for phase in self.phases.values() if phase.end is not None]
+        if len(finished) == 0:
+            return []
+        path = [max(finished, key=lambda phase: phase.end)]
+        while True:
+            deps = [
+                self.phases[dep] for dep in path[-1].deps
+                if self.phases[dep].end is not None
+            ]
+            if len(deps) == 0:
+                break
+            path.append(max(deps, key=lambda phase: phase.end))
+        return list(reversed(path))
+
+    def describe_critical_path(self) -> str:
+        """The critical path with the time spent in and between its phases."""
+        path = self.critical_path()
+        if len(path) == 0 or self._start is None:
+            return f"{self.name}: no phases finished"
+        wall = (self._end or time.monotonic()) - self._start
+        busy = sum(phase.duration() for phase in path)
+        return (
+            f"{self.name} critical path ({wall:.3f}s wall, {busy:.3f}s in phases): "
+            + " -> ".join(f"{phase.name} ({phase.duration():.3f}s)" for phase in path)
+        )
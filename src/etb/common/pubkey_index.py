@@ -0,0 +1,206 @@
+"""A persistent validator index <-> pubkey mapping.
+
+Deriving a validator pubkey from the mnemonic means three EIP-2333 child
+derivations and a BLS scalar multiplication, so instead of re-deriving
+them wherever they are needed we keep them in a flat file:
+
+    header (48 bytes):
+        magic                   8 bytes     b"ETBPUBK1"
+        sha256(mnemonic)        32 bytes
+        count                   8 bytes     little endian
+    pubkeys:
+        count x 48 byte compressed BLS pubkeys, in validator index order.
+
+The fixed width entries are memory mapped, so the pubkey of an index is a
+slice of the file. The count in the header is only updated once the
+pubkeys it covers are on disk, so an interrupted build is picked up where
+it left off, and growing the validator count only derives the new keys.
+"""
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
+
+_MAGIC = b"ETBPUBK1"
+HEADER_SIZE = 48
+PUBKEY_SIZE = 48
+
+
+def _mnemonic_hash(mnemonic: str) -> bytes:
+    return hashlib.sha256(mnemonic.encode("utf-8")).digest()
+
+
+def _derive_pubkeys(validator_root_sk: int, min_ndx: int, max_ndx: int) -> bytes:
+    """Process pool worker: the concatenated pubkeys of [min_ndx, max_ndx)."""
+    # only the builder needs the crypto dependencies.
+    from .validator_keys import derive_validator_sk, sk_to_pubkey
+
+    return b"".join(
+        sk_to_pubkey(derive_validator_sk(validator_root_sk, ndx))
+        for ndx in range(min_ndx, max_ndx)
+    )
+
+
+class ValidatorPubkeyIndex:
+    """The memory mapped pubkey file, see the module docstring."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path: pathlib.Path = path
+        self.mnemonic_hash: bytes = b""
+        self.count: int = 0
+        self._file = None
+        self._map: Union[mmap.mmap, None] = None
+        # pubkey -> index, built on the first reverse lookup.
+        self._indices: Union[dict[bytes, int], None] = None
+
+    def __len__(self):
+        return self.count
+
+    def _read_header(self) -> tuple[bytes, int]:
+        """The (mnemonic hash, count) of the file on disk, count 0 for a
+        missing or unusable file."""
+        if not self.path.exists():
+            return b"", 0
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            size = os.fstat(f.fileno()).st_size
+        if len(header) != HEADER_SIZE or header[:8] != _MAGIC:
+            logging.warning(f"ignoring invalid pubkey index: {self.path}")
+            return b"", 0
+        count = int.from_bytes(header[40:48], "little")
+        if size < HEADER_SIZE + count * PUBKEY_SIZE:
+            logging.warning(f"ignoring truncated pubkey index: {self.path}")
+            return b"", 0
+        return header[8:40], count
+
+    def build(
+        self,
+        mnemonic: str,
+        count: int,
+        max_workers: Union[int, None] = None,
+        chunk_size: int = 32,
+    ) -> int:
+        """Make sure the index holds the first count validators of mnemonic.
+
+        Existing entries for the same mnemonic are kept, only the missing
+        ones are derived (over a process pool).
+        @param mnemonic: the validator mnemonic.
+        @param count: number of validators to index.
+        @param max_workers: size of the process pool. (default: cpu count)
+        @param chunk_size: validators derived per task.
+        @return: the number of pubkeys that were derived.
+        """
+        self.close()
+        mnemonic_hash = _mnemonic_hash(mnemonic)
+        stored_hash, existing = self._read_header()
+        if stored_hash != mnemonic_hash:
+            existing = 0
+        if existing >= count:
+            logging.debug(f"pubkey index {self.path} already holds {existing} pubkeys")
+            return 0
+
+        logging.info(f"deriving validator pubkeys {existing} to {count} into {self.path}")
+        from .validator_keys import derive_validator_root_sk
+
+        validator_root_sk = derive_validator_root_sk(mnemonic)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        mode = "r+b" if existing > 0 else "w+b"
+        # may be built alongside other threads, forking while those hold
+        # locks can deadlock the workers.
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _derive_pubkeys,
+                    validator_root_sk,
+                    start,
+                    min(start + chunk_size, count),
+                )
+                for start in range(existing, count, chunk_size)
+            ]
+            with open(self.path, mode) as f:
+                if existing == 0:
+                    f.write(self._header(mnemonic_hash, 0))
+                f.seek(HEADER_SIZE + existing * PUBKEY_SIZE)
+                f.truncate()
+                for future in futures:
+                    f.write(future.result())
+                f.flush()
+                os.fsync(f.fileno())
+                # commit the new entries.
+                f.seek(0)
+                f.write(self._header(mnemonic_hash, count))
+                f.flush()
+                os.fsync(f.fileno())
+        return count - existing
+
+    @staticmethod
+    def _header(mnemonic_hash: bytes, count: int) -> bytes:
+        return _MAGIC + mnemonic_hash + count.to_bytes(8, "little")
+
+    def open(self, mnemonic: Union[str, None] = None):
+        """Map the index into memory.
+
+        @param mnemonic: if given, check the index was built from it.
+        @return:
+        """
+        self.close()
+        self.mnemonic_hash, self.count = self._read_header()
+        if self.count == 0:
+            raise Exception(f"no usable pubkey index at {self.path}")
+        if mnemonic is not None and self.mnemonic_hash != _mnemonic_hash(mnemonic):
+            raise Exception(f"pubkey index {self.path} is for another mnemonic")
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(
+            self._file.fileno(),
+            HEADER_SIZE + self.count * PUBKEY_SIZE,
+            access=mmap.ACCESS_READ,
+        )
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._indices = None
+
+    def pubkey(self, ndx: int) -> bytes:
+        """The pubkey of validator ndx.
+
+        @param ndx: the validator index.
+        @return: the 48 byte pubkey.
+        """
+        if self._map is None:
+            self.open()
+        if not 0 <= ndx < self.count:
+            raise IndexError(f"validator index {ndx} not in the pubkey index")
+        start = HEADER_SIZE + ndx * PUBKEY_SIZE
+        return self._map[start: start + PUBKEY_SIZE]
+
+    def index(self, pubkey: Union[bytes, str]) -> int:
+        """The validator index of a pubkey.
+
+        @param pubkey: the pubkey as bytes or (0x prefixed) hex.
+        @return: the validator index.
+        """
+        if isinstance(pubkey, str):
+            pubkey = bytes.fromhex(pubkey[2:] if pubkey.startswith("0x") else pubkey)
+        if self._indices is None:
+            if self._map is None:
+                self.open()
+            self._indices = {
+                self._map[start: start + PUBKEY_SIZE]: ndx
+                for ndx, start in enumerate(
+                    range(HEADER_SIZE, HEADER_SIZE + self.count * PUBKEY_SIZE, PUBKEY_SIZE)
+                )
+            }
+        if pubkey not in self._indices:
+            raise KeyError(f"pubkey 0x{pubkey.hex()} not in the pubkey index")
+        return self._indices[pubkey]
@@ -0,0 +1,170 @@
+"""A lightweight recorder of timed phases.
+
+Spans are measured with the monotonic clock and may be nested, e.g.
+
+    timeline = Timeline("bootstrap-testnet")
+    with timeline.span("el-genesis"):
+        with timeline.span("geth-genesis"):
+            ...
+    timeline.write(json_file, trace_file)
+    logging.info(timeline.summary())
+
+The timeline is written both as plain json and in the chrome trace event
+format, which can be loaded into chrome://tracing or https://ui.perfetto.dev
+"""
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Union
+
+
+class Span:
+    """A single timed phase."""
+
+    def __init__(self, name: str, parent: Union["Span", None], args: dict):
+        self.name: str = name
+        self.parent: Union[Span, None] = parent
+        self.depth: int = 0 if parent is None else parent.depth + 1
+        self.args: dict = args
+        self.thread: str = threading.current_thread().name
+        self.thread_id: int = threading.get_ident()
+        self.start: float = time.monotonic()
+        self.end: Union[float, None] = None
+        self.failed: bool = False
+
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.monotonic()
+        return end - self.start
+
+
+class Timeline:
+    """Records (possibly nested) spans of a run."""
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.spans: list[Span] = []
+        # extra json serializable info about the run, e.g. its critical path.
+        self.metadata: dict = {}
+        # the wall clock time the monotonic clock origin maps to.
+        self._wall_start: float = time.time()
+        self._monotonic_start: float = time.monotonic()
+        self._lock = threading.Lock()
+        # each thread nests its spans independently.
+        self._local = threading.local()
+
+    def _stack(self) -> list[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Time the body of the with statement.
+
+        @param name: the name of the phase.
+        @param args: extra info to attach to the span.
+        """
+        stack = self._stack()
+        span = Span(name, stack[-1] if len(stack) > 0 else None, args)
+        with self._lock:
+            self.spans.append(span)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            span.end = time.monotonic()
+            stack.pop()
+            logging.debug(f"[timeline] {name} took {span.duration():.3f}s")
+
+    def _relative(self, t: float) -> float:
+        return t - self._monotonic_start
+
+    def to_dict(self) -> dict:
+        """The timeline as json serializable dict, times are in seconds
+        relative to the creation of the timeline."""
+        return {
+            "name": self.name,
+            "start-time": self._wall_start,
+            "metadata": self.metadata,
+            "spans": [
+                {
+                    "name": span.name,
+                    "parent": span.parent.name if span.parent is not None else None,
+                    "depth": span.depth,
+                    "thread": span.thread,
+                    "start": self._relative(span.start),
+                    "end": self._relative(span.start + span.duration()),
+                    "duration": span.duration(),
+                    "failed": span.failed,
+                    "args": span.args,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """The timeline in the chrome trace event format."""
+        events = []
+        pid = os.getpid()
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": self.name,
+                    "ph": "X",
+                    "ts": int(self._relative(span.start) * 1e6),
+                    "dur": int(span.duration() * 1e6),
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {**span.args, "failed": span.failed},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, json_file: pathlib.Path, trace_file: pathlib.Path):
+        """Write the timeline to disk.
+
+        @param json_file: where to write the plain json timeline.
+        @param trace_file: where to write the chrome trace.
+        @return:
+        """
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(trace_file, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self) -> str:
+        """A table of all spans, indented by depth, with their share of the
+        total time. Spans may run concurrently, so the total is the wall time
+        from the first start to the last end, and the shares of concurrent
+        spans can add up to more than 100%."""
+        total = 0.0
+        if len(self.spans) > 0:
+            total = max(span.start + span.duration() for span in self.spans) - min(
+                span.start for span in self.spans
+            )
+        name_width = max(
+            [len(self.name)]
+            + [len(span.name) + 2 * span.depth for span in self.spans]
+        )
+        lines = [
+            f"{self.name} timeline:",
+            f"  {'phase'.ljust(name_width)}  {'start':>9}  {'duration':>9}  {'share':>6}",
+        ]
+        for span in self.spans:
+            share = 100 * span.duration() / total if total > 0 else 0
+            name = ("  " * span.depth + span.name).ljust(name_width)
+            lines.append(
+                f"  {name}  {self._relative(span.start):>8.3f}s  "
+                f"{span.duration():>8.3f}s  {share:>5.1f}%"
+                + (" (failed)" if span.failed else "")
+            )
+        lines.append(f"  {'total'.ljust(name_width)}  {'':>9}  {total:>8.3f}s")
+        return "\n".join(lines)
@@ -0,0 +1,155 @@
+"""Peering topologies for the testnet clients.
+
+A topology is a set of undirected edges between nodes, given as index
+pairs (i, j) with i < j into the list of nodes being peered. A single
+connection is enough for a pair of peers to talk to each other, so each
+edge only has to be established from one side.
+
+Supported topologies:
+    - full-mesh: every node peers with every other node.
+    - ring: every node peers with its two neighbours.
+    - random-k: a connected random graph where every node gets close to
+                degree peers.
+    - collection-clusters: full mesh within each client collection, the
+                clusters are joined in a ring by their first nodes.
+"""
+import random
+from typing import Any, Hashable, Union
+
+TOPOLOGIES = ["full-mesh", "ring", "random-k", "collection-clusters"]
+
+Edge = tuple[int, int]
+
+
+def _edge(i: int, j: int) -> Edge:
+    return (i, j) if i < j else (j, i)
+
+
+def full_mesh(num_nodes: int) -> set[Edge]:
+    return {(i, j) for i in range(num_nodes) for j in range(i + 1, num_nodes)}
+
+
+def ring(num_nodes: int) -> set[Edge]:
+    if num_nodes < 3:
+        return full_mesh(num_nodes)
+    return {_edge(i, (i + 1) % num_nodes) for i in range(num_nodes)}
+
+
+def random_k(num_nodes: int, degree: int, seed: int = 0) -> set[Edge]:
+    """A random graph where each node has close to degree peers.
+
+    The graph starts out as a ring, so it is always connected, and random
+    pairs of nodes below the target degree are then joined until no such
+    pair is left.
+    @param num_nodes: number of nodes.
+    @param degree: target number of peers per node.
+    @param seed: seed for the rng so topologies are reproducible.
+    @return: the edges.
+    """
+    if degree >= num_nodes - 1:
+        return full_mesh(num_nodes)
+    rng = random.Random(seed)
+    edges = ring(num_nodes)
+    degrees = [0] * num_nodes
+    for i, j in edges:
+        degrees[i] += 1
+        degrees[j] += 1
+    while True:
+        candidates = [n for n in range(num_nodes) if degrees[n] < degree]
+        rng.shuffle(candidates)
+        added = False
+        for i in candidates:
+            if degrees[i] >= degree:
+                continue
+            options = [
+                j for j in candidates
+                if j != i and degrees[j] < degree and _edge(i, j) not in edges
+            ]
+            if len(options) == 0:
+                continue
+            j = rng.choice(options)
+            edges.add(_edge(i, j))
+            degrees[i] += 1
+            degrees[j] += 1
+            added = True
+        if not added:
+            return edges
+
+
+def clusters(groups: list[Any]) -> set[Edge]:
+    """Full mesh within each group, the groups are joined by a ring over
+    the first node of every group.
+
+    @param groups: the group of every node, e.g. its client collection.
+    @return: the edges.
+    """
+    members: dict[Any, list[int]] = {}
+    for ndx, group in enumerate(groups):
+        members.setdefault(group, []).append(ndx)
+    edges: set[Edge] = set()
+    for group_members in members.values():
+        for i, j in full_mesh(len(group_members)):
+            edges.add(_edge(group_members[i], group_members[j]))
+    heads = [group_members[0] for group_members in members.values()]
+    for i, j in ring(len(heads)):
+        edges.add(_edge(heads[i], heads[j]))
+    return edges
+
+
+def build_topology(
+    topology: str,
+    num_nodes: int,
+    degree: int = 4,
+    groups: Union[list[Hashable], None] = None,
+    seed: int = 0,
+) -> set[Edge]:
+    """Build the edges of a named topology.
+
+    @param topology: one of TOPOLOGIES.
+    @param num_nodes: number of nodes.
+    @param degree: target peers per node for random-k.
+    @param groups: group of each node for collection-clusters.
+    @param seed: rng seed for random-k.
+    @return: the edges as (i, j) index pairs with i < j.
+    """
+    if topology == "full-mesh":
+        return full_mesh(num_nodes)
+    if topology == "ring":
+        return ring(num_nodes)
+    if topology == "random-k":
+        return random_k(num_nodes, degree, seed)
+    if topology == "collection-clusters":
+        if groups is None or len(groups) != num_nodes:
+            raise Exception("collection-clusters requires a group per node")
+        return clusters(groups)
+    raise Exception(f"unknown topology: {topology}, expected one of {TOPOLOGIES}")
+
+
+def describe_graph(num_nodes: int, edges: set[Edge]) -> dict:
+    """Summary statistics of a peer graph.
+
+    @return: dict with the edge count, min/max/avg degree and the number
+        of connected components.
+    """
+    degrees = [0] * num_nodes
+    # union find for the connected components.
+    parents = list(range(num_nodes))
+
+    def _find(n: int) -> int:
+        while parents[n] != n:
+            parents[n] = parents[parents[n]]
+            n = parents[n]
+        return n
+
+    for i, j in edges:
+        degrees[i] += 1
+        degrees[j] += 1
+        parents[_find(i)] = _find(j)
+    return {
+        "nodes": num_nodes,
+        "edges": len(edges),
+        "min-degree": min(degrees, default=0),
+        "max-degree": max(degrees, default=0),
+        "avg-degree": sum(degrees) / num_nodes if num_nodes > 0 else 0,
+        "components": len({_find(n) for n in range(num_nodes)}),
+    }
@@ -1,6 +1,16 @@
 """Various utility functions that are used throughout common applications."""
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
 
+from eth_account.hdaccount import key_from_seed, seed_from_mnemonic
 from web3.auto import w3
 
 from ..config.etb_config import FilesConfig
@@ -44,6 +54,240 @@ def create_logger(
         logging.root.handlers.append(file_handler)
 
 
+def _derive_account_batch(
+    seed: bytes, account_paths: list[str]
+) -> list[tuple[str, str]]:
+    """Derive the accounts of several paths of a seed, also used as a
+    process pool worker.
+
+    @return: (checksum address, 0x prefixed private key) per path.
+    """
+    accounts = []
+    for account_path in account_paths:
+        acct = w3.eth.account.from_key(key_from_seed(seed, account_path))
+        accounts.append((acct.address, acct.key.hex()))
+    return accounts
+
+
+class AccountDerivationCache:
+    """Caches accounts derived from a mnemonic via BIP-32/BIP-44 paths.
+
+    Deriving an account means running the mnemonic through PBKDF2 (2048
+    rounds of HMAC-SHA512) and then walking the derivation path. The seed is
+    cached per (mnemonic, passphrase) and the resulting accounts per
+    (mnemonic, path, passphrase) in an in-memory LRU.
+
+    Optionally the accounts are persisted so that other processes (e.g. the
+    tx_spammer) can reuse them: one json file per (mnemonic, passphrase) in
+    cache_dir, named and keyed by hashes of the inputs, so the mnemonic
+    itself is never written out. The private keys are, in plaintext, so the
+    files are only written if cache_dir exists, which init only creates
+    when asked to (--persist-accounts). Each file holds at most max_entries
+    accounts and only the max_files most recently written files are kept.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[pathlib.Path, None] = None,
+        max_entries: int = 4096,
+        max_seeds: int = 8,
+        max_files: int = 8,
+    ):
+        """
+        @param cache_dir: optional dir to persist the accounts to, if it exists.
+        @param max_entries: max number of accounts to keep in memory and per file.
+        @param max_seeds: max number of mnemonic seeds to keep in memory.
+        @param max_files: max number of mnemonics to keep on disk.
+        """
+        self.cache_dir: Union[pathlib.Path, None] = cache_dir
+        self.max_entries: int = max_entries
+        self.max_seeds: int = max_seeds
+        self.max_files: int = max_files
+        self._accounts: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._seeds: OrderedDict[str, bytes] = OrderedDict()
+        # file key -> the accounts persisted in that file.
+        self._disk: dict[str, dict[str, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(*fields: str) -> str:
+        return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+    def _seed(self, mnemonic: str, passphrase: str) -> bytes:
+        key = self._key(mnemonic, passphrase)
+        if key in self._seeds:
+            self._seeds.move_to_end(key)
+            return self._seeds[key]
+        seed = seed_from_mnemonic(mnemonic, passphrase)
+        self._seeds[key] = seed
+        while len(self._seeds) > self.max_seeds:
+            self._seeds.popitem(last=False)
+        return seed
+
+    def _persisted(self) -> bool:
+        return self.cache_dir is not None and self.cache_dir.is_dir()
+
+    def _disk_file(self, file_key: str) -> pathlib.Path:
+        return self.cache_dir / f"{file_key}.json"
+
+    def _read_disk_file(self, file_key: str) -> dict[str, list[str]]:
+        try:
+            with open(self._disk_file(file_key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(
+                f"ignoring unreadable account cache {self._disk_file(file_key)}: {e}"
+            )
+            return {}
+
+    def _load_disk(self, file_key: str) -> dict[str, list[str]]:
+        if file_key not in self._disk:
+            self._disk[file_key] = (
+                self._read_disk_file(file_key) if self._persisted() else {}
+            )
+        return self._disk[file_key]
+
+    def _store_disk(self, file_key: str, new_entries: dict[str, list[str]]):
+        """Merge new_entries into the file of a mnemonic. Other processes may
+        have written to it in the meantime, so re-read it first, and replace
+        it atomically. Only the file of this mnemonic is rewritten."""
+        if not self._persisted() or len(new_entries) == 0:
+            return
+        disk = self._read_disk_file(file_key)
+        disk.update(new_entries)
+        # dicts keep their insertion order, so this drops the oldest entries.
+        disk = dict(list(disk.items())[-self.max_entries:])
+        self._disk[file_key] = disk
+        cache_file = self._disk_file(file_key)
+        tmp_file = cache_file.with_name(
+            f".{cache_file.name}.{os.getpid()}.{threading.get_ident()}"
+        )
+        try:
+            # private keys, so only readable by us.
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(disk, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.warning(f"failed to write account cache {cache_file}: {e}")
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove the least recently written files past max_files."""
+        try:
+            files = sorted(
+                self.cache_dir.glob("*.json"), key=lambda f: f.stat().st_mtime
+            )
+        except OSError:
+            return
+        for stale in files[: max(0, len(files) - self.max_files)]:
+            stale.unlink(missing_ok=True)
+            self._disk.pop(stale.stem, None)
+
+    def derive_accounts(
+        self,
+        mnemonic: str,
+        account_paths: list[str],
+        passphrase: str = "",
+        max_workers: Union[int, None] = None,
+        parallel_threshold: int = 64,
+    ) -> list[tuple[str, str]]:
+        """Derive the accounts for several paths of a mnemonic.
+
+        @param mnemonic: the account mnemonic.
+        @param account_paths: the derivation paths, e.g. m/44'/60'/0'/0/0
+        @param passphrase: the (BIP-39) mnemonic passphrase.
+        @param max_workers: size of the process pool used for large batches.
+        @param parallel_threshold: derive over a process pool once this many
+            accounts are missing from the cache.
+        @return: (checksum address, 0x prefixed private key) per path.
+        """
+        accounts: list[Union[tuple[str, str], None]] = []
+        # index into accounts -> path, for the accounts we have to derive.
+        missing: dict[int, str] = {}
+        new_entries: dict[str, list[str]] = {}
+        file_key = self._key(mnemonic, passphrase)
+        with self._lock:
+            for account_path in account_paths:
+                key = self._key(mnemonic, account_path, passphrase)
+                if key in self._accounts:
+                    self._accounts.move_to_end(key)
+                    accounts.append(self._accounts[key])
+                    continue
+                disk = self._load_disk(file_key)
+                if key in disk:
+                    account = tuple(disk[key])
+                    self._accounts[key] = account
+                    accounts.append(account)
+                else:
+                    missing[len(accounts)] = account_path
+                    accounts.append(None)
+
+            if len(missing) > 0:
+                seed = self._seed(mnemonic, passphrase)
+                paths = list(missing.values())
+                if len(paths) >= parallel_threshold:
+                    chunk_size = 32
+                    # callers may run alongside other threads, forking
+                    # while those hold locks can deadlock the workers.
+                    with ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    ) as executor:
+                        derived = [
+                            account
+                            for batch in executor.map(
+                                _derive_account_batch,
+                                [seed] * ((len(paths) + chunk_size - 1) // chunk_size),
+                                [
+                                    paths[i: i + chunk_size]
+                                    for i in range(0, len(paths), chunk_size)
+                                ],
+                            )
+                            for account in batch
+                        ]
+                else:
+                    derived = _derive_account_batch(seed, paths)
+                for (ndx, account_path), account in zip(missing.items(), derived):
+                    key = self._key(mnemonic, account_path, passphrase)
+                    new_entries[key] = list(account)
+                    self._accounts[key] = account
+                    accounts[ndx] = account
+
+            while len(self._accounts) > self.max_entries:
+                self._accounts.popitem(last=False)
+            self._store_disk(file_key, new_entries)
+        return accounts
+
+    def derive_account(
+        self, mnemonic: str, account_path: str, passphrase: str = ""
+    ) -> tuple[str, str]:
+        """Derive a single account, see derive_accounts."""
+        return self.derive_accounts(mnemonic, [account_path], passphrase)[0]
+
+
+_account_cache: Union[AccountDerivationCache, None] = None
+_account_cache_lock = threading.Lock()
+
+
+def get_account_cache() -> AccountDerivationCache:
+    """The process wide AccountDerivationCache. It is persisted in the
+    account cache dir if init created it, see AccountDerivationCache.
+
+    @return: the shared cache.
+    """
+    global _account_cache
+    with _account_cache_lock:
+        if _account_cache is None:
+            _account_cache = AccountDerivationCache(
+                cache_dir=FilesConfig().account_cache_dir
+            )
+        return _account_cache
+
+
 class PremineKey:
     """
     Class that represents a premine key.
@@ -69,9 +313,6 @@ class PremineKey:
         self.mnemonic: str = mnemonic
         self.account: str = account
         self.passphrase: str = passphrase
-        w3.eth.account.enable_unaudited_hdwallet_features()
-        acct = w3.eth.account.from_mnemonic(
-            mnemonic, account_path=self.account, passphrase=passphrase
+        self.public_key, self.private_key = get_account_cache().derive_account(
+            mnemonic, self.account, passphrase
         )
-        self.public_key: str = acct.address
-        self.private_key = acct.key.hex()
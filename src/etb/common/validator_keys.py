@@ -0,0 +1,478 @@
+"""In-process validator key derivation and keystore generation.
+
+Implements the pieces of the validator key tooling the bootstrapper
+needs without shelling out to eth2-val-tools:
+    - EIP-2333: BLS12-381 key derivation from a mnemonic seed.
+    - EIP-2334: the validator signing key path m/12381/3600/<i>/0/0.
+    - EIP-2335: the keystore format consumed by all CL clients.
+
+The mnemonic seed and the m/12381/3600 parent key are derived once per
+mnemonic, the per validator work (child derivation, pubkey and keystore
+encryption) is fanned out over a process pool.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import pathlib
+import secrets
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
+
+from Crypto.Cipher import AES
+from py_ecc.bls import G2ProofOfPossession
+
+# order of the BLS12-381 curve.
+BLS_CURVE_ORDER = (
+    52435875175126190479447740508185965837690552500527637822603658699938581184513
+)
+# EIP-2334 purpose and coin type
+VALIDATOR_PATH_PREFIX = "m/12381/3600"
+
+
+def mnemonic_to_seed(mnemonic: str, passphrase: str = "") -> bytes:
+    """BIP-39 mnemonic to seed.
+
+    @param mnemonic: the mnemonic.
+    @param passphrase: optional passphrase.
+    @return: 64 byte seed.
+    """
+    mnemonic = unicodedata.normalize("NFKD", mnemonic)
+    salt = unicodedata.normalize("NFKD", "mnemonic" + passphrase)
+    return hashlib.pbkdf2_hmac(
+        "sha512", mnemonic.encode("utf-8"), salt.encode("utf-8"), 2048
+    )
+
+
+def _hkdf(salt: bytes, ikm: bytes, info: bytes, length: int) -> bytes:
+    """HKDF-SHA256 (RFC 5869)."""
+    prk = hmac.new(salt, ikm, hashlib.sha256).digest()
+    okm = b""
+    block = b""
+    counter = 1
+    while len(okm) < length:
+        block = hmac.new(prk, block + info + bytes([counter]),
+                         hashlib.sha256).digest()
+        okm += block
+        counter += 1
+    return okm[:length]
+
+
+def _ikm_to_lamport_sk(ikm: bytes, salt: bytes) -> list[bytes]:
+    okm = _hkdf(salt, ikm, b"", 32 * 255)
+    return [okm[i: i + 32] for i in range(0, 32 * 255, 32)]
+
+
+def _parent_sk_to_lamport_pk(parent_sk: int, index: int) -> bytes:
+    salt = index.to_bytes(4, "big")
+    ikm = parent_sk.to_bytes(32, "big")
+    not_ikm = (parent_sk ^ (2**256 - 1)).to_bytes(32, "big")
+    lamport_sks = _ikm_to_lamport_sk(
+        ikm, salt) + _ikm_to_lamport_sk(not_ikm, salt)
+    lamport_pks = b"".join(hashlib.sha256(sk).digest() for sk in lamport_sks)
+    return hashlib.sha256(lamport_pks).digest()
+
+
+def _hkdf_mod_r(ikm: bytes, key_info: bytes = b"") -> int:
+    length = 48
+    salt = b"BLS-SIG-KEYGEN-SALT-"
+    sk = 0
+    while sk == 0:
+        salt = hashlib.sha256(salt).digest()
+        okm = _hkdf(salt, ikm + b"\x00", key_info +
+                    length.to_bytes(2, "big"), length)
+        sk = int.from_bytes(okm, "big") % BLS_CURVE_ORDER
+    return sk
+
+
+def derive_master_sk(seed: bytes) -> int:
+    """EIP-2333 master secret key from a seed.
+
+    @param seed: at least 32 bytes of seed.
+    @return: the master secret key.
+    """
+    if len(seed) < 32:
+        raise ValueError("seed must be at least 32 bytes")
+    return _hkdf_mod_r(seed)
+
+
+def derive_child_sk(parent_sk: int, index: int) -> int:
+    """EIP-2333 child secret key.
+
+    @param parent_sk: the parent secret key.
+    @param index: the child index.
+    @return: the child secret key.
+    """
+    return _hkdf_mod_r(_parent_sk_to_lamport_pk(parent_sk, index))
+
+
+def derive_path(parent_sk: int, path: str) -> int:
+    """Derive the secret key at path relative to parent_sk.
+
+    @param parent_sk: the key the path starts at (the master key for m/...)
+    @param path: e.g. m/12381/3600/0/0/0
+    @return: the secret key.
+    """
+    nodes = path.split("/")
+    if nodes[0] != "m":
+        raise ValueError(f"invalid path: {path}")
+    sk = parent_sk
+    for node in nodes[1:]:
+        sk = derive_child_sk(sk, int(node))
+    return sk
+
+
+def derive_validator_root_sk(mnemonic: str) -> int:
+    """The secret key at m/12381/3600, shared by all validator paths.
+
+    @param mnemonic: the validator mnemonic.
+    @return: the secret key.
+    """
+    master_sk = derive_master_sk(mnemonic_to_seed(mnemonic))
+    return derive_path(master_sk, VALIDATOR_PATH_PREFIX)
+
+
+def derive_validator_sk(validator_root_sk: int, ndx: int) -> int:
+    """The signing key of validator ndx, see validator_signing_key_path.
+
+    @param validator_root_sk: the secret key at m/12381/3600
+    @param ndx: the validator index.
+    @return: the secret key.
+    """
+    sk = validator_root_sk
+    for node in [ndx, 0, 0]:
+        sk = derive_child_sk(sk, node)
+    return sk
+
+
+def validator_signing_key_path(ndx: int) -> str:
+    """EIP-2334 signing key path for a validator."""
+    return f"{VALIDATOR_PATH_PREFIX}/{ndx}/0/0"
+
+
+def sk_to_pubkey(sk: int) -> bytes:
+    """The compressed 48 byte BLS pubkey of a secret key."""
+    return G2ProofOfPossession.SkToPk(sk)
+
+
+class KeystoreKDF:
+    """KDF parameters used to encrypt EIP-2335 keystores."""
+
+    def __init__(self, function: str = "pbkdf2", cost: int = 262144):
+        """
+        @param function: pbkdf2 or scrypt
+        @param cost: c for pbkdf2, n for scrypt.
+        """
+        if function not in ["pbkdf2", "scrypt"]:
+            raise Exception(f"unsupported keystore kdf: {function}")
+        self.function: str = function
+        self.cost: int = cost
+
+    def __repr__(self):
+        return f"{self.function}(cost={self.cost})"
+
+    def params(self, salt: bytes) -> dict:
+        if self.function == "pbkdf2":
+            return {
+                "dklen": 32,
+                "c": self.cost,
+                "prf": "hmac-sha256",
+                "salt": salt.hex()}
+        return {"dklen": 32, "n": self.cost, "r": 8, "p": 1, "salt": salt.hex()}
+
+
+# KDF used for keystore-kdf: pbkdf2-fast, testnet only.
+FAST_KEYSTORE_KDF = KeystoreKDF("pbkdf2", 2)
+
+
+def _normalize_password(password: str) -> bytes:
+    """EIP-2335 password processing: NFKD and strip control codes."""
+    password = unicodedata.normalize("NFKD", password)
+    return "".join(
+        c for c in password if not (
+            ord(c) < 0x20 or 0x7F <= ord(c) <= 0x9F)).encode("utf-8")
+
+
+def keystore_decryption_key(password: str, kdf: dict) -> bytes:
+    """Run the KDF described by a keystore's crypto.kdf section.
+
+    @param password: the keystore password.
+    @param kdf: the crypto.kdf section of an EIP-2335 keystore.
+    @return: the 32 byte decryption key.
+    """
+    params = kdf["params"]
+    salt = bytes.fromhex(params["salt"])
+    if kdf["function"] == "pbkdf2":
+        return hashlib.pbkdf2_hmac(
+            "sha256", _normalize_password(password), salt, params["c"], params["dklen"]
+        )
+    if kdf["function"] == "scrypt":
+        return hashlib.scrypt(
+            _normalize_password(password),
+            salt=salt,
+            n=params["n"],
+            r=params["r"],
+            p=params["p"],
+            dklen=params["dklen"],
+            maxmem=256 * params["n"] * params["r"],
+        )
+    raise Exception(f"unsupported keystore kdf: {kdf['function']}")
+
+
+def measure_keystore_decrypt_time(keystore_file: pathlib.Path) -> float:
+    """Time the KDF of a keystore, which dominates the cost of decrypting
+    it. The password does not change the cost so a dummy one is used.
+
+    @param keystore_file: an EIP-2335 keystore (or prysm wallet).
+    @return: seconds spent in the KDF.
+    """
+    with open(keystore_file, "r", encoding="utf-8") as f:
+        kdf = json.load(f)["crypto"]["kdf"]
+    start = time.monotonic()
+    keystore_decryption_key("", kdf)
+    return time.monotonic() - start
+
+
+def encrypt_keystore_crypto(
+        secret: bytes, password: str, kdf: KeystoreKDF) -> dict:
+    """Build the EIP-2335 crypto section encrypting secret.
+
+    @param secret: the secret to encrypt.
+    @param password: the keystore password.
+    @param kdf: the KDF to use.
+    @return: the crypto section.
+    """
+    kdf_section = {
+        "function": kdf.function,
+        "params": kdf.params(secrets.token_bytes(32)),
+        "message": "",
+    }
+    decryption_key = keystore_decryption_key(password, kdf_section)
+    iv = secrets.token_bytes(16)
+    cipher = AES.new(
+        decryption_key[:16], AES.MODE_CTR, initial_value=iv, nonce=b"")
+    cipher_message = cipher.encrypt(secret)
+    checksum = hashlib.sha256(decryption_key[16:32] + cipher_message).digest()
+    return {
+        "kdf": kdf_section,
+        "checksum": {"function": "sha256", "params": {}, "message": checksum.hex()},
+        "cipher": {
+            "function": "aes-128-ctr",
+            "params": {"iv": iv.hex()},
+            "message": cipher_message.hex(),
+        },
+    }
+
+
+def create_keystore(
+    sk: int, pubkey: bytes, password: str, path: str, kdf: KeystoreKDF
+) -> dict:
+    """Create an EIP-2335 keystore for a validator key.
+
+    @param sk: the secret key.
+    @param pubkey: the pubkey of sk.
+    @param password: the keystore password.
+    @param path: the derivation path of sk.
+    @param kdf: the KDF to use.
+    @return: the keystore.
+    """
+    return {
+        "crypto": encrypt_keystore_crypto(sk.to_bytes(32, "big"), password, kdf),
+        "description": "",
+        "pubkey": pubkey.hex(),
+        "path": path,
+        "uuid": str(uuid.uuid4()),
+        "version": 4,
+    }
+
+
+def _derive_validator_keystore(
+    validator_root_sk: int, ndx: int, kdf: KeystoreKDF
+) -> tuple[bytes, int, str, str]:
+    """Process pool worker: derive and encrypt the signing key of validator ndx.
+
+    @param validator_root_sk: the secret key at m/12381/3600
+    @param ndx: the validator index.
+    @param kdf: the KDF to use.
+    @return: (pubkey, secret key, keystore json, keystore password)
+    """
+    sk = derive_validator_sk(validator_root_sk, ndx)
+    pubkey = sk_to_pubkey(sk)
+    password = secrets.token_hex(32)
+    keystore = create_keystore(
+        sk, pubkey, password, validator_signing_key_path(ndx), kdf)
+    return pubkey, sk, json.dumps(keystore), password
+
+
+class NativeKeystoreGenerator:
+    """A drop-in replacement for Eth2ValTools.generate_keystores that derives
+    the keys in-process.
+
+    The output directory mirrors the layout of eth2-val-tools:
+        keys/<pubkey>/voting-keystore.json
+        secrets/<pubkey>
+        lodestar-secrets/<pubkey>
+        nimbus-keys/<pubkey>/keystore.json
+        teku-keys/<pubkey>.json
+        teku-secrets/<pubkey>.txt
+        pubkeys.json
+    and for prysm:
+        prysm/direct/accounts/all-accounts.keystore.json
+    """
+
+    def __init__(
+        self,
+        max_workers: Union[int, None] = None,
+        kdf: Union[KeystoreKDF, None] = None,
+    ):
+        """
+        @param max_workers: size of the process pool. (default: cpu count)
+        @param kdf: the KDF for generated keystores (default pbkdf2, c=262144)
+        """
+        self.kdf: KeystoreKDF = kdf if kdf is not None else KeystoreKDF()
+        # the pool is first used from the keystore writer threads, forking
+        # while other threads run can deadlock the workers, so spawn them.
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        # mnemonic -> sk at m/12381/3600
+        self._validator_root_sks: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def _get_validator_root_sk(self, mnemonic: str) -> int:
+        """The mnemonic to seed PBKDF2 and the derivation down to the shared
+        m/12381/3600 node are done only once per mnemonic."""
+        with self._lock:
+            if mnemonic not in self._validator_root_sks:
+                self._validator_root_sks[mnemonic] = derive_validator_root_sk(
+                    mnemonic)
+            return self._validator_root_sks[mnemonic]
+
+    def derive_keystores(
+        self,
+        mnemonic: str,
+        min_ndx: int,
+        max_ndx: int,
+        kdf: Union[KeystoreKDF, None] = None,
+    ) -> list[tuple[bytes, int, str, str]]:
+        """Derive the keys and keystores for validators [min_ndx, max_ndx).
+
+        @param kdf: the KDF to encrypt the keystores with (default: self.kdf)
+        @return: list of (pubkey, secret key, keystore json, password)
+        """
+        if kdf is None:
+            kdf = self.kdf
+        validator_root_sk = self._get_validator_root_sk(mnemonic)
+        futures = [
+            self.executor.submit(
+                _derive_validator_keystore, validator_root_sk, ndx, kdf
+            )
+            for ndx in range(min_ndx, max_ndx)
+        ]
+        return [future.result() for future in futures]
+
+    def generate_keystores(
+        self,
+        out_path: pathlib.Path,
+        min_ndx: int,
+        max_ndx: int,
+        mnemonic: str,
+        prysm: bool = False,
+        prysm_password: str = "testnet_password",
+        insecure: bool = False,
+    ) -> Union[str, Exception]:
+        """Generate keystores for a range of validators.
+
+        :param out_path: output path for the keystores
+        :param min_ndx: minimum validator index
+        :param max_ndx: maximum validator index
+        :param mnemonic: the mnemonic to use to generate the keystores
+        :param prysm: if True, generate prysm keystores
+        :param prysm_password: what password to use for prysm keystores
+        :param insecure: use FAST_KEYSTORE_KDF instead of self.kdf
+        :return:
+        """
+        kdf = FAST_KEYSTORE_KDF if insecure else self.kdf
+        logging.debug(
+            f"Deriving keystores for validators {min_ndx} to {max_ndx} in-process."
+        )
+        try:
+            derived = self.derive_keystores(mnemonic, min_ndx, max_ndx, kdf)
+            if prysm:
+                self._write_prysm_wallet(
+                    out_path / "prysm", derived, prysm_password, kdf)
+            else:
+                self._write_keystores(out_path, derived)
+            with open(out_path / "pubkeys.json", "w", encoding="utf-8") as f:
+                json.dump([f"0x{pubkey.hex()}" for pubkey, *_ in derived], f)
+        except Exception as e:
+            return e
+        return ""
+
+    def _write_keystores(
+        self, out_path: pathlib.Path, derived: list[tuple[bytes, int, str, str]]
+    ):
+        for directory in [
+            "keys",
+            "secrets",
+            "lodestar-secrets",
+            "nimbus-keys",
+            "teku-keys",
+            "teku-secrets",
+        ]:
+            (out_path / directory).mkdir(parents=True, exist_ok=True)
+
+        for pubkey, _, keystore, password in derived:
+            name = f"0x{pubkey.hex()}"
+            (out_path / "keys" / name).mkdir()
+            (out_path / "nimbus-keys" / name).mkdir()
+            files = {
+                out_path / "keys" / name / "voting-keystore.json": keystore,
+                out_path / "nimbus-keys" / name / "keystore.json": keystore,
+                out_path / "teku-keys" / f"{name}.json": keystore,
+                out_path / "secrets" / name: password,
+                out_path / "lodestar-secrets" / name: password,
+                out_path / "teku-secrets" / f"{name}.txt": password,
+            }
+            for path, contents in files.items():
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(contents)
+
+    def _write_prysm_wallet(
+        self,
+        wallet_dir: pathlib.Path,
+        derived: list[tuple[bytes, int, str, str]],
+        wallet_password: str,
+        kdf: KeystoreKDF,
+    ):
+        """Writes a prysm imported (direct) wallet holding all the keys."""
+        accounts_dir = wallet_dir / "direct" / "accounts"
+        accounts_dir.mkdir(parents=True)
+        account_store = {
+            "private_keys": [
+                base64.b64encode(sk.to_bytes(32, "big")).decode("utf-8")
+                for _, sk, _, _ in derived
+            ],
+            "public_keys": [
+                base64.b64encode(pubkey).decode("utf-8") for pubkey, *_ in derived
+            ],
+        }
+        wallet = {
+            "crypto": encrypt_keystore_crypto(
+                json.dumps(account_store).encode("utf-8"), wallet_password, kdf
+            ),
+            "uuid": str(uuid.uuid4()),
+            "version": 4,
+            "name": "all-accounts",
+        }
+        with open(accounts_dir / "all-accounts.keystore.json", "w", encoding="utf-8") as f:
+            json.dump(wallet, f)
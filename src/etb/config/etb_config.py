@@ -1,11 +1,14 @@
 import logging
 import pathlib
-import time
-from typing import List, Union
+import threading
+from typing import Iterator, List, Union
 
 from ruamel import yaml
 
+from ..common.checkpoint import wait_for_file
 from ..common.consensus import ConsensusFork, TerminalBlockHash
+from ..common.pubkey_index import ValidatorPubkeyIndex
+from ..common.topology import TOPOLOGIES
 from ..common.consensus import (
     PresetEnum,
     MinimalPreset,
@@ -94,6 +97,24 @@ class FilesConfig(Config):
             "consensus-bootnode-checkpoint-file": "/data/consensus-bootnode-checkpoint.txt",
             "deposit-contract-deployment-block-hash-file": "/data/deposit-contract-deployment-block-hash.txt",
             "deposit-contract-deployment-block-number-file": "/data/deposit-contract-deployment-block-number.txt",
+            "etb-cache-dir": "/data/.etb-cache/",  # survives make clean
+            "etb-trash-dir": "/data/.etb-trash/",  # old runs waiting to be removed
+            "bootstrap-timeline-file": "/data/bootstrap-timeline.json",
+            "bootstrap-trace-file": "/data/bootstrap-trace.json",  # chrome trace format
+            "el-peer-graph-file": "/data/el-peer-graph.json",
+            "cl-peer-graph-file": "/data/cl-peer-graph.json",
+            "consensus-genesis-template-dir": "/data/genesis-template/",
+            # sha256sum -c compatible, also written to each collection dir
+            "consensus-genesis-checksums-file": "/data/consensus-genesis.sha256",
+            # in the cache dir so it is reused across runs
+            "validator-pubkey-index-file": "/data/.etb-cache/validator-pubkeys.idx",
+            # plaintext premine keys, only written after init --persist-accounts
+            "account-cache-dir": "/data/.etb-cache/accounts/",
+            # binary premine account keys for load tools, see etb.common.key_manifest
+            "premine-key-manifest-file": "/data/premine-keys.bin",
+            # what init built and from which inputs, see etb.common.artifacts
+            "init-artifacts-file": "/data/init-artifacts.json",
+            "execution-datadir-template-dir": "/data/el-datadir-template/",
         }
 
         # el genesis files
@@ -124,6 +145,43 @@ class FilesConfig(Config):
         self.docker_compose_file: pathlib.Path = pathlib.Path(
             fields["docker-compose-file"]
         )
+        self.etb_cache_dir: pathlib.Path = pathlib.Path(
+            fields["etb-cache-dir"])
+        self.etb_trash_dir: pathlib.Path = pathlib.Path(
+            fields["etb-trash-dir"])
+        self.bootstrap_timeline_file: pathlib.Path = pathlib.Path(
+            fields["bootstrap-timeline-file"]
+        )
+        self.bootstrap_trace_file: pathlib.Path = pathlib.Path(
+            fields["bootstrap-trace-file"]
+        )
+        self.el_peer_graph_file: pathlib.Path = pathlib.Path(
+            fields["el-peer-graph-file"]
+        )
+        self.cl_peer_graph_file: pathlib.Path = pathlib.Path(
+            fields["cl-peer-graph-file"]
+        )
+        self.consensus_genesis_template_dir: pathlib.Path = pathlib.Path(
+            fields["consensus-genesis-template-dir"]
+        )
+        self.consensus_genesis_checksums_file: pathlib.Path = pathlib.Path(
+            fields["consensus-genesis-checksums-file"]
+        )
+        self.validator_pubkey_index_file: pathlib.Path = pathlib.Path(
+            fields["validator-pubkey-index-file"]
+        )
+        self.account_cache_dir: pathlib.Path = pathlib.Path(
+            fields["account-cache-dir"]
+        )
+        self.premine_key_manifest_file: pathlib.Path = pathlib.Path(
+            fields["premine-key-manifest-file"]
+        )
+        self.init_artifacts_file: pathlib.Path = pathlib.Path(
+            fields["init-artifacts-file"]
+        )
+        self.execution_datadir_template_dir: pathlib.Path = pathlib.Path(
+            fields["execution-datadir-template-dir"]
+        )
         # checkpoint files
         self.etb_config_checkpoint_file: pathlib.Path = pathlib.Path(
             fields["etb-config-checkpoint-file"]
@@ -178,6 +236,43 @@ class TestnetConfig(Config):
         ]  # hash as str.
 
 
+class SyntheticStateConfig(Config):
+    """Represents the deterministic synthetic state added to the EL genesis
+    found in ETBConfig -> testnet-config -> execution-layer -> synthetic-state.
+    See etb.genesis.synthetic_state"""
+
+    def __init__(self, config: dict):
+        super().__init__("synthetic-state")
+        # number of EOAs with a balance.
+        self.accounts: int = 0
+        if "accounts" in config:
+            self.accounts = int(config["accounts"])
+        # number of accounts with code and storage.
+        self.contracts: int = 0
+        if "contracts" in config:
+            self.contracts = int(config["contracts"])
+        self.storage_slots: int = 0
+        if "storage-slots" in config:
+            self.storage_slots = int(config["storage-slots"])
+        self.code_size: int = 0
+        if "code-size" in config:
+            self.code_size = int(config["code-size"])
+        # balance of every synthetic account in wei.
+        self.balance: int = 1
+        if "balance" in config:
+            self.balance = int(config["balance"])
+        self.seed: int = 0
+        if "seed" in config:
+            self.seed = int(config["seed"])
+        for field in ["accounts", "contracts", "storage_slots", "code_size", "balance"]:
+            if getattr(self, field) < 0:
+                raise Exception(
+                    f"{field.replace('_', '-')} must not be negative for SyntheticStateConfig"
+                )
+        if self.contracts > 0 and self.code_size == 0:
+            raise Exception("contracts need a non-zero code-size for SyntheticStateConfig")
+
+
 class ExecutionLayerTestnetConfig(Config):
     def __init__(self, config: dict):
         super().__init__("execution-testnet-config")
@@ -202,9 +297,78 @@ class ExecutionLayerTestnetConfig(Config):
         self.network_id: int = config["network-id"]
         self.account_mnemonic: str = config["account-mnemonic"]
         self.keystore_passphrase: str = config["keystore-passphrase"]
+        # path -> balance, paths may be ranges, see get_premines()
         self.premines: dict[str, int] = {}
+        # path -> (path prefix, first index, last index) of the ranges.
+        self._premine_ranges: dict[str, tuple[str, int, int]] = {}
         for acct, balance in config["premines"].items():
             self.premines[acct] = balance
+            if ".." in acct:
+                prefix, _, indices = acct.rpartition("/")
+                first, _, last = indices.partition("..")
+                if not (first.isdigit() and last.isdigit()) or int(first) > int(last):
+                    raise Exception(
+                        f"Invalid premine range {acct} for ExecutionLayerTestnetConfig: {self.name}"
+                    )
+                self._premine_ranges[acct] = (prefix, int(first), int(last))
+
+        # optional fields that may be overridden in the etb-config file.
+        # how the execution clients are peered during bootstrap, see
+        # etb.common.topology
+        self.peering_topology: str = "full-mesh"
+        if "peering-topology" in config:
+            if config["peering-topology"] not in TOPOLOGIES:
+                raise Exception(
+                    f"Unknown peering-topology {config['peering-topology']} for ExecutionLayerTestnetConfig: {self.name}"
+                )
+            self.peering_topology = config["peering-topology"]
+        # rpc: pair the running clients with admin_addPeer during bootstrap.
+        # static: derive node keys at init and hand every client its static
+        #         peers, see etb.common.node_keys
+        self.peering_mode: str = "rpc"
+        if "peering-mode" in config:
+            if config["peering-mode"] not in ["rpc", "static"]:
+                raise Exception(
+                    f"Unknown peering-mode {config['peering-mode']} for ExecutionLayerTestnetConfig: {self.name}"
+                )
+            self.peering_mode = config["peering-mode"]
+        # target number of peers per client for the random-k topology.
+        self.peering_degree: int = 4
+        if "peering-degree" in config:
+            self.peering_degree = int(config["peering-degree"])
+        # number of admin_addPeer requests in flight at once.
+        self.peering_workers: int = 32
+        if "peering-workers" in config:
+            self.peering_workers = int(config["peering-workers"])
+        # initialize the el datadirs during bootstrap instead of in every
+        # container, requires a compatible client binary in the bootstrapper.
+        self.prepare_datadirs: bool = False
+        if "prepare-datadirs" in config:
+            self.prepare_datadirs = bool(config["prepare-datadirs"])
+        # extra generated state for state-bloat experiments.
+        self.synthetic_state: Union[SyntheticStateConfig, None] = None
+        if "synthetic-state" in config:
+            self.synthetic_state = SyntheticStateConfig(config["synthetic-state"])
+
+    def get_premines(self) -> Iterator[tuple[str, int]]:
+        """The premine accounts, with ranges like m/44'/60'/0'/0/0..9999
+        (inclusive) expanded as they are iterated.
+
+        @return: iterator of (derivation path, balance in ETH)
+        """
+        for acct, balance in self.premines.items():
+            if acct in self._premine_ranges:
+                prefix, first, last = self._premine_ranges[acct]
+                for ndx in range(first, last + 1):
+                    yield f"{prefix}/{ndx}", balance
+            else:
+                yield acct, balance
+
+    def get_num_premines(self) -> int:
+        """The number of premine accounts once the ranges are expanded."""
+        return sum(
+            last - first + 1 for _, first, last in self._premine_ranges.values()
+        ) + len(self.premines) - len(self._premine_ranges)
 
 
 class ConsensusLayerTestnetConfig(Config):
@@ -249,6 +413,45 @@ class ConsensusLayerTestnetConfig(Config):
         self.validator_mnemonic: str = config["validator-mnemonic"]
 
         # optional fields that may be overridden in the etb-config file.
+        # pbkdf2-fast produces testnet-only keystores that decrypt instantly.
+        self.keystore_kdf: str = "default"
+        if "keystore-kdf" in config:
+            if config["keystore-kdf"] not in ["default", "pbkdf2-fast"]:
+                raise Exception(
+                    f"Unknown keystore-kdf {config['keystore-kdf']} for ConsensusLayerTestnetConfig: {self.name}"
+                )
+            self.keystore_kdf = config["keystore-kdf"]
+
+        # generate the genesis state during init and only patch in the
+        # genesis time during bootstrap.
+        self.pregenerate_genesis_state: bool = False
+        if "pregenerate-genesis-state" in config:
+            self.pregenerate_genesis_state = bool(
+                config["pregenerate-genesis-state"])
+
+        # bootnode: discover peers through the eth2-bootnode.
+        # static: derive the network identities at init and hand every
+        #         client its peers, see etb.common.cl_node_keys
+        self.peering_mode: str = "bootnode"
+        if "peering-mode" in config:
+            if config["peering-mode"] not in ["bootnode", "static"]:
+                raise Exception(
+                    f"Unknown peering-mode {config['peering-mode']} for ConsensusLayerTestnetConfig: {self.name}"
+                )
+            self.peering_mode = config["peering-mode"]
+        # the static peers, see etb.common.topology
+        self.peering_topology: str = "full-mesh"
+        if "peering-topology" in config:
+            if config["peering-topology"] not in TOPOLOGIES:
+                raise Exception(
+                    f"Unknown peering-topology {config['peering-topology']} for ConsensusLayerTestnetConfig: {self.name}"
+                )
+            self.peering_topology = config["peering-topology"]
+        # target number of peers per client for the random-k topology.
+        self.peering_degree: int = 4
+        if "peering-degree" in config:
+            self.peering_degree = int(config["peering-degree"])
+
         self.min_validator_withdrawability_delay: int = (
             self.preset_base.MIN_VALIDATOR_WITHDRAWABILITY_DELAY.value
         )
@@ -701,6 +904,9 @@ class ClientInstance(Instance):
         )
         self.el_dir: pathlib.Path = self.node_dir / self.execution_config.client
         self.jwt_secret_file: pathlib.Path = self.node_dir / "jwt_secret"
+        # written once the bootstrapper initialized the el datadir, the
+        # launchers skip their init when it is present.
+        self.el_prepared_marker_file: pathlib.Path = self.el_dir / "etb-prepared-datadir"
 
         # prysm specific
         self.wallet_password_path: Union[None, pathlib.Path] = None
@@ -878,6 +1084,9 @@ class ETBConfig(Config):
             self._config["dynamic-entries"] = {}
 
         self.genesis_time: Union[None, int] = None
+        self._validator_pubkey_index: Union[ValidatorPubkeyIndex, None] = None
+        # the index is built lazily by whichever thread needs it first.
+        self._validator_pubkey_index_lock = threading.RLock()
 
         # are we opening ETB config after a testnet has been bootstrapped?
         if "genesis-time" in self._config["dynamic-entries"]:
@@ -966,6 +1175,58 @@ class ETBConfig(Config):
             },
         }
 
+    def build_validator_pubkey_index(self, max_workers: Union[int, None] = None) -> int:
+        """Derive the pubkeys of the genesis validators into the pubkey index
+        file, reusing the entries that are already there.
+
+        @param max_workers: size of the process pool. (default: cpu count)
+        @return: the number of pubkeys that were derived.
+        """
+        consensus_layer = self.testnet_config.consensus_layer
+        with self._validator_pubkey_index_lock:
+            index = ValidatorPubkeyIndex(self.files.validator_pubkey_index_file)
+            return index.build(
+                consensus_layer.validator_mnemonic,
+                consensus_layer.min_genesis_active_validator_count,
+                max_workers=max_workers,
+            )
+
+    def get_validator_pubkey_index(self) -> ValidatorPubkeyIndex:
+        """The memory mapped pubkey index, built if it is missing.
+
+        @return: the index.
+        """
+        with self._validator_pubkey_index_lock:
+            if self._validator_pubkey_index is None:
+                self.build_validator_pubkey_index()
+                index = ValidatorPubkeyIndex(self.files.validator_pubkey_index_file)
+                index.open(self.testnet_config.consensus_layer.validator_mnemonic)
+                self._validator_pubkey_index = index
+            return self._validator_pubkey_index
+
+    def get_validator_pubkey(self, ndx: int) -> str:
+        """The pubkey of a genesis validator.
+
+        @param ndx: the validator index.
+        @return: the 0x prefixed pubkey.
+        """
+        count = self.testnet_config.consensus_layer.min_genesis_active_validator_count
+        if not 0 <= ndx < count:
+            raise IndexError(f"validator index {ndx} out of range, there are {count} validators")
+        return f"0x{self.get_validator_pubkey_index().pubkey(ndx).hex()}"
+
+    def get_validator_index(self, pubkey: str) -> int:
+        """The index of a genesis validator.
+
+        @param pubkey: the (0x prefixed) pubkey.
+        @return: the validator index.
+        """
+        ndx = self.get_validator_pubkey_index().index(pubkey)
+        count = self.testnet_config.consensus_layer.min_genesis_active_validator_count
+        if ndx >= count:
+            raise KeyError(f"{pubkey} is not a genesis validator")
+        return ndx
+
     # useful operations.
     def epoch_to_slot(self, epoch: int) -> int:
         """Converts an epoch to a slot.
@@ -1061,7 +1322,6 @@ def get_etb_config() -> ETBConfig:
     path = FilesConfig().etb_config_file
     checkpoint = FilesConfig().etb_config_checkpoint_file
     logging.info("Getting ETBConfig for testnet.")
-    while not checkpoint.exists():
-        time.sleep(1)
-        logging.debug(f"Waiting for checkpoint: {checkpoint}")
+    logging.debug(f"Waiting for checkpoint: {checkpoint}")
+    wait_for_file(checkpoint)
     return ETBConfig(path)
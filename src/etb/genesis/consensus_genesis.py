@@ -1,6 +1,8 @@
 """Contains all the necessary information and functionality to write the
 consensus config.yaml and genesis.ssz."""
 import logging
+import pathlib
+from typing import Union
 
 from ..common.consensus import (
     ForkVersionName,
@@ -142,11 +144,27 @@ MAX_BLOBS_PER_BLOCK: 4
 """
         return config_file
 
-    def create_consensus_genesis_ssz(self) -> bytes:
-        """Create the consensus genesis state and return the SSZ encoded bytes.
-
-        @return: genesis_ssz as bytes
+    def create_consensus_genesis_ssz(
+        self,
+        config_in: Union[pathlib.Path, None] = None,
+        eth1_config: Union[pathlib.Path, None] = None,
+        genesis_ssz_out: Union[pathlib.Path, None] = None,
+    ) -> pathlib.Path:
+        """Create the consensus genesis state, eth2-testnet-genesis writes it
+        straight to genesis_ssz_out.
+
+        The paths default to the ones in the FilesConfig.
+        @param config_in: the consensus config.yaml to use.
+        @param eth1_config: the geth genesis file to use.
+        @param genesis_ssz_out: where to write the genesis.ssz
+        @return: the path of the written genesis.ssz
         """
+        if config_in is None:
+            config_in = self.etb_config.files.consensus_config_file
+        if eth1_config is None:
+            eth1_config = self.etb_config.files.geth_genesis_file
+        if genesis_ssz_out is None:
+            genesis_ssz_out = self.etb_config.files.consensus_genesis_file
         validator_mnemonic = (
             self.etb_config.testnet_config.consensus_layer.validator_mnemonic
         )
@@ -183,16 +201,16 @@ MAX_BLOBS_PER_BLOCK: 4
             preset_args.append("--preset-bellatrix")
             preset_args.append(preset_base_str)
             preset_args.append("--eth1-config")
-            preset_args.append(str(self.etb_config.files.geth_genesis_file))
+            preset_args.append(str(eth1_config))
 
         if genesis_fork.name >= ForkVersionName.capella:
             preset_args.append("--preset-capella")
             preset_args.append(preset_base_str)
 
-        out = eth2_testnet_genesis.get_genesis_ssz(
+        out = eth2_testnet_genesis.write_genesis_ssz(
             genesis_fork_name=genesis_fork.name.name.lower(),
-            config_in=self.etb_config.files.consensus_config_file,
-            genesis_ssz_out=self.etb_config.files.consensus_genesis_file,
+            config_in=config_in,
+            genesis_ssz_out=genesis_ssz_out,
             preset_args=preset_args,
         )
         # there was an issue
@@ -0,0 +1,224 @@
+"""Pre-generation of the consensus genesis state.
+
+eth2-testnet-genesis is the slowest step of bootstrapping, and it runs
+after the genesis time has been picked. The genesis state however only
+depends on the genesis time through:
+    - BeaconState.genesis_time
+    - the EL genesis block (its hash changes with its timestamp), which is
+      embedded as eth1_data.block_hash, every randao mix, and the
+      latest_execution_payload_header block_hash and timestamp.
+
+So during init we generate a template state for an arbitrary genesis time
+and during bootstrap we patch those fields in the SSZ encoding with the
+genesis time and the EL genesis block reported by a running EL. None of
+the patched fields feed into a root stored in the genesis state
+(latest_block_header.state_root is left empty until the first slot), so
+no roots have to be recomputed.
+
+Offsets into the BeaconState (bellatrix and later), with
+H = SLOTS_PER_HISTORICAL_ROOT, E = EPOCHS_PER_HISTORICAL_VECTOR,
+S = EPOCHS_PER_SLASHINGS_VECTOR and C = SYNC_COMMITTEE_SIZE:
+    genesis_time:                           0
+    eth1_data.block_hash:                   220 + 64H
+    randao_mixes:                           272 + 64H (E x 32 bytes)
+    latest_execution_payload_header offset: 272 + 64H + 32E + 8S + 137
+                                                + 2 * (48C + 48)
+and into the ExecutionPayloadHeader:
+    timestamp:                              428
+    block_hash:                             472
+"""
+import hashlib
+import json
+import logging
+import pathlib
+import shutil
+from typing import Union
+
+from ..common.consensus import PresetEnum
+from ..config.etb_config import ETBConfig
+from .consensus_genesis import ConsensusGenesisWriter
+from .execution_genesis import ExecutionGenesisWriter
+
+_ETH1_BLOCK_HASH_BASE = 220
+_RANDAO_MIXES_BASE = 272
+_HEADER_TIMESTAMP = 428
+_HEADER_BLOCK_HASH = 472
+
+
+def _header_offset_position(preset: PresetEnum) -> int:
+    """Position of the latest_execution_payload_header offset in the state."""
+    slots_per_historical_root = preset.SLOTS_PER_HISTORICAL_ROOT.value
+    epochs_per_historical_vector = preset.EPOCHS_PER_HISTORICAL_VECTOR.value
+    epochs_per_slashings_vector = preset.EPOCHS_PER_SLASHINGS_VECTOR.value
+    sync_committee_size = preset.SYNC_COMMITTEE_SIZE.value
+    return (
+        _RANDAO_MIXES_BASE
+        + 64 * slots_per_historical_root
+        + 32 * epochs_per_historical_vector
+        + 8 * epochs_per_slashings_vector
+        # previous/current epoch participation offsets
+        + 4 + 4
+        # justification bits
+        + 1
+        # previous justified, current justified and finalized checkpoints
+        + 3 * 40
+        # inactivity scores offset
+        + 4
+        # current and next sync committee
+        + 2 * (48 * sync_committee_size + 48)
+    )
+
+
+def patch_genesis_state(
+    state: bytes,
+    preset: PresetEnum,
+    template_genesis_time: int,
+    genesis_time: int,
+    eth1_block_hash: bytes,
+) -> bytes:
+    """Rewrite the time dependent fields of a template genesis state.
+
+    @param state: the SSZ encoded template state.
+    @param preset: the preset the state was generated with.
+    @param template_genesis_time: the genesis time of the template.
+    @param genesis_time: the new genesis time.
+    @param eth1_block_hash: the new EL genesis block hash.
+    @return: the patched SSZ encoded state.
+    """
+    if len(eth1_block_hash) != 32:
+        raise Exception(f"invalid eth1 block hash: {eth1_block_hash.hex()}")
+    slots_per_historical_root = preset.SLOTS_PER_HISTORICAL_ROOT.value
+    epochs_per_historical_vector = preset.EPOCHS_PER_HISTORICAL_VECTOR.value
+
+    # find and sanity check all the fields before touching anything.
+    if int.from_bytes(state[0:8], "little") != template_genesis_time:
+        raise Exception("template genesis_time does not match its metadata")
+
+    eth1_hash_pos = _ETH1_BLOCK_HASH_BASE + 64 * slots_per_historical_root
+    template_hash = state[eth1_hash_pos: eth1_hash_pos + 32]
+
+    randao_base = _RANDAO_MIXES_BASE + 64 * slots_per_historical_root
+    for epoch in range(epochs_per_historical_vector):
+        pos = randao_base + 32 * epoch
+        if state[pos: pos + 32] != template_hash:
+            raise Exception(
+                f"template randao mix {epoch} is not the eth1 block hash")
+
+    offset_pos = _header_offset_position(preset)
+    header_pos = int.from_bytes(state[offset_pos: offset_pos + 4], "little")
+    if header_pos + _HEADER_BLOCK_HASH + 32 > len(state):
+        raise Exception(
+            "template execution payload header offset is out of bounds")
+    timestamp_pos = header_pos + _HEADER_TIMESTAMP
+    if int.from_bytes(state[timestamp_pos: timestamp_pos + 8],
+                      "little") != template_genesis_time:
+        raise Exception("template execution payload timestamp mismatch")
+    block_hash_pos = header_pos + _HEADER_BLOCK_HASH
+    if state[block_hash_pos: block_hash_pos + 32] != template_hash:
+        raise Exception("template execution payload block_hash mismatch")
+    if state.count(template_hash) != epochs_per_historical_vector + 2:
+        raise Exception(
+            "eth1 block hash found in unexpected places in the template")
+
+    patched = bytearray(state)
+    time_bytes = genesis_time.to_bytes(8, "little")
+    patched[0:8] = time_bytes
+    patched[timestamp_pos: timestamp_pos + 8] = time_bytes
+    patched[eth1_hash_pos: eth1_hash_pos + 32] = eth1_block_hash
+    for epoch in range(epochs_per_historical_vector):
+        pos = randao_base + 32 * epoch
+        patched[pos: pos + 32] = eth1_block_hash
+    patched[block_hash_pos: block_hash_pos + 32] = eth1_block_hash
+    return bytes(patched)
+
+
+class ConsensusGenesisTemplate:
+    """A genesis state generated ahead of time, see the module docstring."""
+
+    state_file_name = "genesis.ssz"
+    metadata_file_name = "metadata.json"
+
+    def __init__(self, template_dir: pathlib.Path):
+        self.template_dir: pathlib.Path = template_dir
+
+    @staticmethod
+    def fingerprint(etb_config: ETBConfig) -> str:
+        """Digest of everything but the genesis time the genesis state
+        depends on, i.e. the testnet-config."""
+        # pylint: disable=protected-access
+        testnet_config = etb_config._config["testnet-config"]
+        return hashlib.sha256(
+            json.dumps(testnet_config, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def create(self, etb_config: ETBConfig):
+        """Generate the template state.
+
+        @param etb_config: the config to generate the template for, with an
+            (arbitrary) genesis time set.
+        @return:
+        """
+        if self.template_dir.exists():
+            shutil.rmtree(self.template_dir)
+        self.template_dir.mkdir(parents=True)
+        config_file = self.template_dir / "config.yaml"
+        geth_genesis_file = self.template_dir / "geth-genesis.json"
+
+        # the same allocs as the real EL genesis, synthetic state included,
+        # or the execution payload header would carry the wrong state root.
+        ExecutionGenesisWriter(etb_config).write_genesis_files(
+            genesis_files={"geth": geth_genesis_file}
+        )
+        cgw = ConsensusGenesisWriter(etb_config)
+        with open(config_file, "w", encoding="utf-8") as f:
+            f.write(cgw.create_consensus_config_yaml())
+        cgw.create_consensus_genesis_ssz(
+            config_in=config_file,
+            eth1_config=geth_genesis_file,
+            genesis_ssz_out=self.template_dir / self.state_file_name,
+        )
+        with open(self.template_dir / self.metadata_file_name, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "genesis-time": etb_config.genesis_time,
+                    "fingerprint": self.fingerprint(etb_config),
+                },
+                f,
+            )
+
+    def patch(
+        self, etb_config: ETBConfig, eth1_block_hash: str, eth1_timestamp: int
+    ) -> Union[bytes, Exception]:
+        """Build the genesis state for etb_config from the template.
+
+        @param etb_config: the config with the final genesis time set.
+        @param eth1_block_hash: hash of the EL genesis block (0x prefixed).
+        @param eth1_timestamp: timestamp of the EL genesis block.
+        @return: the SSZ encoded genesis state or an Exception if the
+            template can not be used.
+        """
+        metadata_file = self.template_dir / self.metadata_file_name
+        if not metadata_file.exists():
+            return Exception(f"no genesis template in {self.template_dir}")
+        try:
+            with open(metadata_file, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            if metadata["fingerprint"] != self.fingerprint(etb_config):
+                return Exception("genesis template was made for another testnet-config")
+            if eth1_timestamp != etb_config.genesis_time:
+                return Exception(
+                    f"EL genesis timestamp {eth1_timestamp} does not match "
+                    f"the genesis time {etb_config.genesis_time}"
+                )
+            with open(self.template_dir / self.state_file_name, "rb") as f:
+                state = f.read()
+            return patch_genesis_state(
+                state,
+                etb_config.testnet_config.consensus_layer.preset_base,
+                int(metadata["genesis-time"]),
+                etb_config.genesis_time,
+                bytes.fromhex(eth1_block_hash[2:]),
+            )
+        except Exception as e:
+            logging.debug(f"failed to patch the genesis template: {e}")
+            return e
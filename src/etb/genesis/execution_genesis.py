@@ -1,14 +1,19 @@
 """
 This module contains the logic for creating the execution layer genesis files.
 """
-from typing import Any
+import json
+import logging
+import pathlib
+import time
+from typing import Any, Callable, Union
 
-from web3.auto import w3
+from eth_utils import to_checksum_address
 
 from ..common.consensus import Epoch, ConsensusFork
+from ..common.key_manifest import KeyManifest
+from ..common.utils import get_account_cache
 from ..config.etb_config import ETBConfig, ForkVersionName
-
-w3.eth.account.enable_unaudited_hdwallet_features()
+from .synthetic_state import SyntheticState
 
 
 class ExecutionGenesisWriter:
@@ -18,6 +23,10 @@ class ExecutionGenesisWriter:
     def __init__(self, etb_config: ETBConfig):
         self.etb_config: ETBConfig = etb_config
         self.genesis: dict[str, Any] = {}
+        # the allocs are shared by all clients, so only build them once.
+        self._allocs: dict[str, dict] = {}
+        # premine address -> private key
+        self._premine_keys: dict[str, str] = {}
 
         print(f"got genesis time: {self.etb_config.genesis_time}")
 
@@ -63,6 +72,13 @@ class ExecutionGenesisWriter:
             )
 
     def get_allocs(self) -> dict:
+        """The genesis allocs shared by all the EL clients. They are built
+        on the first call, later calls return the same dict so it must not
+        be modified.
+        """
+        if len(self._allocs) > 0:
+            return self._allocs
+
         allocs = {}
         # premine allocations
         for x in range(256):
@@ -73,21 +89,69 @@ class ExecutionGenesisWriter:
         # account allocations
         mnemonic = self.etb_config.testnet_config.execution_layer.account_mnemonic
         password = self.etb_config.testnet_config.execution_layer.keystore_passphrase
-        premines = self.etb_config.testnet_config.execution_layer.premines
+        premines = list(
+            self.etb_config.testnet_config.execution_layer.get_premines())
 
-        for acc in premines:
-            acct = w3.eth.account.from_mnemonic(
-                mnemonic, account_path=acc, passphrase=password
+        account_paths = [acc for acc, _ in premines]
+        accounts = self._read_premine_key_manifest(account_paths, mnemonic, password)
+        if accounts is None:
+            accounts = get_account_cache().derive_accounts(
+                mnemonic, account_paths, password
             )
-            allocs[acct.address] = {"balance": str(premines[acc]) + "0" * 18}
+        for (_, balance), (address, private_key) in zip(premines, accounts):
+            allocs[address] = {"balance": str(balance) + "0" * 18}
+            self._premine_keys[address] = private_key
 
         # deposit contract
         allocs[
             self.etb_config.testnet_config.deposit_contract_address
         ] = deposit_contract_json
 
+        self._allocs = allocs
         return allocs
 
+    def _read_premine_key_manifest(
+        self, account_paths: list[str], mnemonic: str, password: str
+    ) -> Union[list[tuple[str, str]], None]:
+        """The premine accounts exported by init, so that bootstrap doesn't
+        have to derive them again. The manifest is only used if it holds one
+        account per premine and its first and last accounts match the ones
+        derived from the config.
+
+        @param account_paths: the derivation paths of the premines.
+        @param mnemonic: the account mnemonic.
+        @param password: the mnemonic passphrase.
+        @return: the accounts in premine order, None if there is no usable manifest.
+        """
+        manifest_file = self.etb_config.files.premine_key_manifest_file
+        if len(account_paths) == 0 or not manifest_file.exists():
+            return None
+        try:
+            key_manifest = KeyManifest(manifest_file)
+        except Exception as e:
+            logging.warning(f"ignoring unreadable key manifest {manifest_file}: {e}")
+            return None
+        try:
+            if len(key_manifest) != len(account_paths):
+                logging.debug(f"key manifest {manifest_file} doesn't match the premines")
+                return None
+            expected = get_account_cache().derive_accounts(
+                mnemonic, [account_paths[0], account_paths[-1]], password
+            )
+            found = [key_manifest[0], key_manifest[len(key_manifest) - 1]]
+            # the manifest holds lower case addresses.
+            if [(a.lower(), k) for a, k in expected] != found:
+                logging.debug(f"key manifest {manifest_file} doesn't match the premines")
+                return None
+            accounts = [
+                (to_checksum_address(address), private_key)
+                for address, private_key in key_manifest
+            ]
+        finally:
+            key_manifest.close()
+        logging.debug(f"read {len(accounts)} premine accounts from {manifest_file}")
+        return accounts
+
     def create_geth_genesis(self) -> dict:
         """
         Creates a genesis file for geth.
@@ -185,16 +249,13 @@ class ExecutionGenesisWriter:
             self.genesis["config"]["cancunTime"] = self.cancun_fork_time
 
         # besu doesn't use keystores like geth, however you can embed the
-        # accounts in the genesis.
-        mnemonic = self.etb_config.testnet_config.execution_layer.account_mnemonic
-        password = self.etb_config.testnet_config.execution_layer.keystore_passphrase
-        premines = self.etb_config.testnet_config.execution_layer.premines
-        for acc in premines:
-            acct = w3.eth.account.from_mnemonic(
-                mnemonic, account_path=acc, passphrase=password
-            )
-            self.genesis["alloc"][acct.address]["privateKey"] = acct.key.hex()[
-                2:]
+        # accounts in the genesis. copy the entries we touch, the rest of
+        # the allocs are shared with the other clients.
+        besu_allocs = dict(self.genesis["alloc"])
+        for address, private_key in self._premine_keys.items():
+            besu_allocs[address] = {
+                **besu_allocs[address], "privateKey": private_key[2:]}
+        self.genesis["alloc"] = besu_allocs
 
         return self.genesis
 
@@ -289,6 +350,127 @@ class ExecutionGenesisWriter:
 
         return self.genesis
 
+    def write_genesis_files(
+        self,
+        progress_interval: float = 10.0,
+        genesis_files: Union[dict[str, pathlib.Path], None] = None,
+    ) -> int:
+        """Build the geth, besu and nethermind genesis files and write them
+        to the paths in the FilesConfig.
+
+        The documents are streamed: each file is written up to its allocs,
+        then the allocs are appended one entry at a time. Any synthetic
+        state is generated once, each entry is serialized once and shared
+        by all the files, so memory use does not grow with its size. This
+        replaces serializing and writing the three documents on a thread
+        pool: with the entries shared, a single pass over the allocs is
+        cheaper than serializing them once per file in parallel.
+        @param progress_interval: seconds between progress messages.
+        @param genesis_files: client -> path of the genesis files to write,
+            default: all three, to the paths in the FilesConfig.
+        @return: the number of synthetic allocs written.
+        """
+        files = self.etb_config.files
+        if genesis_files is None:
+            genesis_files = {
+                "geth": files.geth_genesis_file,
+                "besu": files.besu_genesis_file,
+                "nethermind": files.nether_mind_genesis_file,
+            }
+        base_allocs = self.get_allocs()
+        # the base allocs differ per client (besu embeds the premine keys)
+        create_genesis: dict[str, tuple[Callable[[], dict], str]] = {
+            "geth": (self.create_geth_genesis, "alloc"),
+            "besu": (self.create_besu_genesis, "alloc"),
+            "nethermind": (self.create_nethermind_genesis, "accounts"),
+        }
+        genesis_docs: dict[pathlib.Path, tuple[dict, str]] = {}
+        for client, path in genesis_files.items():
+            create, allocs_key = create_genesis[client]
+            genesis_docs[path] = (create(), allocs_key)
+        writers: list[_GenesisFileStream] = []
+        try:
+            for path, (doc, allocs_key) in genesis_docs.items():
+                writer = _GenesisFileStream(path, doc, allocs_key)
+                writers.append(writer)
+                for address, alloc in doc[allocs_key].items():
+                    writer.write_entry(json.dumps(address), json.dumps(alloc))
+
+            written = 0
+            synthetic_config = (
+                self.etb_config.testnet_config.execution_layer.synthetic_state
+            )
+            if synthetic_config is not None:
+                synthetic_state = SyntheticState(synthetic_config)
+                total = len(synthetic_state)
+                logging.info(f"writing {total} synthetic allocs")
+                start = time.monotonic()
+                last_report = start
+                for address, alloc in synthetic_state.allocs():
+                    if address in base_allocs:
+                        continue
+                    key, value = json.dumps(address), json.dumps(alloc)
+                    for writer in writers:
+                        writer.write_entry(key, value)
+                    written += 1
+                    now = time.monotonic()
+                    if now - last_report >= progress_interval:
+                        logging.info(
+                            f"wrote {written}/{total} synthetic allocs "
+                            f"({written / (now - start):.0f}/s)"
+                        )
+                        last_report = now
+                logging.info(
+                    f"wrote {written} synthetic allocs in {time.monotonic() - start:.3f}s"
+                )
+            for writer in writers:
+                writer.finish()
+        finally:
+            for writer in writers:
+                writer.close()
+        return written
+
+
+class _GenesisFileStream:
+    """A genesis json document written with its allocs streamed in.
+
+    The document is serialized with a placeholder for the allocs, what comes
+    before it is written right away and what comes after it once all the
+    entries are in.
+    """
+
+    _placeholder = "__etb_genesis_allocs__"
+
+    def __init__(self, path: pathlib.Path, doc: dict, allocs_key: str):
+        """
+        @param path: the genesis file to write.
+        @param doc: the genesis document, its allocs are not written.
+        @param allocs_key: the key of the allocs in doc.
+        """
+        prefix, self.suffix = json.dumps(
+            {**doc, allocs_key: self._placeholder}
+        ).split(json.dumps(self._placeholder))
+        self.file = open(path, "w", encoding="utf-8", buffering=1 << 20)
+        self.file.write(prefix + "{")
+        self.entries: int = 0
+
+    def write_entry(self, key: str, value: str):
+        """Append an alloc.
+
+        @param key: the json encoded address.
+        @param value: the json encoded alloc.
+        """
+        if self.entries > 0:
+            self.file.write(", ")
+        self.file.write(f"{key}: {value}")
+        self.entries += 1
+
+    def finish(self):
+        self.file.write("}" + self.suffix)
+
+    def close(self):
+        self.file.close()
+
 
 # pylint: disable=line-too-long
 deposit_contract_json = {
@@ -0,0 +1,65 @@
+"""Deterministic synthetic EL genesis state for state-bloat experiments.
+
+Every generated entry is a pure function of the seed and its index, so
+the same synthetic-state config always yields the same genesis (and the
+same genesis block hash) and entries can be produced one at a time
+without keeping the state in memory:
+    - accounts: EOAs holding a balance.
+    - contracts: accounts with code-size bytes of code and storage-slots
+      non-zero storage slots. The code starts with STOP so calling into a
+      synthetic contract is a no-op.
+"""
+import hashlib
+from typing import Iterator
+
+from ..config.etb_config import SyntheticStateConfig
+
+
+class SyntheticState:
+    """Generates the allocs described by a SyntheticStateConfig."""
+
+    def __init__(self, config: SyntheticStateConfig):
+        self.config: SyntheticStateConfig = config
+        self._seed: bytes = config.seed.to_bytes(8, "big", signed=True)
+
+    def __len__(self):
+        return self.config.accounts + self.config.contracts
+
+    def _digest(self, tag: bytes, ndx: int) -> bytes:
+        return hashlib.sha256(self._seed + tag + ndx.to_bytes(8, "big")).digest()
+
+    def address(self, tag: bytes, ndx: int) -> str:
+        return "0x" + self._digest(tag, ndx)[:20].hex()
+
+    def code(self, address: str) -> str:
+        """STOP followed by code-size - 1 pseudo random bytes."""
+        filler = hashlib.shake_256(self._seed + address.encode("utf-8")).digest(
+            self.config.code_size - 1
+        )
+        return "0x00" + filler.hex()
+
+    def storage(self, address: str) -> dict[str, str]:
+        storage = {}
+        for slot in range(self.config.storage_slots):
+            key = hashlib.sha256(
+                self._seed + address.encode("utf-8") + slot.to_bytes(8, "big")
+            ).digest()
+            # values are never zero, zero slots are not stored.
+            value = hashlib.sha256(key).digest()[:31] + b"\x01"
+            storage["0x" + key.hex()] = "0x" + value.hex()
+        return storage
+
+    def allocs(self) -> Iterator[tuple[str, dict]]:
+        """Yield the (address, alloc) entries one at a time.
+
+        @return: iterator over the synthetic allocs.
+        """
+        balance = str(self.config.balance)
+        for ndx in range(self.config.accounts):
+            yield self.address(b"account", ndx), {"balance": balance}
+        for ndx in range(self.config.contracts):
+            address = self.address(b"contract", ndx)
+            alloc = {"balance": balance, "code": self.code(address)}
+            if self.config.storage_slots > 0:
+                alloc["storage"] = self.storage(address)
+            yield address, alloc
@@ -0,0 +1,234 @@
+"""An asyncio engine for the requests in client_request.
+
+The same ClientInstanceRequests (BeaconAPIgetBlockV2, eth_getBlockByNumber,
+admin_addPeer, ...) can be performed without a thread per request:
+
+    async with AsyncRequestEngine(max_concurrency=128) as engine:
+        responses = await engine.perform_batched_request(
+            BeaconAPIgetBlockV2("head"), client_instances, deadline=4
+        )
+
+The engine keeps one aiohttp session, so connections to the clients are
+reused across requests, and bounds the number of requests in flight with
+a semaphore. Responses are read completely and returned as AsyncResponse,
+which offers the json() and status_code of a requests.Response, so the
+response helpers of the requests (e.g. get_block) work on them as well.
+
+Synchronous code can use the engine through the *_sync methods, which run
+the requests on a background event loop owned by the engine.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Coroutine, Tuple, Union
+
+import aiohttp
+
+from ..config.etb_config import ClientInstance
+from .client_request import (
+    BeaconAPIRequest,
+    ClientInstanceRequest,
+    DeadlineExceeded,
+    ExecutionJSONRPCRequest,
+)
+
+
+class AsyncResponse:
+    """A response that has been read completely."""
+
+    def __init__(self, url: str, status_code: int, content: bytes):
+        self.url: str = url
+        self.status_code: int = status_code
+        self.content: bytes = content
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncRequestEngine:
+    """Performs ClientInstanceRequests with asyncio.
+
+    An engine is bound to the event loop it is first used in.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        limit_per_host: int = 4,
+        keepalive_timeout: float = 120.0,
+    ):
+        """
+        @param max_concurrency: max number of requests in flight at once.
+        @param limit_per_host: max connections per client endpoint.
+        @param keepalive_timeout: seconds to keep idle connections open.
+        """
+        self.max_concurrency: int = max_concurrency
+        self.limit_per_host: int = limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self._session: Union[aiohttp.ClientSession, None] = None
+        self._semaphore: Union[asyncio.Semaphore, None] = None
+        # the loop used by the *_sync methods.
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._loop_thread: Union[threading.Thread, None] = None
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncRequestEngine":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_concurrency,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _send(
+        self, req: ClientInstanceRequest, instance: ClientInstance
+    ) -> AsyncResponse:
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(total=req.timeout)
+        url = req.get_endpoint(instance)
+        if isinstance(req, ExecutionJSONRPCRequest):
+            request = session.post(url, json=req.payload, timeout=timeout)
+        elif isinstance(req, BeaconAPIRequest):
+            request = session.get(url, timeout=timeout)
+        else:
+            raise Exception(f"Unsupported request type: {type(req).__name__}")
+
+        async with self._semaphore:
+            async with request as response:
+                response.raise_for_status()
+                content = await response.read()
+        return AsyncResponse(url, response.status, content)
+
+    async def perform_request(
+        self, req: ClientInstanceRequest, instance: ClientInstance
+    ) -> Union[Exception, AsyncResponse]:
+        """The async counterpart of req.perform_request(instance), the
+        responses are validated and retried by the same methods of req.
+
+        @param req: the request.
+        @param instance: client instance to send the request to.
+        @return: response on success, exception otherwise.
+        """
+        endpoint = req.get_endpoint(instance)
+        for attempt in range(req.max_retries):
+            try:
+                response = await self._send(req, instance)
+                req.validate_response(response)
+                return response
+            except Exception as e:
+                error = req.retry_or_fail(attempt, endpoint, e)
+                if error is not None:
+                    return error
+            await asyncio.sleep(req.retry_delay)
+        return Exception("Unknown error occurred.")  # only with max_retries < 1
+
+    async def stream_batched_request(
+        self,
+        req: ClientInstanceRequest,
+        clients: list[ClientInstance],
+        deadline: Union[float, None] = None,
+    ) -> AsyncIterator[Tuple[ClientInstance, Union[Exception, AsyncResponse]]]:
+        """Perform a request on a list of clients, yielding the responses in
+        the order they complete.
+
+        @param req: the request to perform on every client.
+        @param clients: the clients.
+        @param deadline: seconds after which the clients that haven't
+        responded yet are yielded with a DeadlineExceeded exception.
+        @return: async iterator of (client, response or exception)
+        """
+        tasks: dict[asyncio.Task, ClientInstance] = {
+            asyncio.ensure_future(self.perform_request(req, client)): client
+            for client in clients
+        }
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        end = None if deadline is None else loop.time() + deadline
+        try:
+            while len(pending) > 0:
+                timeout = None if end is None else max(0.0, end - loop.time())
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if len(done) == 0:
+                    break
+                for task in done:
+                    yield tasks[task], task.result()
+            for task, client in tasks.items():
+                if task in pending:
+                    yield client, DeadlineExceeded(
+                        f"no response within {deadline}s from {client.name}"
+                    )
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def perform_batched_request(
+        self,
+        req: ClientInstanceRequest,
+        clients: list[ClientInstance],
+        deadline: Union[float, None] = None,
+    ) -> dict[ClientInstance, Union[Exception, AsyncResponse]]:
+        """The async counterpart of perform_batched_request, see
+        stream_batched_request.
+
+        @return: the responses (or exceptions), keyed by client instance.
+        """
+        return {
+            client: response
+            async for client, response in self.stream_batched_request(
+                req, clients, deadline
+            )
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _run(self, coroutine: Coroutine) -> Any:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="async-request-engine",
+                    daemon=True,
+                )
+                self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def perform_request_sync(
+        self, req: ClientInstanceRequest, instance: ClientInstance
+    ) -> Union[Exception, AsyncResponse]:
+        """Blocking wrapper around perform_request."""
+        return self._run(self.perform_request(req, instance))
+
+    def perform_batched_request_sync(
+        self,
+        req: ClientInstanceRequest,
+        clients: list[ClientInstance],
+        deadline: Union[float, None] = None,
+    ) -> dict[ClientInstance, Union[Exception, AsyncResponse]]:
+        """Blocking wrapper around perform_batched_request."""
+        return self._run(self.perform_batched_request(req, clients, deadline))
+
+    def close_sync(self):
+        """Close the session and stop the background loop, if any."""
+        if self._loop is None:
+            return
+        self._run(self.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self._loop = None
@@ -2,16 +2,18 @@
 clients across the network."""
 
 import logging
+import threading
 import time
 from abc import abstractmethod
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from enum import Enum
-from typing import Union, Tuple
+from typing import Any, Iterator, Union, Tuple
 
 import requests
-from requests import HTTPError
 
 from ..config.etb_config import ClientInstance
+from .session_pool import SessionPoolRegistry, default_session_registry
 
 
 class RequestType(str, Enum):
@@ -35,23 +37,90 @@ class ClientInstanceRequest:
     """
 
     def __init__(
-            self, payload: Union[dict, str], max_retries: int = 3, timeout: int = 5
+            self,
+            payload: Union[dict, str],
+            max_retries: int = 3,
+            timeout: int = 5,
+            session_registry: Union[SessionPoolRegistry, None] = None,
     ):
         """A request to a client instance.
 
         @param payload: the payload, a dictionary for JSONRPC, a string
         for BeaconAPI. @param max_retries: max number of retries before
         bailing. @param timeout: timeout to use per request.
+        @param session_registry: the connection pools to send the request
+        over, default_session_registry if None.
         """
         self.payload: Union[dict, str] = payload
         self.max_retries: int = max_retries
         self.timeout: int = timeout
+        self.session_registry: SessionPoolRegistry = (
+            session_registry
+            if session_registry is not None
+            else default_session_registry
+        )
+
+    # seconds to wait before retrying, don't spam the clients.
+    retry_delay: float = 1.0
+
+    @abstractmethod
+    def get_endpoint(self, instance: ClientInstance) -> str:
+        """The url the request is sent to."""
 
     @abstractmethod
+    def send(self, instance: ClientInstance) -> requests.Response:
+        """Send the request once, over the pools of the session_registry."""
+
+    def validate_response(self, response: Any):
+        """Raise an exception if a response with a good status code is an
+        error anyway. Works on requests.Response and anything else with a
+        json() method.
+
+        @param response: the response.
+        @return:
+        """
+
+    def retry_or_fail(
+            self, attempt: int, endpoint: str, error: Exception
+    ) -> Union[Exception, None]:
+        """Log a failed attempt and decide whether to retry it. This is the
+        retry policy of both perform_request and the AsyncRequestEngine.
+
+        @param attempt: the attempt that failed, starting at 0.
+        @param endpoint: the url of the request.
+        @param error: the exception the attempt failed with.
+        @return: None to retry, the exception to return otherwise.
+        """
+        if attempt < self.max_retries - 1:
+            logging.debug(
+                f"{error!r} occurred during the API request {endpoint}. Retrying..."
+            )
+            return None
+        logging.error(f"Maximum number of retries reached for {endpoint}")
+        return error
+
     def perform_request(
             self, instance: ClientInstance
     ) -> Union[Exception, requests.Response]:
-        """Either returns the response or an exception."""
+        """Perform the request, retrying up to max_retries times.
+
+        @param instance: client instance to send the request to.
+        @return: response on success, exception otherwise.
+        """
+        endpoint = self.get_endpoint(instance)
+        for attempt in range(self.max_retries):
+            try:
+                response = self.send(instance)
+                # raise an exception based on the response.
+                response.raise_for_status()
+                self.validate_response(response)
+                return response
+            except Exception as e:
+                error = self.retry_or_fail(attempt, endpoint, e)
+                if error is not None:
+                    return error
+            time.sleep(self.retry_delay)
+        return Exception("Unknown error occurred.")  # only with max_retries < 1
 
     def is_valid(self, response: Union[requests.Response, Exception]) -> bool:
         """Check if the response is valid.
@@ -65,125 +134,254 @@ class ClientInstanceRequest:
 class ExecutionJSONRPCRequest(ClientInstanceRequest):
     """A request to an execution client."""
 
-    def __init__(self, payload: dict, max_retries: int = 3, timeout: int = 5):
-        super().__init__(payload=payload, max_retries=max_retries, timeout=timeout)
+    def __init__(
+            self,
+            payload: dict,
+            max_retries: int = 3,
+            timeout: int = 5,
+            session_registry: Union[SessionPoolRegistry, None] = None,
+    ):
+        super().__init__(
+            payload=payload,
+            max_retries=max_retries,
+            timeout=timeout,
+            session_registry=session_registry,
+        )
 
-    def perform_request(
-            self, instance: ClientInstance
-    ) -> Union[Exception, requests.Response]:
-        """Perform a request to the execution client. Either return an
-        exception or a response. In the case that the response is an error code
-        we also return an exception. (besu.
+    def get_endpoint(self, instance: ClientInstance) -> str:
+        return instance.get_execution_jsonrpc_path()
+
+    def send(self, instance: ClientInstance) -> requests.Response:
+        session = self.session_registry.get_pool(
+            instance, SessionPoolRegistry.EXECUTION_RPC
+        )
+        return session.post(
+            self.get_endpoint(instance), json=self.payload, timeout=self.timeout
+        )
+
+    def validate_response(self, response: Any):
+        self.check_response_data(response.json())
+
+    def check_response_data(self, data: Any):
+        """Raise an ErrorResponse if the decoded response is an error, some
+        clients return them with a 200 status code (besu).
 
-        workaround) @param instance: client instance to send the request
-        to. @return: response on success, exception otherwise.
+        @param data: the decoded json of the response.
+        @return:
         """
-        rpc_endpoint = instance.get_execution_jsonrpc_path()
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(
-                    rpc_endpoint, json=self.payload, timeout=self.timeout
-                )
-                # raise an exception based on the response.
-                response.raise_for_status()
-                data = response.json()
-                if "error" in data:
-                    raise ErrorResponse(data["error"])
-                # response is good, optionally process data here.
-                return response
+        if not isinstance(data, dict):
+            raise ErrorResponse(f"expected a json-rpc response, got: {data}")
+        if "error" in data:
+            raise ErrorResponse(data["error"])
+
+
+class ExecutionJSONRPCBatchRequest(ExecutionJSONRPCRequest):
+    """Several JSON-RPC calls to an execution client in a single POST, e.g.
+
+        req = ExecutionJSONRPCBatchRequest([
+            eth_getBlockByNumber("latest"),
+            {"method": "net_peerCount", "params": []},
+            {"method": "eth_syncing", "params": []},
+        ])
+        for client, future in perform_batched_request(req, clients).items():
+            head, peer_count, syncing = req.get_results(future.result())
+
+    The calls are given the ids 0..n-1 so the responses, which may come back
+    in any order, can be matched to them. A call that failed gets an
+    ErrorResponse in place of its result, only a response that isn't a
+    batch at all (e.g. batches are not supported) fails the whole request.
+    """
+
+    def __init__(
+            self,
+            calls: list[Union[dict, ExecutionJSONRPCRequest]],
+            max_retries: int = 3,
+            timeout: int = 5,
+            session_registry: Union[SessionPoolRegistry, None] = None,
+    ):
+        """
+        @param calls: the calls, either payload dicts with a method and
+        params or ExecutionJSONRPCRequests.
+        @param max_retries: max number of retries before bailing.
+        @param timeout: timeout to use per request.
+        @param session_registry: the connection pools to use.
+        """
+        payload: list[dict] = []
+        for ndx, call in enumerate(calls):
+            call_payload = (
+                call.payload if isinstance(call, ExecutionJSONRPCRequest) else call
+            )
+            payload.append(
+                {
+                    "jsonrpc": "2.0",
+                    "method": call_payload["method"],
+                    "params": call_payload.get("params", []),
+                    "id": ndx,
+                }
+            )
+        super().__init__(
+            payload=payload,
+            max_retries=max_retries,
+            timeout=timeout,
+            session_registry=session_registry,
+        )
 
-            except (requests.exceptions.RequestException, HTTPError) as e:
-                if attempt < self.max_retries - 1:
-                    logging.debug(
-                        f"{e.strerror} occurred during the API request {rpc_endpoint}. Retrying..."
-                    )
-                else:
-                    logging.error(
-                        f"Maximum number of retries reached for {rpc_endpoint}"
-                    )
-                    return e
+    def check_response_data(self, data: Any):
+        if not isinstance(data, list):
+            if isinstance(data, dict) and "error" in data:
+                raise ErrorResponse(data["error"])
+            raise ErrorResponse(f"expected a batch response, got: {data}")
 
-            except Exception as e:
-                if attempt < self.max_retries - 1:
-                    logging.debug(
-                        f"{e} occurred during the API request {rpc_endpoint}. Retrying..."
-                    )
-                else:
-                    logging.error(
-                        f"Maximum number of retries reached for {rpc_endpoint}"
-                    )
-                    return e
+    def get_results(
+            self, response: Union[Exception, requests.Response]
+    ) -> Union[Exception, list[Union[Any, ErrorResponse]]]:
+        """Get the results of the calls, in the order of the calls, if the
+        response is valid. Returns exception otherwise.
 
-            time.sleep(1)  # don't spam the clients.
-        return Exception("Unknown error occurred.")  # should not occur.
+        @param response: the response from performing this query.
+        @return: the result of every call, or an ErrorResponse for the
+        calls that failed.
+        """
+        if not self.is_valid(response):
+            return response  # the exception
+        by_id: dict[Any, dict] = {
+            item.get("id"): item for item in response.json() if isinstance(item, dict)
+        }
+        results: list[Union[Any, ErrorResponse]] = []
+        for call in self.payload:
+            item = by_id.get(call["id"])
+            if item is None:
+                results.append(ErrorResponse(f"no response for {call['method']}"))
+            elif "error" in item:
+                results.append(ErrorResponse(item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results
 
 
 class BeaconAPIRequest(ClientInstanceRequest):
-    def __init__(self, payload: str, max_retries: int = 3, timeout: int = 5):
-        super().__init__(payload, max_retries, timeout)
+    def __init__(
+            self,
+            payload: str,
+            max_retries: int = 3,
+            timeout: int = 5,
+            session_registry: Union[SessionPoolRegistry, None] = None,
+    ):
+        super().__init__(payload, max_retries, timeout, session_registry)
 
-    def perform_request(
-            self, instance: ClientInstance
-    ) -> Union[Exception, requests.Response]:
-        """Perform a request to the beacon client. Either return an exception
-        or a response.
+    def get_endpoint(self, instance: ClientInstance) -> str:
+        return f"{instance.get_consensus_beacon_api_path()}{self.payload}"
 
-        @param instance: client instance to send the request to.
-        @return: response on success, exception otherwise.
+    def send(self, instance: ClientInstance) -> requests.Response:
+        session = self.session_registry.get_pool(
+            instance, SessionPoolRegistry.BEACON_API
+        )
+        return session.get(self.get_endpoint(instance), timeout=self.timeout)
+
+
+class DeadlineExceeded(Exception):
+    """A client did not respond before the deadline of its batch."""
+
+
+class RequestExecutor:
+    """A long-lived, bounded thread pool shared by all batched requests.
+
+    The pool is created on first use and its threads are reused across
+    batches, at most max_workers requests are in flight at once.
+    """
+
+    def __init__(self, max_workers: int = 64):
         """
-        beacon_api_endpoint = instance.get_consensus_beacon_api_path()
-        request_str = f"{beacon_api_endpoint}{self.payload}"
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(request_str, timeout=self.timeout)
-                # raise an exception based on the response.
-                response.raise_for_status()
+        @param max_workers: max number of requests in flight at once.
+        """
+        self.max_workers: int = max_workers
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._lock = threading.Lock()
+
+    def configure(self, max_workers: int):
+        """Change the concurrency cap, the running pool is replaced once
+        its pending requests are done.
+
+        @param max_workers: max number of requests in flight at once.
+        """
+        with self._lock:
+            self.max_workers = max_workers
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def submit(self, req: ClientInstanceRequest, client: ClientInstance) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="client-request"
+                )
+            return self._executor.submit(req.perform_request, client)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
 
-                return response
 
-            except (requests.exceptions.RequestException, HTTPError) as connection_exception:
-                if attempt < self.max_retries - 1:
-                    err = connection_exception.strerror
-                    logging.debug(
-                        f"{err} occurred during the API request {beacon_api_endpoint}. Retrying..."
-                    )
-                else:
-                    logging.error(
-                        f"Maximum number of retries reached for {beacon_api_endpoint}"
-                    )
-                    return connection_exception
-
-            except Exception as unexpected_exception:
-                if attempt < self.max_retries - 1:
-                    err = unexpected_exception
-                    logging.debug(
-                        f"{err} occurred during the API request {beacon_api_endpoint}. Retrying..."
-                    )
-                else:
-                    logging.error(
-                        f"Maximum number of retries reached for {beacon_api_endpoint}"
-                    )
-                    return unexpected_exception
-
-            time.sleep(1)  # don't spam the clients.
+default_request_executor = RequestExecutor()
 
 
 def perform_batched_request(
-        req: ClientInstanceRequest, clients: list[ClientInstance]
+        req: ClientInstanceRequest,
+        clients: list[ClientInstance],
+        executor: Union[RequestExecutor, None] = None,
 ) -> dict[ClientInstance, Future]:
-    """Performs a batched request on a list of clients asynchronously. It
-    returns a dictionary.
-
-    of futures, keyed by the client instance name. @param req: @param
-    clients: @return: the future from
-    req.perform_request(client_instance)
+    """Performs a batched request on a list of clients asynchronously and
+    returns right away.
+
+    @param req: the request to perform on every client.
+    @param clients: the clients.
+    @param executor: the executor to use, default_request_executor if None.
+    @return: the futures of req.perform_request(client_instance), keyed by
+    the client instance.
     """
-    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
-        results_dict: dict[ClientInstance, Future] = {}
-        for client in clients:
-            results_dict[client] = executor.submit(req.perform_request, client)
-
-    return results_dict
+    executor = executor if executor is not None else default_request_executor
+    return {client: executor.submit(req, client) for client in clients}
+
+
+def perform_streaming_batched_request(
+        req: ClientInstanceRequest,
+        clients: list[ClientInstance],
+        deadline: Union[float, None] = None,
+        executor: Union[RequestExecutor, None] = None,
+) -> Iterator[Tuple[ClientInstance, Union[Exception, requests.Response]]]:
+    """Performs a batched request on a list of clients and yields the
+    responses in the order they complete.
+
+    @param req: the request to perform on every client.
+    @param clients: the clients.
+    @param deadline: seconds after which the clients that haven't
+    responded yet are yielded with a DeadlineExceeded exception.
+    @param executor: the executor to use, default_request_executor if None.
+    @return: iterator of (client, response or exception)
+    """
+    futures = perform_batched_request(req, clients, executor)
+    clients_by_future: dict[Future, ClientInstance] = {
+        future: client for client, future in futures.items()
+    }
+    pending: set[Future] = set(clients_by_future)
+    try:
+        for future in as_completed(clients_by_future, timeout=deadline):
+            pending.discard(future)
+            try:
+                yield clients_by_future[future], future.result()
+            except Exception as e:
+                yield clients_by_future[future], e
+    except FutureTimeoutError:
+        for client, future in futures.items():
+            if future in pending:
+                # requests that haven't started yet don't have to run at all.
+                future.cancel()
+                yield client, DeadlineExceeded(
+                    f"no response within {deadline}s from {client.name}"
+                )
 
 
 class eth_getBlockByNumber(ExecutionJSONRPCRequest):
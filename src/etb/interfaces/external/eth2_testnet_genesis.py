@@ -45,6 +45,29 @@ class Eth2TestnetGenesis:
         genesis_ssz_out: pathlib.Path,
         preset_args: List[str],
     ) -> Union[bytes, Exception]:
+        """Writes the genesis.ssz file and reads it back.
+
+        See write_genesis_ssz.
+        @return: genesis_ssz as bytes/stderr as Exception from eth2-testnet-genesis
+        """
+        out = self.write_genesis_ssz(
+            genesis_fork_name, config_in, genesis_ssz_out, preset_args
+        )
+        if isinstance(out, Exception):
+            return out
+
+        with open(genesis_ssz_out, "rb") as f:
+            data = f.read()
+
+        return data
+
+    def write_genesis_ssz(
+        self,
+        genesis_fork_name: str,
+        config_in: pathlib.Path,
+        genesis_ssz_out: pathlib.Path,
+        preset_args: List[str],
+    ) -> Union[pathlib.Path, Exception]:
         """Writes the genesis.ssz file.
 
         Usage:
@@ -53,7 +76,7 @@ class Eth2TestnetGenesis:
         @param config_in: path to the config file.
         @param genesis_ssz_out: where to write the genesis.ssz files.
         @param preset_args: any additional args to pass to eth2-testnet-genesis (--preset-fork {preset})
-        @return: genesis_ssz as bytes/stderr as Exception from eth2-testnet-genesis
+        @return: genesis_ssz_out/stderr as Exception from eth2-testnet-genesis
         """
         # this is needed to generate the genesis.ssz file.
         self._dump_validator_yaml()
@@ -79,7 +102,4 @@ class Eth2TestnetGenesis:
         if len(out.stderr) > 0:
             return Exception(out.stderr)
 
-        with open(genesis_ssz_out, "rb") as f:
-            data = f.read()
-
-        return data
+        return genesis_ssz_out
@@ -63,6 +63,7 @@ class Eth2ValTools:
         mnemonic: str,
         prysm: bool = False,
         prysm_password: str = "testnet_password",
+        insecure: bool = False,
     ) -> Union[str, Exception]:
         """Generate keystores for a range of validators.
 
@@ -72,7 +73,8 @@ class Eth2ValTools:
         :param mnemonic: the mnemonic to use to generate the keystores
         :param prysm: if True, generate prysm keystores
         :param prysm_password: what password to use for prysm keystores
-        :return:
+        :param insecure: use a cheap KDF, only for ephemeral testnets.
+        :return: stdout on success, the exception if eth2-val-tools failed.
         """
 
         logging.debug(
@@ -94,11 +96,18 @@ class Eth2ValTools:
             cmd.append("--prysm-pass")
             cmd.append(prysm_password)
 
+        if insecure:
+            cmd.append("--insecure")
+
         logging.debug(f"Running command: {cmd}")
         try:
             out = subprocess.run(cmd, capture_output=True, check=True)
+            # eth2-val-tools may log to stderr on success, only the exit
+            # code tells us whether it failed.
             if len(out.stderr) > 0:
-                return Exception(out.stderr)
+                logging.warning(
+                    f"eth2-val-tools keystores: {out.stderr.decode('utf-8').strip()}"
+                )
 
             return out.stdout.decode("utf-8")
         except subprocess.CalledProcessError as e:
@@ -0,0 +1,40 @@
+"""
+geth interface
+"""
+import logging
+import pathlib
+import subprocess
+from typing import Union
+
+
+class Geth:
+    """
+    geth interface, only used to prepare datadirs ahead of time.
+    """
+
+    def __init__(self, binary: str = "geth"):
+        self.binary: str = binary
+
+    def init(
+        self, datadir: pathlib.Path, genesis_file: pathlib.Path
+    ) -> Union[str, Exception]:
+        """Initialize a datadir with a genesis file (geth init).
+
+        :param datadir: the datadir to initialize.
+        :param genesis_file: the geth genesis file.
+        :return: the output of geth init or an Exception.
+        """
+        cmd = [
+            self.binary,
+            "init",
+            "--datadir",
+            str(datadir),
+            str(genesis_file),
+        ]
+        logging.debug(f"Running command: {cmd}")
+        try:
+            # geth logs to stderr, so only the exit code tells us it failed.
+            out = subprocess.run(cmd, capture_output=True, check=True)
+            return out.stderr.decode("utf-8")
+        except (subprocess.CalledProcessError, OSError) as e:
+            return Exception(getattr(e, "stderr", None) or e)
@@ -0,0 +1,195 @@
+"""Persistent HTTP connection pools for the requests to client instances.
+
+The module level requests.get/requests.post open a new connection for
+every call. Instead every (client instance, endpoint) pair gets its own
+requests.Session whose connections are kept alive and reused across
+requests, e.g. every slot of node_watch. Pools that have not been used
+for idle_timeout seconds are closed the next time the registry is used.
+
+The ClientInstanceRequests use the default registry unless they are
+given one:
+
+    default_session_registry.configure(pool_maxsize=8, idle_timeout=60)
+    response = BeaconAPIgetGenesis().perform_request(instance)
+    logging.info(default_session_registry.describe())
+"""
+import threading
+import time
+from typing import Any, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config.etb_config import ClientInstance
+
+
+class SessionPoolStats:
+    """The usage of a SessionPool."""
+
+    def __init__(self, requests_sent: int, connections_opened: int, open_sockets: int):
+        self.requests_sent: int = requests_sent
+        self.connections_opened: int = connections_opened
+        self.open_sockets: int = open_sockets
+
+    def reuse_rate(self) -> float:
+        """Fraction of the requests that were sent over an existing connection."""
+        if self.requests_sent == 0:
+            return 0.0
+        return max(0.0, 1 - self.connections_opened / self.requests_sent)
+
+    def __repr__(self):
+        return (
+            f"{self.requests_sent} requests, {self.connections_opened} connections "
+            f"opened, {self.reuse_rate():.0%} reused, {self.open_sockets} open sockets"
+        )
+
+
+class SessionPool:
+    """A keep-alive session to one endpoint of one client instance."""
+
+    def __init__(self, base_url: str, pool_maxsize: int = 4):
+        """
+        @param base_url: the endpoint, e.g. http://10.0.20.2:5052
+        @param pool_maxsize: max connections kept open to the endpoint.
+        """
+        self.base_url: str = base_url
+        self.session: requests.Session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.last_used: float = time.monotonic()
+        self._in_flight: int = 0
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send a request, see requests.Session.request.
+
+        @param method: the http method.
+        @param url: the full url of the request.
+        @return: the response.
+        """
+        with self._lock:
+            self._in_flight += 1
+            self.last_used = time.monotonic()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.last_used = time.monotonic()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def is_idle(self, idle_timeout: float) -> bool:
+        with self._lock:
+            return (
+                self._in_flight == 0
+                and time.monotonic() - self.last_used > idle_timeout
+            )
+
+    def stats(self) -> SessionPoolStats:
+        """The request and connection counts of the underlying urllib3 pool."""
+        adapter = self.session.get_adapter(self.base_url)
+        pool = adapter.poolmanager.connection_from_url(self.base_url)
+        idle_sockets = 0
+        if pool.pool is not None:
+            idle_sockets = sum(
+                1
+                for conn in list(pool.pool.queue)
+                if conn is not None and getattr(conn, "sock", None) is not None
+            )
+        return SessionPoolStats(
+            pool.num_requests, pool.num_connections, idle_sockets + self._in_flight
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class SessionPoolRegistry:
+    """The SessionPools, keyed by client instance and endpoint kind."""
+
+    # endpoint kinds
+    EXECUTION_RPC = "execution-rpc"
+    BEACON_API = "beacon-api"
+
+    def __init__(self, pool_maxsize: int = 4, idle_timeout: float = 120.0):
+        """
+        @param pool_maxsize: max connections kept open per pool.
+        @param idle_timeout: seconds after which an unused pool is closed.
+        """
+        self.pool_maxsize: int = pool_maxsize
+        self.idle_timeout: float = idle_timeout
+        self.pools: dict[tuple[str, str], SessionPool] = {}
+        self.evicted: int = 0
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        pool_maxsize: Union[int, None] = None,
+        idle_timeout: Union[float, None] = None,
+    ):
+        """Change the settings, applies to pools created from now on."""
+        with self._lock:
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+
+    def _evict_idle(self):
+        for key in [key for key, pool in self.pools.items() if pool.is_idle(self.idle_timeout)]:
+            self.pools.pop(key).close()
+            self.evicted += 1
+
+    def get_pool(self, instance: ClientInstance, kind: str) -> SessionPool:
+        """Get (or create) the pool for an endpoint of a client instance.
+
+        @param instance: the client instance.
+        @param kind: EXECUTION_RPC or BEACON_API
+        @return: the pool.
+        """
+        if kind == self.EXECUTION_RPC:
+            base_url = instance.get_execution_jsonrpc_path()
+        elif kind == self.BEACON_API:
+            base_url = instance.get_consensus_beacon_api_path()
+        else:
+            raise Exception(f"Unknown endpoint kind: {kind}")
+        with self._lock:
+            self._evict_idle()
+            key = (instance.name, kind)
+            if key not in self.pools:
+                self.pools[key] = SessionPool(base_url, self.pool_maxsize)
+            return self.pools[key]
+
+    def stats(self) -> dict[str, SessionPoolStats]:
+        """The stats of every open pool, keyed by "instance/kind"."""
+        with self._lock:
+            pools = dict(self.pools)
+        return {f"{name}/{kind}": pool.stats() for (name, kind), pool in pools.items()}
+
+    def describe(self) -> str:
+        """A summary of all pools, followed by the stats per pool."""
+        stats = self.stats()
+        total = SessionPoolStats(
+            sum(s.requests_sent for s in stats.values()),
+            sum(s.connections_opened for s in stats.values()),
+            sum(s.open_sockets for s in stats.values()),
+        )
+        out = f"{len(stats)} session pools ({self.evicted} evicted): {total}"
+        for name, pool_stats in sorted(stats.items()):
+            out += f"\n\t{name}: {pool_stats}"
+        return out
+
+    def close(self):
+        """Close all the pools."""
+        with self._lock:
+            for pool in self.pools.values():
+                pool.close()
+            self.pools.clear()
+
+
+default_session_registry = SessionPoolRegistry()
@@ -18,10 +18,12 @@ from etb.common.utils import create_logger
 from etb.config.etb_config import ETBConfig, ClientInstance, get_etb_config
 from etb.interfaces.client_request import (
     BeaconAPIgetBlockV2,
-    perform_batched_request,
+    perform_streaming_batched_request,
     ClientInstanceRequest,
+    default_request_executor,
     BeaconAPIgetFinalityCheckpoints,
 )
+from etb.interfaces.session_pool import default_session_registry
 from etb.interfaces.testnet_monitor import (
     TestnetMonitor,
     TestnetMonitorAction,
@@ -56,10 +58,18 @@ class NodeWatchMetric:
         request: ClientInstanceRequest,
         name: str,
         max_retries_for_consensus: int = 3,
+        batch_deadline: Union[float, None] = None,
     ):
+        """
+        request: the request to send to every client instance.
+        name: the name of the metric.
+        max_retries_for_consensus: the number of times to retry to get consensus.
+        batch_deadline: clients that didn't respond within this many seconds are unreachable.
+        """
         self.request = request
         self.name = name
         self.max_retries_for_consensus = max_retries_for_consensus
+        self.batch_deadline = batch_deadline
 
     @abstractmethod
     def parse_response(self, response: requests.Response) -> Union[Any, None]:
@@ -78,12 +88,10 @@ class NodeWatchMetric:
             results: dict[str, list[ClientInstance]] = {}
             unreachable_clients: list[ClientInstance] = []
             invalid_response_clients: list[ClientInstance] = []
-            for client, api_future in perform_batched_request(
-                self.request, client_instances
-            ).items():
-                # reset the query list
-                response: Union[requests.Response,
-                                Exception] = api_future.result()
+            response: Union[requests.Response, Exception]
+            for client, response in perform_streaming_batched_request(
+                self.request, client_instances, deadline=self.batch_deadline
+            ):
                 if not self.request.is_valid(response):
                     unreachable_clients.append(client)
                 else:
@@ -145,6 +153,7 @@ class HeadsMetric(NodeWatchMetric):
         timeout: int,
         max_retries_for_consensus: int,
         last_n_root_bytes: int = 4,
+        batch_deadline: Union[float, None] = None,
     ):
         super().__init__(
             BeaconAPIgetBlockV2(
@@ -153,6 +162,7 @@ class HeadsMetric(NodeWatchMetric):
                 timeout=timeout),
             max_retries_for_consensus=max_retries_for_consensus,
             name="heads",
+            batch_deadline=batch_deadline,
         )
         self.last_n_root_bytes = last_n_root_bytes
 
@@ -191,6 +201,7 @@ class CheckpointsMetric(NodeWatchMetric):
         timeout: int,
         max_retries_for_consensus: int,
         last_n_root_bytes: int = 4,
+        batch_deadline: Union[float, None] = None,
     ):
         super().__init__(
             request=BeaconAPIgetFinalityCheckpoints(
@@ -198,6 +209,7 @@ class CheckpointsMetric(NodeWatchMetric):
             ),
             max_retries_for_consensus=max_retries_for_consensus,
             name="checkpoints",
+            batch_deadline=batch_deadline,
         )
         self.last_n_root_bytes = last_n_root_bytes
 
@@ -252,12 +264,14 @@ class HeadsAndCheckpointsMonitorAction(TestnetMonitorAction):
         max_retries: int,
         timeout: int,
         max_retries_for_consensus: int,
+        batch_deadline: Union[float, None] = None,
     ):
         """
         client_instances: a list of client instances to monitor.
         max_retries: the number of times to retry a request.
         timeout: the timeout for a request.
         max_retries_for_consensus: the number of times to retry to get consensus.
+        batch_deadline: clients that didn't respond within this many seconds are unreachable.
         """
         super().__init__(
             name="head_slots", interval=TestnetMonitorActionInterval.EVERY_SLOT
@@ -266,11 +280,13 @@ class HeadsAndCheckpointsMonitorAction(TestnetMonitorAction):
             max_retries=max_retries,
             timeout=timeout,
             max_retries_for_consensus=max_retries_for_consensus,
+            batch_deadline=batch_deadline,
         )
         self.get_checkpoints_metric = CheckpointsMetric(
             max_retries=max_retries,
             timeout=timeout,
             max_retries_for_consensus=max_retries_for_consensus,
+            batch_deadline=batch_deadline,
         )
         self.instances_to_monitor = client_instances
 
@@ -314,6 +330,7 @@ class HeadsAndCheckpointsMonitorAction(TestnetMonitorAction):
         logging.info(head_metric_as_str)
         logging.info("checkpoints:")
         logging.info(checkpoint_metric_as_str)
+        logging.debug(default_session_registry.describe())
 
 
 class NodeWatch:
@@ -327,12 +344,14 @@ class NodeWatch:
         max_retries: int,
         timeout: int,
         max_retries_for_consensus: int = 3,
+        batch_deadline: Union[float, None] = None,
     ):
         """
         etb_config: the ETBConfig for the experiment.
         max_retries: the number of times to retry a request for a single client.
         timeout: the timeout for the requests.
         max_retries_for_consensus: the number of times to retry a series of requests to get consensus among all clients.
+        batch_deadline: clients that didn't respond to a batch of requests within this many seconds are unreachable.
         """
         self.etb_config = etb_config
         self.max_retries = max_retries
@@ -345,6 +364,7 @@ class NodeWatch:
             max_retries=self.max_retries,
             timeout=self.timeout,
             max_retries_for_consensus=max_retries_for_consensus,
+            batch_deadline=batch_deadline,
         )
 
         self.testnet_monitor.add_action(status_action)
@@ -410,6 +430,40 @@ if __name__ == "__main__":
         "node we may wait timeout*max_retries seconds.",
     )
 
+    parser.add_argument(
+        "--batch-deadline",
+        dest="batch_deadline",
+        type=float,
+        default=None,
+        help="Consider nodes that haven't responded to a batch of "
+        "requests within this many seconds unreachable.",
+    )
+
+    parser.add_argument(
+        "--max-concurrent-requests",
+        dest="max_concurrent_requests",
+        type=int,
+        default=64,
+        help="Max number of requests in flight across all nodes.",
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        type=int,
+        default=4,
+        help="Max number of keep-alive connections per node endpoint.",
+    )
+
+    parser.add_argument(
+        "--pool-idle-timeout",
+        dest="pool_idle_timeout",
+        type=float,
+        default=120.0,
+        help="Close the connections to a node endpoint after it has "
+        "not been used for this many seconds.",
+    )
+
     parser.add_argument(
         "--delay",
         dest="delay",
@@ -429,6 +483,11 @@ if __name__ == "__main__":
         log_level=args.log_level.upper(),
         log_to_file=True)
 
+    default_session_registry.configure(
+        pool_maxsize=args.pool_size, idle_timeout=args.pool_idle_timeout
+    )
+    default_request_executor.configure(max_workers=args.max_concurrent_requests)
+
     logging.info("Getting view of the testnet from etb-config.")
     etb_config: ETBConfig = get_etb_config()
 
@@ -436,6 +495,7 @@ if __name__ == "__main__":
         etb_config=etb_config,
         max_retries=args.max_retries,
         timeout=args.request_timeout,
+        batch_deadline=args.batch_deadline,
     )
 
     logging.info("Starting node watch.")
@@ -9,14 +9,51 @@ import pathlib
 import random
 import re
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from pathlib import Path
 from typing import Union, Any
 
 import requests
 from ruamel import yaml
 
-from etb.common.utils import create_logger
+from etb.common.artifacts import Artifact, ArtifactGraph
+from etb.common.filesystem import (
+    PlacementStats,
+    clone_file,
+    clone_tree,
+    move_aside,
+    place,
+    remove_tree,
+    sha256_file,
+    write_checksum_manifest,
+)
+from etb.common.key_manifest import write_key_manifest
+from etb.common.keystore_cache import KeystoreCache, KeystoreCacheKey
+from etb.common.cl_node_keys import (
+    CL_NETWORK_KEY_FILES,
+    STATIC_PEERS_ENR_FILE,
+    STATIC_PEERS_MULTIADDR_FILE,
+    enr,
+    multiaddr,
+    peer_id,
+    write_cl_static_peering_files,
+)
+from etb.common.node_keys import (
+    STATIC_PEERING_FILES,
+    derive_node_key,
+    enode,
+    write_static_peering_files,
+)
+from etb.common.phases import PhaseDAG
+from etb.common.timeline import Timeline
+from etb.common.topology import build_topology, describe_graph
+from etb.common.utils import create_logger, get_account_cache
+from etb.common.validator_keys import (
+    NativeKeystoreGenerator,
+    measure_keystore_decrypt_time,
+)
 from etb.config.etb_config import (
     ETBConfig,
     FilesConfig,
@@ -24,6 +61,7 @@ from etb.config.etb_config import (
     ClientInstanceCollectionConfig,
 )
 from etb.genesis.consensus_genesis import ConsensusGenesisWriter
+from etb.genesis.consensus_genesis_template import ConsensusGenesisTemplate
 from etb.genesis.execution_genesis import ExecutionGenesisWriter
 from etb.interfaces.client_request import (
     eth_getBlockByNumber,
@@ -32,6 +70,7 @@ from etb.interfaces.client_request import (
     admin_addPeer,
 )
 from etb.interfaces.external.eth2_val_tools import Eth2ValTools
+from etb.interfaces.external.geth import Geth
 
 
 class EthereumTestnetBootstrapper:
@@ -54,11 +93,18 @@ class EthereumTestnetBootstrapper:
     """
 
     def __init__(self):
-        pass
+        # replaced with a fresh timeline for every bootstrap.
+        self.timeline: Timeline = Timeline("etb")
 
-    def clean(self):
+    def clean(self, deferred: bool = False):
         """Cleans up the testnet root directory and docker-compose file.
 
+        The last run is first renamed into the etb trash dir, which is
+        instant, and then removed by a parallel remover. The etb cache dir
+        is left in place.
+
+        @param deferred: only move the last run aside, the next init_testnet
+            removes it in the background.
         @return:
         """
         files_config = FilesConfig()
@@ -67,16 +113,48 @@ class EthereumTestnetBootstrapper:
         )
         docker_compose_file = files_config.docker_compose_file
         if files_config.testnet_root.exists():
-            for root, dirs, files in os.walk(files_config.testnet_root):
-                for file in files:
-                    pathlib.Path(f"{root}/{file}").unlink()
-                for directory in dirs:
-                    shutil.rmtree(f"{root}/{directory}")
+            # the cache is meant to outlive the testnet.
+            moved = move_aside(
+                files_config.testnet_root,
+                files_config.etb_trash_dir,
+                keep=[files_config.etb_cache_dir],
+            )
+            if moved is not None:
+                logging.debug(f"moved the last run to {moved}")
 
         if docker_compose_file.exists():
             docker_compose_file.unlink()
 
-    def init_testnet(self, config_path: Path):
+        if deferred:
+            logging.info(
+                "deferring removal of the last run to the next init-testnet.")
+        else:
+            self._reap_trash(files_config)
+
+    def _reap_trash(self, files_config: FilesConfig):
+        """Removes the runs that clean moved into the etb trash dir.
+
+        @param files_config: the FilesConfig holding the trash dir.
+        @return:
+        """
+        trash_dir: pathlib.Path = files_config.etb_trash_dir
+        if not trash_dir.exists():
+            return
+        for entry in trash_dir.iterdir():
+            if entry.is_dir() and not entry.is_symlink():
+                remove_tree(entry)
+            else:
+                entry.unlink()
+
+    def init_testnet(
+        self,
+        config_path: Path,
+        keystore_workers: Union[int, None] = None,
+        keystore_cache_max_size: Union[int, None] = None,
+        native_keystores: bool = False,
+        index_validator_pubkeys: bool = False,
+        persist_accounts: bool = False,
+    ):
         """Initializes the testnet directory, 3 phases.
 
         1. populate client-specific static files:
@@ -85,27 +163,291 @@ class EthereumTestnetBootstrapper:
             - validator keystores
         2. Write the etb-config file into the testnet-dir.
         3. Write the docker-compose file to use for bootstrapping later.
+
+        The artifacts are tracked in an etb.common.artifacts.ArtifactGraph,
+        so re-running init on an edited config only rebuilds what changed.
         @param config_path: path to the etb-config file.
+        @param keystore_workers: number of client instances to generate keystores for concurrently.
+        @param keystore_cache_max_size: max size of the keystore cache in bytes, None disables the cache.
+        @param native_keystores: derive the keystores in-process instead of using eth2-val-tools.
+        @param index_validator_pubkeys: build the validator pubkey index now
+            instead of on its first use.
+        @param persist_accounts: keep the derived premine accounts, private
+            keys included, in the etb cache dir for reuse by later runs.
         @return:
         """
         etb_config: ETBConfig = ETBConfig(config_path)
         # this file holds all the static files for the nodes.
         local_testnet_dir: pathlib.Path = etb_config.files.local_testnet_dir
 
-        # check to see if we have a testnet already here.
-        if local_testnet_dir.exists():
+        # finish off a deferred clean while we init.
+        reaper: Union[threading.Thread, None] = None
+        if etb_config.files.etb_trash_dir.exists():
+            logging.info("removing previous runs in the background")
+            reaper = threading.Thread(
+                target=self._reap_trash, args=(etb_config.files,), name="reaper"
+            )
+            reaper.start()
+
+        # check to see if we have a testnet already here. A previous init
+        # is updated in place, anything else has to be cleaned first.
+        if etb_config.files.etb_config_checkpoint_file.exists():
+            raise Exception(
+                "the testnet was already bootstrapped, please run `make clean` first."
+            )
+        if local_testnet_dir.exists() and not etb_config.files.init_artifacts_file.exists():
             raise Exception(
                 f"non-empty local-testnet-dir:{local_testnet_dir}, please run `make clean` first."
             )
-        local_testnet_dir.mkdir(parents=True)  # /data/local_testnet
+        local_testnet_dir.mkdir(parents=True, exist_ok=True)  # /data/local_testnet
+
+        # the accounts are only persisted if the dir exists.
+        if persist_accounts:
+            etb_config.files.account_cache_dir.mkdir(parents=True, exist_ok=True)
+        elif etb_config.files.account_cache_dir.exists():
+            logging.info("removing the persisted premine accounts.")
+            shutil.rmtree(etb_config.files.account_cache_dir)
+
+        keystore_cache: Union[KeystoreCache, None] = None
+        if keystore_cache_max_size is not None:
+            keystore_cache = KeystoreCache(
+                etb_config.files.etb_cache_dir / "keystores",
+                max_size_bytes=keystore_cache_max_size,
+            )
+
+        def _build_client_instances(artifacts: list[Artifact]):
+            self._populate_client_instances(
+                etb_config,
+                [artifact.context for artifact in artifacts],
+                keystore_workers=keystore_workers,
+                keystore_cache=keystore_cache,
+                native_keystores=native_keystores,
+            )
+
+        def _build_el_static_peers(artifacts: list[Artifact]):
+            logging.info("writing execution client node keys and static peers..")
+            self._write_el_static_peers(etb_config)
+
+        def _build_cl_static_peers(artifacts: list[Artifact]):
+            logging.info("writing consensus client identities and static peers..")
+            self._write_cl_static_peers(etb_config)
+
+        def _build_premine_key_manifest(artifacts: list[Artifact]):
+            logging.info("exporting premine account keys..")
+            self._write_premine_key_manifest(etb_config)
+
+        def _build_genesis_template(artifacts: list[Artifact]):
+            # any genesis time will do, it is patched during bootstrap.
+            logging.info("pre-generating the consensus genesis state..")
+            template_config: ETBConfig = ETBConfig(config_path)
+            template_config.set_genesis_time(int(time.time()))
+            ConsensusGenesisTemplate(
+                etb_config.files.consensus_genesis_template_dir
+            ).create(template_config)
+
+        def _build_etb_config(artifacts: list[Artifact]):
+            # write the etb-config file into the testnet-dir.
+            logging.info("writing etb-config file..")
+            etb_config.write_config(
+                etb_config.files.testnet_root /
+                "etb-config.yaml")
+
+        def _build_docker_compose(artifacts: list[Artifact]):
+            # lastly write the docker-compose file to use for bootstrapping later.
+            logging.info("writing docker-compose file..")
+            with open(etb_config.files.docker_compose_file, "w", encoding="utf-8") as docker_file:
+                # remove identities and aliases from the yaml file to ease
+                # readability for end users.
+                class NoAliasDumper(yaml.SafeDumper):
+                    """
+                    A dumper that will never emit aliases.
+                    """
 
-        # create the client directories
+                    def ignore_aliases(self, data):
+                        return True
+
+                docker_file.write(
+                    yaml.dump(docker_compose_repr, Dumper=NoAliasDumper)
+                )
+
+        consensus_layer = etb_config.testnet_config.consensus_layer
+        execution_layer = etb_config.testnet_config.execution_layer
+        graph = ArtifactGraph(etb_config.files.init_artifacts_file)
         # directory structure:
         # /testnet_root/local_testnet/collection_name/node_<node_num>/{cl
         # files/el dir}
-        logging.info("populating client directories and jwt-secret files")
         client_instance: ClientInstance
         for client_instance in etb_config.get_client_instances():
+            graph.add(
+                Artifact(
+                    name=f"client-instance/{client_instance.name}",
+                    inputs={
+                        "execution-client": client_instance.execution_config.client,
+                        "consensus-client": client_instance.consensus_config.client,
+                        "validator-range": self._get_validator_range(client_instance),
+                        "validator-mnemonic": consensus_layer.validator_mnemonic,
+                        "validator-password": client_instance.validator_password,
+                        "keystore-kdf": consensus_layer.keystore_kdf,
+                    },
+                    outputs=[client_instance.node_dir],
+                    builder=_build_client_instances,
+                    context=client_instance,
+                )
+            )
+        if execution_layer.peering_mode == "static":
+            graph.add(
+                Artifact(
+                    name="el-static-peers",
+                    inputs={
+                        "chain-id": execution_layer.chain_id,
+                        "peering-topology": execution_layer.peering_topology,
+                        "peering-degree": execution_layer.peering_degree,
+                        "nodes": [
+                            [
+                                client_instance.name,
+                                client_instance.collection_config.name,
+                                client_instance.execution_config.client,
+                                client_instance.get_ip_address(),
+                                client_instance.execution_config.p2p_port,
+                            ]
+                            for client_instance in etb_config.get_client_instances()
+                        ],
+                    },
+                    outputs=[etb_config.files.el_peer_graph_file]
+                    + [
+                        client_instance.el_dir / peering_file
+                        for client_instance in etb_config.get_client_instances()
+                        for peering_file in STATIC_PEERING_FILES.get(
+                            client_instance.execution_config.client, ()
+                        )
+                    ],
+                    builder=_build_el_static_peers,
+                    # the files live in the client instance dirs.
+                    deps=[
+                        f"client-instance/{client_instance.name}"
+                        for client_instance in etb_config.get_client_instances()
+                    ],
+                )
+            )
+        if consensus_layer.peering_mode == "static":
+            graph.add(
+                Artifact(
+                    name="cl-static-peers",
+                    inputs={
+                        "chain-id": execution_layer.chain_id,
+                        "peering-topology": consensus_layer.peering_topology,
+                        "peering-degree": consensus_layer.peering_degree,
+                        "nodes": [
+                            [
+                                client_instance.name,
+                                client_instance.collection_config.name,
+                                client_instance.consensus_config.client,
+                                client_instance.get_ip_address(),
+                                client_instance.consensus_config.p2p_port,
+                            ]
+                            for client_instance in etb_config.get_client_instances()
+                        ],
+                    },
+                    outputs=[etb_config.files.cl_peer_graph_file]
+                    + [
+                        client_instance.node_dir / peering_file
+                        for client_instance in etb_config.get_client_instances()
+                        for peering_file in [
+                            CL_NETWORK_KEY_FILES.get(
+                                client_instance.consensus_config.client
+                            ),
+                            STATIC_PEERS_ENR_FILE,
+                            STATIC_PEERS_MULTIADDR_FILE,
+                        ]
+                        if peering_file is not None
+                    ],
+                    builder=_build_cl_static_peers,
+                    deps=[
+                        f"client-instance/{client_instance.name}"
+                        for client_instance in etb_config.get_client_instances()
+                    ],
+                )
+            )
+        graph.add(
+            Artifact(
+                name="premine-key-manifest",
+                inputs={
+                    "account-mnemonic": execution_layer.account_mnemonic,
+                    "keystore-passphrase": execution_layer.keystore_passphrase,
+                    "premines": execution_layer.premines,
+                },
+                outputs=[etb_config.files.premine_key_manifest_file],
+                builder=_build_premine_key_manifest,
+            )
+        )
+        if consensus_layer.pregenerate_genesis_state:
+            graph.add(
+                Artifact(
+                    name="consensus-genesis-template",
+                    inputs=ConsensusGenesisTemplate.fingerprint(etb_config),
+                    outputs=[etb_config.files.consensus_genesis_template_dir],
+                    builder=_build_genesis_template,
+                )
+            )
+        graph.add(
+            Artifact(
+                name="etb-config",
+                # pylint: disable=protected-access
+                inputs=etb_config._config,
+                outputs=[etb_config.files.testnet_root / "etb-config.yaml"],
+                builder=_build_etb_config,
+            )
+        )
+        docker_compose_repr = etb_config.get_docker_compose_repr()
+        graph.add(
+            Artifact(
+                name="docker-compose",
+                inputs=docker_compose_repr,
+                outputs=[etb_config.files.docker_compose_file],
+                builder=_build_docker_compose,
+            )
+        )
+        report = graph.build()
+        logging.info(f"init artifacts: {report}")
+        if len(report.reused) > 0:
+            logging.info(f"reused: {', '.join(report.reused)}")
+        if len(report.removed) > 0:
+            logging.info(f"removed: {', '.join(report.removed)}")
+
+        # incremental on its own, and kept in the cache dir across runs.
+        # otherwise it is built by the first get_validator_pubkey_index().
+        if index_validator_pubkeys:
+            logging.info("indexing validator pubkeys..")
+            derived = etb_config.build_validator_pubkey_index()
+            logging.debug(f"derived {derived} new validator pubkeys")
+
+        if reaper is not None:
+            logging.info("waiting on the removal of previous runs..")
+            reaper.join()
+
+    def _populate_client_instances(
+        self,
+        etb_config: ETBConfig,
+        client_instances: list[ClientInstance],
+        keystore_workers: Union[int, None] = None,
+        keystore_cache: Union[KeystoreCache, None] = None,
+        native_keystores: bool = False,
+    ):
+        """Create the directories, jwt-secret files and validator keystores
+        of some client instances.
+
+        @param etb_config: the config being initialized.
+        @param client_instances: the instances to populate.
+        @param keystore_workers: see init_testnet.
+        @param keystore_cache: optional cache of generated keystores.
+        @param native_keystores: see init_testnet.
+        @return:
+        """
+        logging.info(
+            f"populating client directories and jwt-secret files for "
+            f"{len(client_instances)} client instances"
+        )
+        for client_instance in client_instances:
             client_instance.el_dir.mkdir(parents=True, exist_ok=True)
 
             # create the jwt-secret file:
@@ -117,32 +459,34 @@ class EthereumTestnetBootstrapper:
 
         # write all validator keystores.
         logging.info("populating validator keystores")
-        self._write_validator_keystores(etb_config)
-
-        # write the etb-config file into the testnet-dir.
-        logging.info("writing etb-config file..")
-        etb_config.write_config(
-            etb_config.files.testnet_root /
-            "etb-config.yaml")
-
-        # lastly write the docker-compose file to use for bootstrapping later.
-        logging.info("writing docker-compose file..")
-        with open(etb_config.files.docker_compose_file, "w", encoding="utf-8") as docker_file:
-            # remove identities and aliases from the yaml file to ease
-            # readability for end users.
-            class NoAliasDumper(yaml.SafeDumper):
-                """
-                A dumper that will never emit aliases.
-                """
-
-                def ignore_aliases(self, data):
-                    return True
-
-            docker_file.write(
-                yaml.dump(
-                    etb_config.get_docker_compose_repr(), Dumper=NoAliasDumper
-                )
-            )
+        self._write_validator_keystores(
+            etb_config,
+            max_workers=keystore_workers,
+            keystore_cache=keystore_cache,
+            native_keystores=native_keystores,
+            client_instances=client_instances,
+        )
+
+    def _write_premine_key_manifest(self, etb_config: ETBConfig):
+        """Derive the premine accounts and export their keys for load tools.
+
+        The EL genesis reads the accounts back from the manifest, so
+        bootstrap doesn't have to derive them again.
+        @param etb_config: the config being initialized.
+        @return:
+        """
+        el_config = etb_config.testnet_config.execution_layer
+        start = time.monotonic()
+        accounts = get_account_cache().derive_accounts(
+            el_config.account_mnemonic,
+            [acc for acc, _ in el_config.get_premines()],
+            el_config.keystore_passphrase,
+        )
+        count = write_key_manifest(
+            etb_config.files.premine_key_manifest_file, accounts)
+        logging.debug(
+            f"exported {count} premine keys in {time.monotonic() - start:.3f}s"
+        )
 
     def bootstrap_testnet(self, config_path: Path, global_timeout: int = 60):
         """Bootstraps the testnet. This happens in several phases, each
@@ -152,122 +496,313 @@ class EthereumTestnetBootstrapper:
         2. Signal the consensus bootnodes to come up.
         3. Start the execution clients.
 
+        Every phase is timed, the timeline is written next to the
+        etb-config.yaml file (as json and as a chrome trace) and a summary
+        is logged once done.
         @param global_timeout: the max amount of time to wait for any RPC request.
         @param config_path: path to the etb-config file.
         @return:
         """
+        self.timeline = Timeline("bootstrap-testnet")
+        files_config = FilesConfig()
+        try:
+            self._bootstrap_testnet(config_path, global_timeout)
+        finally:
+            self.timeline.write(
+                files_config.bootstrap_timeline_file,
+                files_config.bootstrap_trace_file,
+            )
+            logging.info(self.timeline.summary())
 
-        # 1 prep the shared etb-config.yaml file with the bootstrap time.
+    def _bootstrap_testnet(self, config_path: Path, global_timeout: int):
+        """The phases of bootstrap_testnet, see bootstrap_testnet.
+
+        The phases form a DAG (see etb.common.phases) so independent ones
+        overlap, e.g. the consensus config.yaml is written while the ELs
+        come up and the CL clients are signalled while the ELs are being
+        paired. The checkpoint files are barriers for the containers, so
+        every signal phase depends on everything its clients read.
+        @param config_path: path to the etb-config file.
+        @param global_timeout: the max amount of time to wait for any RPC request.
+        @return:
+        """
+        timeline = self.timeline
         logging.info("bootstrapping testnet..")
         etb_config: ETBConfig = ETBConfig(path=config_path)
         etb_config.set_genesis_time(int(time.time()))
-        etb_config.write_config(
-            etb_config.files.testnet_root /
-            "etb-config.yaml")
-        with open(
-            etb_config.files.etb_config_checkpoint_file, "w", encoding="utf-8"
-        ) as etb_checkpoint:
-            etb_checkpoint.write("")
+
+        # 1 prep the shared etb-config.yaml file with the bootstrap time.
+        def _config_write(results: dict[str, Any]):
+            etb_config.write_config(
+                etb_config.files.testnet_root /
+                "etb-config.yaml")
+            with open(
+                etb_config.files.etb_config_checkpoint_file, "w", encoding="utf-8"
+            ) as etb_checkpoint:
+                etb_checkpoint.write("")
 
         # (if you need anything to run before the testnet starts, do it here)
 
         # 2 signal the consensus bootnodes to come up.
-        logging.info("signaling consensus bootnodes to come up..")
-        with open(
-            etb_config.files.consensus_bootnode_checkpoint_file, "w"
-        ) as bootnode_checkpoint:
-            bootnode_checkpoint.write("")
+        def _bootnode_signal(results: dict[str, Any]):
+            logging.info("signaling consensus bootnodes to come up..")
+            with open(
+                etb_config.files.consensus_bootnode_checkpoint_file, "w"
+            ) as bootnode_checkpoint:
+                bootnode_checkpoint.write("")
 
         # 3. handle execution clients.
         # create genesis files
-        logging.info("creating execution layer genesis files..")
-        egw = ExecutionGenesisWriter(etb_config)
-        with open(
-            etb_config.files.geth_genesis_file, "w", encoding="utf-8"
-        ) as geth_genesis:
-            geth_genesis.write(json.dumps(egw.create_geth_genesis()))
-        with open(
-            etb_config.files.besu_genesis_file, "w", encoding="utf-8"
-        ) as besu_genesis:
-            besu_genesis.write(json.dumps(egw.create_besu_genesis()))
-        with open(
-            etb_config.files.nether_mind_genesis_file, "w", encoding="utf-8"
-        ) as nethermind_genesis:
-            nethermind_genesis.write(json.dumps(
-                egw.create_nethermind_genesis()))
+        def _el_genesis(results: dict[str, Any]):
+            logging.info("creating execution layer genesis files..")
+            egw = ExecutionGenesisWriter(etb_config)
+            with timeline.span("el-allocs"):
+                egw.get_allocs()
+            with timeline.span("el-genesis-write"):
+                egw.write_genesis_files()
+
+        def _el_datadirs(results: dict[str, Any]):
+            self._prepare_execution_datadirs(etb_config)
+
         # signal all execution clients to start.
-        with open(
-            etb_config.files.execution_checkpoint_file, "w", encoding="utf-8"
-        ) as execution_checkpoint:
-            execution_checkpoint.write("")
+        def _el_signal(results: dict[str, Any]):
+            with open(
+                etb_config.files.execution_checkpoint_file, "w", encoding="utf-8"
+            ) as execution_checkpoint:
+                execution_checkpoint.write("")
+
         # now that the ELs are all up we manually pair them.
-        self._pair_execution_clients(etb_config, global_timeout=global_timeout)
+        def _el_pairing(results: dict[str, Any]):
+            self._pair_execution_clients(
+                etb_config, global_timeout=global_timeout)
 
         # 4. get the consensus clients ready to come up.
         # create and write all the required files into the testnet root.
-        block_hash, block_number = self.get_deposit_contract_deployment_block(
-            etb_config, global_timeout=global_timeout
+        def _deposit_block_fetch(results: dict[str, Any]) -> dict[str, Any]:
+            # the deposit contract is deployed in the EL genesis block.
+            genesis_block: dict[str, Any] = self.get_execution_genesis_block(
+                etb_config, global_timeout=global_timeout
+            )
+            block_number: int = int(genesis_block["number"], 16)
+            with open(
+                etb_config.files.deposit_contract_deployment_block_hash_file,
+                "w",
+                encoding='utf-8',
+            ) as block_hash_file:
+                block_hash_file.write(genesis_block["hash"])
+            with open(
+                etb_config.files.deposit_contract_deployment_block_number_file,
+                "w",
+                encoding='utf-8',
+            ) as block_number_file:
+                block_number_file.write(str(block_number))
+            return genesis_block
+
+        def _cl_config(results: dict[str, Any]):
+            cgw = ConsensusGenesisWriter(etb_config)
+            with open(etb_config.files.consensus_config_file, "w", encoding="utf-8") as consensus_config:
+                consensus_config.write(cgw.create_consensus_config_yaml())
+
+        def _cl_genesis_ssz(results: dict[str, Any]):
+            logging.info("Writing consensus genesis files")
+            genesis_block: dict[str, Any] = results["deposit-block-fetch"]
+            genesis_ssz: Union[bytes, Exception, None] = None
+            if etb_config.testnet_config.consensus_layer.pregenerate_genesis_state:
+                genesis_ssz = ConsensusGenesisTemplate(
+                    etb_config.files.consensus_genesis_template_dir
+                ).patch(
+                    etb_config, genesis_block["hash"], int(
+                        genesis_block["timestamp"], 16)
+                )
+                if isinstance(genesis_ssz, Exception):
+                    logging.warning(
+                        f"not using the pre-generated genesis state: {genesis_ssz}"
+                    )
+                    genesis_ssz = None
+                else:
+                    logging.info("patched the pre-generated genesis state")
+            if genesis_ssz is not None:
+                with open(etb_config.files.consensus_genesis_file, "wb") as consensus_genesis:
+                    consensus_genesis.write(genesis_ssz)
+            else:
+                # eth2-testnet-genesis writes consensus_genesis_file itself.
+                ConsensusGenesisWriter(etb_config).create_consensus_genesis_ssz()
+
+        # now clone the files into their respective dirs.
+        # note the nodes are using the top level dir instead of the node dir.
+        def _file_distribution(results: dict[str, Any]):
+            self._distribute_consensus_genesis_files(
+                etb_config,
+                etb_config.files.deposit_contract_deployment_block_hash_file,
+                etb_config.files.deposit_contract_deployment_block_number_file,
+            )
+
+        # signal the CL clients to start
+        def _cl_signal(results: dict[str, Any]):
+            with open(
+                etb_config.files.consensus_checkpoint_file, "w", encoding="utf-8"
+            ) as consensus_checkpoint:
+                consensus_checkpoint.write("")
+
+        dag = PhaseDAG("bootstrap", timeline)
+        dag.add("config-write", _config_write)
+        dag.add("bootnode-signal", _bootnode_signal, deps=["config-write"])
+        dag.add("el-genesis", _el_genesis)
+        el_ready = ["config-write", "el-genesis"]
+        if etb_config.testnet_config.execution_layer.prepare_datadirs:
+            dag.add("el-datadirs", _el_datadirs, deps=["el-genesis"])
+            el_ready.append("el-datadirs")
+        dag.add("el-signal", _el_signal, deps=el_ready)
+        if etb_config.testnet_config.execution_layer.peering_mode == "rpc":
+            dag.add("el-pairing", _el_pairing, deps=["el-signal"])
+        dag.add("deposit-block-fetch", _deposit_block_fetch, deps=["el-signal"])
+        dag.add("cl-config", _cl_config)
+        # eth2-testnet-genesis reads the config.yaml and the geth genesis.
+        dag.add(
+            "cl-genesis-ssz",
+            _cl_genesis_ssz,
+            deps=["cl-config", "el-genesis", "deposit-block-fetch"],
+        )
+        dag.add("file-distribution", _file_distribution, deps=["cl-genesis-ssz"])
+        dag.add(
+            "cl-signal",
+            _cl_signal,
+            deps=["config-write", "bootnode-signal", "file-distribution"],
+        )
+        try:
+            dag.run()
+        finally:
+            critical_path = dag.critical_path()
+            timeline.metadata["critical-path"] = [phase.name for phase in critical_path]
+            logging.info(dag.describe_critical_path())
+
+        logging.info("testnet bootstrapped.")
+
+    def _prepare_execution_datadirs(self, etb_config: ETBConfig):
+        """Initialize the datadirs of the geth instances before they start.
+
+        All the instances share one genesis, so geth init runs once into a
+        template dir which is then cloned into every el_dir concurrently.
+        The clones are reflinks where the filesystem supports them and
+        copies otherwise, never hardlinks as the databases are modified in
+        place. A marker file tells the launcher to skip its own init. If
+        geth init fails, the launchers fall back to initializing themselves.
+        @param etb_config: the config being bootstrapped.
+        @return:
+        """
+        client_instances: list[ClientInstance] = [
+            client_instance
+            for client_instance in etb_config.get_client_instances()
+            if client_instance.execution_config.client == "geth"
+        ]
+        if len(client_instances) == 0:
+            return
+        template_dir: pathlib.Path = (
+            etb_config.files.execution_datadir_template_dir / "geth"
         )
-        etb_block_hash_file: pathlib.Path = (
-            etb_config.files.deposit_contract_deployment_block_hash_file
+        if template_dir.exists():
+            shutil.rmtree(template_dir)
+        template_dir.mkdir(parents=True)
+        out = Geth().init(template_dir, etb_config.files.geth_genesis_file)
+        if isinstance(out, Exception):
+            logging.warning(
+                f"failed to prepare the geth datadirs, leaving it to the clients: {out}"
+            )
+            return
+        genesis_digest = sha256_file(etb_config.files.geth_genesis_file)
+        methods: dict[str, int] = {"reflink": 0, "link": 0, "copy": 0}
+        with ThreadPoolExecutor(max_workers=min(32, len(client_instances))) as executor:
+            futures: dict[Future, ClientInstance] = {
+                executor.submit(
+                    clone_tree, template_dir, client_instance.el_dir
+                ): client_instance
+                for client_instance in client_instances
+            }
+            for future in as_completed(futures):
+                # re-raises any exception from the worker.
+                for method, count in future.result().items():
+                    methods[method] += count
+                with open(
+                    futures[future].el_prepared_marker_file, "w", encoding="utf-8"
+                ) as marker:
+                    marker.write(genesis_digest)
+        logging.info(
+            f"prepared {len(client_instances)} geth datadirs "
+            f"({', '.join(f'{k}: {v}' for k, v in methods.items() if v)} files)"
         )
-        etb_block_number_file: pathlib.Path = (
-            etb_config.files.deposit_contract_deployment_block_number_file
+
+    def _distribute_consensus_genesis_files(
+        self,
+        etb_config: ETBConfig,
+        block_hash_file: Path,
+        block_number_file: Path,
+    ):
+        """Clone the consensus genesis files into every collection dir and
+        write a checksum manifest next to them.
+
+        Every source file is hashed once, the manifests of the collection
+        dirs only list the files that were placed there.
+        @param etb_config: the bootstrapped config.
+        @param block_hash_file: the deposit contract deployment block hash.
+        @param block_number_file: the deposit contract deployment block number.
+        @return:
+        """
+        files = etb_config.files
+        checksums: dict[Path, str] = {
+            src: sha256_file(src)
+            for src in [
+                files.consensus_config_file,
+                files.consensus_genesis_file,
+                block_hash_file,
+                block_number_file,
+            ]
+        }
+        write_checksum_manifest(
+            files.consensus_genesis_checksums_file,
+            {src.name: digest for src, digest in checksums.items()},
         )
-        with open(etb_block_hash_file, "w", encoding='utf-8') as block_hash_file:
-            block_hash_file.write(block_hash)
-        with open(etb_block_number_file, "w", encoding='utf-8') as block_number_file:
-            block_number_file.write(str(block_number))
-        logging.info("Writing consensus genesis files")
-        cgw = ConsensusGenesisWriter(etb_config)
-        with open(etb_config.files.consensus_config_file, "w", encoding="utf-8") as consensus_config:
-            consensus_config.write(cgw.create_consensus_config_yaml())
-        with open(etb_config.files.consensus_genesis_file, "wb") as consensus_genesis:
-            genesis_ssz = cgw.create_consensus_genesis_ssz()
-            # got an exception, raise it. if not then we have bytes to write.
-            if isinstance(genesis_ssz, Exception):
-                raise genesis_ssz
-            consensus_genesis.write(cgw.create_consensus_genesis_ssz())
-        # now copy the files into their respective dirs.
-        # note the nodes are using the top level dir instead of the node dir.
+        methods: dict[str, int] = {"reflink": 0, "link": 0, "copy": 0}
         config: ClientInstanceCollectionConfig
         for config in etb_config.client_collections:
             destination = config.collection_dir
-            shutil.copy(etb_config.files.consensus_config_file, destination)
-            shutil.copy(etb_config.files.consensus_genesis_file, destination)
+            # name in the collection dir -> source file
+            placed: dict[str, Path] = {
+                files.consensus_config_file.name: files.consensus_config_file,
+                files.consensus_genesis_file.name: files.consensus_genesis_file,
+            }
             if config.consensus_config.client == "lighthouse":
-                shutil.copy(
-                    etb_block_number_file,
-                    destination /
-                    "deploy_block.txt")
+                placed["deploy_block.txt"] = block_number_file
             if config.consensus_config.client == "nimbus":
-                shutil.copy(
-                    etb_block_hash_file, destination / "deposit_contract_block_hash.txt"
-                )
-                shutil.copy(
-                    etb_block_number_file, destination / "deposit_contract_block.txt"
-                )
-        # signal the CL clients to start
-        with open(
-            etb_config.files.consensus_checkpoint_file, "w", encoding="utf-8"
-        ) as consensus_checkpoint:
-            consensus_checkpoint.write("")
-
-        logging.info("testnet bootstrapped.")
+                placed["deposit_contract_block_hash.txt"] = block_hash_file
+                placed["deposit_contract_block.txt"] = block_number_file
+            for name, src in placed.items():
+                methods[clone_file(src, destination / name)] += 1
+            write_checksum_manifest(
+                destination / files.consensus_genesis_checksums_file.name,
+                {name: checksums[src] for name, src in placed.items()},
+            )
+        logging.info(
+            f"distributed consensus genesis files: "
+            f"{', '.join(f'{k}: {v}' for k, v in methods.items() if v)}"
+        )
 
-    def create_keystores(self, config_path: Path):
+    def create_keystores(
+            self, config_path: Path, keystore_workers: Union[int, None] = None):
         """This is not used in the bootstrapping process, but is useful for
         creating the keystores for validators.
 
         There is no need to call this method during normal operation.
-        @param config_path: path of the etb-config.yaml file @return:
+        @param config_path: path of the etb-config.yaml file
+        @param keystore_workers: number of client instances to generate keystores for concurrently.
+        @return:
         """
         logging.warning(
             "create_keystores called outside of bootstrapping process.")
         logging.warning(
             "This will not init a testnet or bootstrap one. See docs for more info."
         )
-        self._write_validator_keystores(ETBConfig(config_path))
+        self._write_validator_keystores(
+            ETBConfig(config_path), max_workers=keystore_workers)
 
     def _pair_execution_clients(
             self, etb_config: ETBConfig, global_timeout: int):
@@ -298,125 +833,513 @@ class EthereumTestnetBootstrapper:
         el_client: ClientInstance
         # it may take a while for the clients to come up; so retry a lot.
         rpc_request = admin_nodeInfo(max_retries=40, timeout=global_timeout)
-        for el_client, rpc_future in perform_batched_request(
-            rpc_request, el_clients_to_pair
-        ).items():
-            result: Union[requests.Response, Exception] = rpc_future.result()
-            if rpc_request.is_valid(result):
-                enodes[el_client] = rpc_request.get_enode(result)
-            else:
-                logging.error(
-                    f"Failed to get enode from {el_client.name}, error: {result}"
-                )
-                # bail early
-                raise result
+        with self.timeline.span("fetch-enodes", clients=len(el_clients_to_pair)):
+            for el_client, rpc_future in perform_batched_request(
+                rpc_request, el_clients_to_pair
+            ).items():
+                result: Union[requests.Response, Exception] = rpc_future.result()
+                if rpc_request.is_valid(result):
+                    enodes[el_client] = rpc_request.get_enode(result)
+                else:
+                    logging.error(
+                        f"Failed to get enode from {el_client.name}, error: {result}"
+                    )
+                    # bail early
+                    raise result
 
         logging.debug(
             f"Fetched the following enodes: {enodes} from the execution clients."
         )
 
-        # now peer the clients with everyone but themselves.
-        for el_peer, enode in enodes.items():
-            add_enode_rpc_request = admin_addPeer(
-                enode=enode, timeout=global_timeout)
-            for el_client in el_clients_to_pair:
-                # don't pair clients with themselves.
-                if el_client != el_peer:
+        # now peer the clients according to the configured topology.
+        el_config = etb_config.testnet_config.execution_layer
+        peers: list[ClientInstance] = list(enodes.keys())
+        edges: set[tuple[int, int]] = build_topology(
+            el_config.peering_topology,
+            len(peers),
+            degree=el_config.peering_degree,
+            groups=[peer.collection_config.name for peer in peers],
+            seed=el_config.chain_id,
+        )
+        logging.info(
+            f"peering {len(peers)} execution clients using a "
+            f"{el_config.peering_topology} topology ({len(edges)} admin_addPeer calls)"
+        )
+        start = time.monotonic()
+        failures: list[tuple[ClientInstance, ClientInstance, Exception]] = []
+        achieved: set[tuple[int, int]] = set()
+        with self.timeline.span("add-peers", peers=len(peers), edges=len(edges)):
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(el_config.peering_workers, len(edges)))
+            ) as executor:
+                futures: dict[Future, tuple[int, int, admin_addPeer]] = {}
+                for i, j in edges:
+                    # a single connection is enough, peer j is dialed by i.
+                    add_enode_rpc_request = admin_addPeer(
+                        enode=enodes[peers[j]], timeout=global_timeout
+                    )
                     logging.debug(
-                        f"adding peer {el_peer} to el_client {el_client}")
-                    resp = add_enode_rpc_request.perform_request(el_client)
-                    if not add_enode_rpc_request.is_valid(resp):
-                        logging.error(f"admin_addPeer failed with {resp}")
-                        # bail early
-                        raise resp
-
-    def _write_validator_keystores(self, etb_config: ETBConfig):
+                        f"adding peer {peers[j]} to el_client {peers[i]}")
+                    futures[
+                        executor.submit(
+                            add_enode_rpc_request.perform_request, peers[i])
+                    ] = (i, j, add_enode_rpc_request)
+                for future in as_completed(futures):
+                    i, j, add_enode_rpc_request = futures[future]
+                    resp = future.result()
+                    if add_enode_rpc_request.is_valid(resp):
+                        achieved.add((i, j))
+                    else:
+                        logging.error(
+                            f"admin_addPeer {peers[j].name} -> {peers[i].name} failed with {resp}"
+                        )
+                        failures.append((peers[i], peers[j], resp))
+
+        graph = describe_graph(len(peers), achieved)
+        logging.info(
+            f"paired execution clients in {time.monotonic() - start:.2f}s: {graph}"
+        )
+        with open(
+            etb_config.files.el_peer_graph_file, "w", encoding="utf-8"
+        ) as peer_graph_file:
+            peer_graph_file.write(
+                json.dumps(
+                    {
+                        "topology": el_config.peering_topology,
+                        "summary": graph,
+                        "edges": [
+                            [peers[i].name, peers[j].name]
+                            for i, j in sorted(achieved)
+                        ],
+                    },
+                    indent=2,
+                )
+            )
+        if len(failures) > 0:
+            # bail
+            raise failures[0][2]
+
+    def _write_el_static_peers(self, etb_config: ETBConfig):
+        """Derive the node keys of the execution clients and write every
+        client its static peers, according to the peering topology.
+
+        This replaces _pair_execution_clients for the static peering-mode,
+        the clients connect on startup and don't need the admin API.
+        @param etb_config: the config being initialized.
+        @return:
+        """
+        el_config = etb_config.testnet_config.execution_layer
+        client_instances: list[ClientInstance] = etb_config.get_client_instances()
+        node_keys: list[bytes] = [
+            derive_node_key(el_config.chain_id, client_instance.name)
+            for client_instance in client_instances
+        ]
+        enodes: list[str] = [
+            enode(
+                node_key,
+                client_instance.get_ip_address(),
+                client_instance.execution_config.p2p_port,
+            )
+            for client_instance, node_key in zip(client_instances, node_keys)
+        ]
+        edges: set[tuple[int, int]] = build_topology(
+            el_config.peering_topology,
+            len(client_instances),
+            degree=el_config.peering_degree,
+            groups=[
+                client_instance.collection_config.name
+                for client_instance in client_instances
+            ],
+            seed=el_config.chain_id,
+        )
+        # a single connection is enough, peer j is dialed by i.
+        static_peers: list[list[str]] = [[] for _ in client_instances]
+        for i, j in edges:
+            static_peers[i].append(enodes[j])
+        for client_instance, node_key, peers in zip(
+            client_instances, node_keys, static_peers
+        ):
+            write_static_peering_files(
+                client_instance.execution_config.client,
+                client_instance.el_dir,
+                node_key,
+                peers,
+            )
+
+        graph = describe_graph(len(client_instances), edges)
+        logging.info(f"wrote static peers for {len(client_instances)} execution clients: {graph}")
+        with open(
+            etb_config.files.el_peer_graph_file, "w", encoding="utf-8"
+        ) as peer_graph_file:
+            peer_graph_file.write(
+                json.dumps(
+                    {
+                        "topology": el_config.peering_topology,
+                        "summary": graph,
+                        "edges": [
+                            [client_instances[i].name, client_instances[j].name]
+                            for i, j in sorted(edges)
+                        ],
+                    },
+                    indent=2,
+                )
+            )
+
+    def _write_cl_static_peers(self, etb_config: ETBConfig):
+        """Derive the network identities of the consensus clients and write
+        every client the ENRs and multiaddrs of its peers, according to the
+        peering topology. The clients then mesh right away instead of
+        discovering each other through the eth2-bootnode.
+
+        nimbus creates its own network key, so an edge to a nimbus node is
+        dialed by nimbus. Clients without any peers with a known identity
+        fall back to the eth2-bootnode.
+        @param etb_config: the config being initialized.
+        @return:
+        """
+        cl_config = etb_config.testnet_config.consensus_layer
+        chain_id = etb_config.testnet_config.execution_layer.chain_id
+        client_instances: list[ClientInstance] = etb_config.get_client_instances()
+        node_keys: list[bytes] = [
+            # a different key than the one of the execution client.
+            derive_node_key(chain_id, f"{client_instance.name}/consensus")
+            for client_instance in client_instances
+        ]
+        has_identity: list[bool] = [
+            CL_NETWORK_KEY_FILES.get(client_instance.consensus_config.client)
+            is not None
+            for client_instance in client_instances
+        ]
+        enrs: list[str] = [
+            enr(
+                node_key,
+                client_instance.get_ip_address(),
+                client_instance.consensus_config.p2p_port,
+                client_instance.consensus_config.p2p_port,
+            )
+            for client_instance, node_key in zip(client_instances, node_keys)
+        ]
+        multiaddrs: list[str] = [
+            multiaddr(
+                node_key,
+                client_instance.get_ip_address(),
+                client_instance.consensus_config.p2p_port,
+            )
+            for client_instance, node_key in zip(client_instances, node_keys)
+        ]
+        edges: set[tuple[int, int]] = build_topology(
+            cl_config.peering_topology,
+            len(client_instances),
+            degree=cl_config.peering_degree,
+            groups=[
+                client_instance.collection_config.name
+                for client_instance in client_instances
+            ],
+            seed=chain_id,
+        )
+        # both sides discover each other, but peer j is only dialed by i
+        # (unless we don't know the identity of j).
+        discovery_peers: list[list[int]] = [[] for _ in client_instances]
+        static_peers: list[list[int]] = [[] for _ in client_instances]
+        for i, j in sorted(edges):
+            if has_identity[j]:
+                discovery_peers[i].append(j)
+                static_peers[i].append(j)
+            if has_identity[i]:
+                discovery_peers[j].append(i)
+                if not has_identity[j]:
+                    static_peers[j].append(i)
+            if not has_identity[i] and not has_identity[j]:
+                logging.debug(
+                    f"no static peering between {client_instances[i].name} and {client_instances[j].name}"
+                )
+        for ndx, (client_instance, node_key) in enumerate(
+            zip(client_instances, node_keys)
+        ):
+            write_cl_static_peering_files(
+                client_instance.consensus_config.client,
+                client_instance.node_dir,
+                node_key,
+                [enrs[peer] for peer in discovery_peers[ndx]],
+                [multiaddrs[peer] for peer in static_peers[ndx]],
+            )
+
+        graph = describe_graph(len(client_instances), edges)
+        logging.info(f"wrote static peers for {len(client_instances)} consensus clients: {graph}")
+        with open(
+            etb_config.files.cl_peer_graph_file, "w", encoding="utf-8"
+        ) as peer_graph_file:
+            peer_graph_file.write(
+                json.dumps(
+                    {
+                        "topology": cl_config.peering_topology,
+                        "summary": graph,
+                        "nodes": {
+                            client_instance.name: {
+                                "peer-id": peer_id(node_key),
+                                "enr": enrs[ndx],
+                                "multiaddr": multiaddrs[ndx],
+                            }
+                            for ndx, (client_instance, node_key) in enumerate(
+                                zip(client_instances, node_keys)
+                            )
+                            if has_identity[ndx]
+                        },
+                        "edges": [
+                            [client_instances[i].name, client_instances[j].name]
+                            for i in range(len(client_instances))
+                            for j in static_peers[i]
+                        ],
+                    },
+                    indent=2,
+                )
+            )
+
+    def _write_validator_keystores(
+        self,
+        etb_config: ETBConfig,
+        max_workers: Union[int, None] = None,
+        keystore_cache: Union[KeystoreCache, None] = None,
+        native_keystores: bool = False,
+        client_instances: Union[list[ClientInstance], None] = None,
+    ):
         """
-        Populates the validator keystores for all the clients.
-        keys are generated using eth2-val-tools and dropped in the node_dir:
+        Populates the validator keystores for the clients.
+        keys are generated using eth2-val-tools (or in-process when
+        native_keystores is set) and dropped in the node_dir:
             /testnet_root/local_testnet/collection_name/node_<node_num>/keystores/
-        they are then moved up one dir and the keystore dir is removed.
+        they are then moved up one dir (renamed when possible, see
+        etb.common.filesystem.place) and the keystore dir is removed.
+
+        Every client instance owns a disjoint range of validator indices, so
+        the instances are generated concurrently, max_workers at a time.
+        If a keystore_cache is supplied, previously generated keystores are
+        reused instead of running eth2-val-tools again.
         @param etb_config: ETBConfig
+        @param max_workers: number of instances to generate at once (default: cpu count)
+        @param keystore_cache: optional cache of generated keystores.
+        @param native_keystores: use the in-process NativeKeystoreGenerator.
+        @param client_instances: the instances to populate (default: all of them)
         @return:
         """
-
-        eth2_val_tools = Eth2ValTools()
         mnemonic = etb_config.testnet_config.consensus_layer.validator_mnemonic
+        keystore_kdf = etb_config.testnet_config.consensus_layer.keystore_kdf
         logging.debug(f"using mnemonic:\n\t{mnemonic}")
-        client_instance: ClientInstance
-        for client_instance in etb_config.get_client_instances():
+        if client_instances is None:
+            client_instances = etb_config.get_client_instances()
+        # fail before spawning anything if a client is not supported.
+        for client_instance in client_instances:
             cl_client = client_instance.consensus_config.client
             if cl_client not in ["prysm", "lighthouse",
                                  "teku", "nimbus", "lodestar"]:
                 raise Exception(
                     f"client: {cl_client} not supported for keystores")
-            consensus_node_dir: pathlib.Path = client_instance.node_dir
-            keystore_dir: pathlib.Path = consensus_node_dir / \
-                pathlib.Path("keystores/")
-            vpn = client_instance.consensus_config.num_validators  # validators per node
-            offset = client_instance.ndx * vpn
-            min_ndx = client_instance.collection_config.validator_offset_start + offset
-            max_ndx = min_ndx + vpn
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(client_instances)))
+        logging.info(
+            f"generating keystores for {len(client_instances)} client instances "
+            f"using {max_workers} workers (keystore-kdf: {keystore_kdf})"
+        )
+        if keystore_kdf == "pbkdf2-fast":
+            logging.warning(
+                "keystore-kdf is pbkdf2-fast, the keystores are NOT secure and "
+                "must only be used for ephemeral testnets."
+            )
+        keystore_generator: Union[Eth2ValTools, NativeKeystoreGenerator]
+        if native_keystores:
+            # the instance workers share one process pool for the key
+            # derivation, so the mnemonic seed is only derived once.
+            keystore_generator = NativeKeystoreGenerator()
+        else:
+            keystore_generator = Eth2ValTools()
+
+        start = time.monotonic()
+        total_stats = PlacementStats()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures: dict[Future, ClientInstance] = {
+                    executor.submit(
+                        self._write_client_instance_keystores,
+                        client_instance,
+                        mnemonic,
+                        keystore_generator,
+                        keystore_cache,
+                        keystore_kdf,
+                    ): client_instance
+                    for client_instance in client_instances
+                }
+                for num_finished, future in enumerate(
+                        as_completed(futures), start=1):
+                    # re-raises any exception from the worker.
+                    elapsed, stats = future.result()
+                    total_stats.update(stats)
+                    logging.info(
+                        f"[{num_finished}/{len(futures)}] wrote keystores for "
+                        f"{futures[future].name} in {elapsed:.2f}s ({stats})"
+                    )
+        finally:
+            if native_keystores:
+                keystore_generator.shutdown()
+        logging.info(
+            f"finished writing keystores in {time.monotonic() - start:.2f}s, "
+            f"placed {total_stats}"
+        )
+        self._report_keystore_decrypt_cost(client_instances)
+
+    def _report_keystore_decrypt_cost(
+            self, client_instances: list[ClientInstance]):
+        """Log an estimate of how long each client will spend decrypting its
+        keystores on startup.
+
+        Decryption time is dominated by the KDF, and all keystores of a
+        given format share the same KDF parameters, so the KDF is timed once
+        per format and multiplied by the number of keystores each node has.
+        Prysm decrypts a single wallet holding all of its keys.
+        @param client_instances: the instances whose keystores were written.
+        @return:
+        """
+        kdf_times: dict[str, float] = {}
+        total = 0.0
+        logging.info("estimated validator keystore decrypt cost per node:")
+        for client_instance in client_instances:
+            node_dir: pathlib.Path = client_instance.node_dir
+            if client_instance.consensus_config.client == "prysm":
+                key_format = "prysm"
+                keystores = list(node_dir.glob("direct/accounts/*.json"))
+            else:
+                key_format = "standard"
+                keystores = list((node_dir / "keys").glob("*.json")) + list(
+                    (node_dir / "keys").glob("*/*.json")
+                )
+            if len(keystores) == 0:
+                continue
+            if key_format not in kdf_times:
+                kdf_times[key_format] = measure_keystore_decrypt_time(
+                    keystores[0])
+            cost = kdf_times[key_format] * len(keystores)
+            total += cost
+            logging.info(
+                f"\t{client_instance.name}: {len(keystores)} keystore(s), "
+                f"~{cost:.2f}s"
+            )
+        logging.info(f"\ttotal: ~{total:.2f}s")
+
+    @staticmethod
+    def _get_validator_range(client_instance: ClientInstance) -> tuple[int, int]:
+        """The [min_ndx, max_ndx) validator indices of a client instance."""
+        vpn = client_instance.consensus_config.num_validators  # validators per node
+        offset = client_instance.ndx * vpn
+        min_ndx = client_instance.collection_config.validator_offset_start + offset
+        return min_ndx, min_ndx + vpn
+
+    def _write_client_instance_keystores(
+        self,
+        client_instance: ClientInstance,
+        mnemonic: str,
+        keystore_generator: Union[Eth2ValTools, NativeKeystoreGenerator],
+        keystore_cache: Union[KeystoreCache, None] = None,
+        keystore_kdf: str = "default",
+    ) -> tuple[float, PlacementStats]:
+        """Generates and places the keystores for a single client instance.
+
+        @param client_instance: the instance to write the keystores for.
+        @param mnemonic: the validator mnemonic.
+        @param keystore_generator: what generates the keystores.
+        @param keystore_cache: optional cache of generated keystores.
+        @param keystore_kdf: the consensus-layer keystore-kdf setting.
+        @return: the time it took in seconds and what was placed.
+        """
+        start = time.monotonic()
+        cl_client = client_instance.consensus_config.client
+        consensus_node_dir: pathlib.Path = client_instance.node_dir
+        keystore_dir: pathlib.Path = consensus_node_dir / \
+            pathlib.Path("keystores/")
+        min_ndx, max_ndx = self._get_validator_range(client_instance)
+        logging.debug(
+            f"populating keystores for client: {client_instance.name}")
+        logging.debug(f"min_ndx: {min_ndx}, max_ndx: {max_ndx}")
+        prysm = cl_client == "prysm"
+        prysm_password = client_instance.validator_password if prysm else ""
+        cache_key = KeystoreCacheKey(
+            mnemonic=mnemonic,
+            min_ndx=min_ndx,
+            max_ndx=max_ndx,
+            prysm=prysm,
+            prysm_password=prysm_password,
+            kdf=keystore_kdf,
+        )
+        insecure = keystore_kdf == "pbkdf2-fast"
+        if keystore_cache is not None and keystore_cache.get(
+                cache_key, keystore_dir):
             logging.debug(
-                f"populating keystores for client: {client_instance.name}")
-            logging.debug(f"min_ndx: {min_ndx}, max_ndx: {max_ndx}")
-            if cl_client == "prysm":
-                eth2_val_tools.generate_keystores(
+                f"using cached keystores {cache_key} for {client_instance.name}")
+        else:
+            if prysm:
+                out = keystore_generator.generate_keystores(
                     out_path=keystore_dir,
                     min_ndx=min_ndx,
                     max_ndx=max_ndx,
                     mnemonic=mnemonic,
                     prysm=True,
-                    prysm_password=client_instance.validator_password,
-                )
-
-                for item in pathlib.Path(keystore_dir).glob("prysm/*"):
-                    if item.is_dir():
-                        shutil.copytree(item, consensus_node_dir / item.name)
-                    else:
-                        shutil.copy(item, consensus_node_dir / item.name)
-                # prysm requires a wallet-password.txt to launch.
-                wallet_password_path: pathlib.Path = (
-                    consensus_node_dir / "wallet-password.txt"
+                    prysm_password=prysm_password,
+                    insecure=insecure,
                 )
-                with open(wallet_password_path, "w") as wallet_password_file:
-                    wallet_password_file.write(
-                        client_instance.validator_password)
-
             else:
-                eth2_val_tools.generate_keystores(
+                out = keystore_generator.generate_keystores(
                     out_path=keystore_dir,
                     min_ndx=min_ndx,
                     max_ndx=max_ndx,
                     mnemonic=mnemonic,
+                    insecure=insecure,
                 )
-                # these are the defaults shared by most of the clients
-                keystore_src: pathlib.Path = (
-                    keystore_dir / "keys"
-                )  # where the generated keystores are
-                keystore_dst: pathlib.Path = (
-                    consensus_node_dir / "keys"
-                )  # where the keystores will be moved to
-                secret_src: pathlib.Path = (
-                    keystore_dir / "secrets"
-                )  # where the generated secrets are
-                secret_dst: pathlib.Path = (
-                    consensus_node_dir / "secrets"
-                )  # where the secrets will be moved to
-                if cl_client == "teku":
-                    keystore_src = keystore_dir / "teku-keys"
-                    secret_src = keystore_dir / "teku-secrets"
-                elif cl_client == "nimbus":
-                    keystore_src = keystore_dir / "nimbus-keys"
-                elif cl_client == "lodestar":
-                    secret_src = keystore_dir / "lodestar-secrets"
-                    # go ahead and create the validatordb dir for lodestar
-                    pathlib.Path(consensus_node_dir / "validatordb").mkdir()
-                # copy everything over
-                shutil.copytree(keystore_src, keystore_dst)
-                shutil.copytree(secret_src, secret_dst)
-            # finished, remove the generated keystores.
-            shutil.rmtree(keystore_dir)
+            if isinstance(out, Exception):
+                raise out
+            if keystore_cache is not None:
+                keystore_cache.put(cache_key, keystore_dir)
+
+        stats = PlacementStats()
+        if prysm:
+            for item in pathlib.Path(keystore_dir).glob("prysm/*"):
+                place(item, consensus_node_dir / item.name, stats)
+            # prysm requires a wallet-password.txt to launch.
+            wallet_password_path: pathlib.Path = (
+                consensus_node_dir / "wallet-password.txt"
+            )
+            with open(wallet_password_path, "w") as wallet_password_file:
+                wallet_password_file.write(
+                    client_instance.validator_password)
+
+        else:
+            # these are the defaults shared by most of the clients
+            keystore_src: pathlib.Path = (
+                keystore_dir / "keys"
+            )  # where the generated keystores are
+            keystore_dst: pathlib.Path = (
+                consensus_node_dir / "keys"
+            )  # where the keystores will be moved to
+            secret_src: pathlib.Path = (
+                keystore_dir / "secrets"
+            )  # where the generated secrets are
+            secret_dst: pathlib.Path = (
+                consensus_node_dir / "secrets"
+            )  # where the secrets will be moved to
+            if cl_client == "teku":
+                keystore_src = keystore_dir / "teku-keys"
+                secret_src = keystore_dir / "teku-secrets"
+            elif cl_client == "nimbus":
+                keystore_src = keystore_dir / "nimbus-keys"
+            elif cl_client == "lodestar":
+                secret_src = keystore_dir / "lodestar-secrets"
+                # go ahead and create the validatordb dir for lodestar
+                pathlib.Path(consensus_node_dir / "validatordb").mkdir()
+            # move everything over
+            place(keystore_src, keystore_dst, stats)
+            place(secret_src, secret_dst, stats)
+        # finished, remove the formats this client did not use.
+        shutil.rmtree(keystore_dir)
+        return time.monotonic() - start, stats
 
     def get_deposit_contract_deployment_block(
         self, etb_config: ETBConfig, global_timeout: int
@@ -426,6 +1349,17 @@ class EthereumTestnetBootstrapper:
 
         :return: (block_hash, block_number)
         """
+        block = self.get_execution_genesis_block(etb_config, global_timeout)
+        return block["hash"], int(block["number"], 16)
+
+    def get_execution_genesis_block(
+        self, etb_config: ETBConfig, global_timeout: int
+    ) -> dict[str, Any]:
+        """Fetch the 0th block from a random EL client that implements the
+        eth http api.
+
+        :return: the block as returned by eth_getBlockByNumber
+        """
         el_eth_regex = re.compile(r"(eth|ETH)")
         plausible_instances: list[ClientInstance] = []
         for instance in etb_config.get_client_instances():
@@ -452,10 +1386,9 @@ class EthereumTestnetBootstrapper:
             )
 
         block: dict[str, Any] = get_block_rpc_request.get_block(resp)
-        block_number = block["number"]
-        block_hash = block["hash"]
-        logging.debug(f"Got block {block_number} with hash: {block_hash}")
-        return block_hash, int(block_number, 16)
+        logging.debug(
+            f"Got block {block['number']} with hash: {block['hash']}")
+        return block
 
 
 if __name__ == "__main__":
@@ -476,6 +1409,15 @@ if __name__ == "__main__":
         help="Clear the last run.",
     )
 
+    parser.add_argument(
+        "--deferred-clean",
+        dest="deferred_clean",
+        action="store_true",
+        default=False,
+        help="With --clean, only move the last run aside. It is removed in "
+        "the background by the next --init-testnet.",
+    )
+
     parser.add_argument(
         "--init-testnet",
         dest="init_testnet",
@@ -492,6 +1434,60 @@ if __name__ == "__main__":
         help="Start the testnet",
     )
 
+    parser.add_argument(
+        "--keystore-workers",
+        dest="keystore_workers",
+        type=int,
+        default=None,
+        help="Number of client instances to generate keystores for "
+        "concurrently during init. (default: cpu count)",
+    )
+
+    parser.add_argument(
+        "--no-keystore-cache",
+        dest="no_keystore_cache",
+        action="store_true",
+        default=False,
+        help="Always regenerate the validator keystores instead of reusing "
+        "ones cached by a previous init.",
+    )
+
+    parser.add_argument(
+        "--keystore-cache-max-mb",
+        dest="keystore_cache_max_mb",
+        type=int,
+        default=2048,
+        help="Max size of the keystore cache in MB, least recently used "
+        "entries are evicted past this.",
+    )
+
+    parser.add_argument(
+        "--keystore-generator",
+        dest="keystore_generator",
+        choices=["eth2-val-tools", "native"],
+        default="eth2-val-tools",
+        help="What generates the validator keystores during init: "
+        "eth2-val-tools, or the in-process native EIP-2333 derivation.",
+    )
+
+    parser.add_argument(
+        "--index-validator-pubkeys",
+        dest="index_validator_pubkeys",
+        action="store_true",
+        default=False,
+        help="Build the validator pubkey index during init instead of on "
+        "first use (derives every genesis pubkey, slow for large testnets).",
+    )
+
+    parser.add_argument(
+        "--persist-accounts",
+        dest="persist_accounts",
+        action="store_true",
+        default=False,
+        help="Keep the derived premine accounts (including their private "
+        "keys, in plaintext) in the etb cache dir so later runs can reuse them.",
+    )
+
     parser.add_argument(
         "--log-level",
         dest="log_level",
@@ -509,7 +1505,7 @@ if __name__ == "__main__":
     etb = EthereumTestnetBootstrapper()
 
     if args.clean:
-        etb.clean()
+        etb.clean(deferred=args.deferred_clean)
         logging.debug("testnet_bootstrapper has finished cleaning up.")
 
     if args.init_testnet:
@@ -522,7 +1518,17 @@ if __name__ == "__main__":
         else:
             path_to_config = pathlib.Path(args.config)
 
-        etb.init_testnet(path_to_config)
+        keystore_cache_max_size = None
+        if not args.no_keystore_cache:
+            keystore_cache_max_size = args.keystore_cache_max_mb * 1024 * 1024
+        etb.init_testnet(
+            path_to_config,
+            keystore_workers=args.keystore_workers,
+            keystore_cache_max_size=keystore_cache_max_size,
+            native_keystores=args.keystore_generator == "native",
+            index_validator_pubkeys=args.index_validator_pubkeys,
+            persist_accounts=args.persist_accounts,
+        )
         logging.debug(
             "testnet_bootstrapper has finished init-ing the testnet.")
 
@@ -9,6 +9,7 @@ import random
 
 from web3.auto import w3
 
+from etb.common.key_manifest import KeyManifest
 from etb.common.utils import create_logger, PremineKey
 from etb.config.etb_config import ETBConfig, ClientInstance, get_etb_config
 from etb.interfaces.testnet_monitor import TestnetMonitor
@@ -87,15 +88,21 @@ if __name__ == "__main__":
     # get the private keys to use.
     mnemonic = etb_config.testnet_config.execution_layer.account_mnemonic
     account_pass = etb_config.testnet_config.execution_layer.keystore_passphrase
-    premine_accts = etb_config.testnet_config.execution_layer.premines
+    premine_accts = etb_config.testnet_config.execution_layer.get_premines()
 
     private_keys = []
-    for acc in premine_accts:
-        private_keys.append(
-            PremineKey(
-                mnemonic=mnemonic, account=acc, passphrase=account_pass
-            ).private_key
-        )
+    if etb_config.files.premine_key_manifest_file.exists():
+        # exported by the bootstrapper, no need to derive them again.
+        key_manifest = KeyManifest(etb_config.files.premine_key_manifest_file)
+        private_keys = [private_key for _, private_key in key_manifest]
+        key_manifest.close()
+    else:
+        for acc, _ in premine_accts:
+            private_keys.append(
+                PremineKey(
+                    mnemonic=mnemonic, account=acc, passphrase=account_pass
+                ).private_key
+            )
 
     logging.debug(f"private keys: {private_keys}")
 
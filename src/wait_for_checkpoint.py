@@ -0,0 +1,58 @@
+"""
+    Blocks until the given checkpoint files exist, used by the launchers
+    to wait on the bootstrapper. See etb.common.checkpoint.
+
+    Exits 0 once all files exist, 1 on timeout.
+
+    e.g. python3 /source/src/wait_for_checkpoint.py /data/execution-checkpoint.txt
+"""
+import logging
+import pathlib
+import sys
+
+from etb.common.checkpoint import wait_for_file
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Wait for checkpoint files to appear."
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="The files to wait for.")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Max seconds to wait for each file (default: forever).",
+    )
+    parser.add_argument(
+        "--no-inotify",
+        dest="no_inotify",
+        action="store_true",
+        default=False,
+        help="Poll instead of waiting on inotify events.",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="info",
+        help="Logging level")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    for file in args.files:
+        logging.info(f"Waiting for checkpoint: {file}")
+        if not wait_for_file(
+            pathlib.Path(file),
+            timeout=args.timeout,
+            use_inotify=not args.no_inotify,
+        ):
+            logging.error(f"Timed out waiting for checkpoint: {file}")
+            sys.exit(1)